@@ -2,6 +2,8 @@
 #ifndef LP_CPP
 #define LP_CPP
 
+#include <stdexcept>
+
 #include "lp.hpp"
 
 
@@ -13,6 +15,7 @@ LP::LP() {
     rhsVector = NULL;
     objVector = NULL;
     simplexModel = NULL;
+    solutionTime = -1;
 }
 
 
@@ -247,11 +250,48 @@ void LP::solve() {
 }
 
 
+void LP::solveMethod(std::string method) {
+    // Build and solve model using the given clp algorithm (primal, dual or
+    // barrier, as for the clp -primalsimplex, -dualsimplex and -barrier
+    // options). Records cpu time spent in the solver.
+    ClpSolve options;
+    if (method == "primal") {
+        options.setSolveType(ClpSolve::usePrimal);
+    } else if (method == "dual") {
+        options.setSolveType(ClpSolve::useDual);
+    } else if (method == "barrier") {
+        options.setSolveType(ClpSolve::useBarrier);
+    } else {
+        throw std::domain_error("Unknown solve method " + method);
+    }
+    delete simplexModel;
+    ClpModel* model;
+    model = getClpModel();
+    simplexModel = new ClpSimplex(*model);
+    simplexModel->setLogLevel(0);
+    double start = CoinCpuTime();
+    simplexModel->initialSolve(options);
+    solutionTime = CoinCpuTime() - start;
+    delete model;
+}
+
+
 int LP::getSolutionStatus() {
     return simplexModel->status();
 }
 
 
+int LP::getSolutionIterations() {
+    return simplexModel->numberIterations();
+}
+
+
+double LP::getObjectiveValue() {
+    // Objective value of the (minimisation) clp model, as reported by clp.
+    return simplexModel->objectiveValue();
+}
+
+
 void LP::getSolutionPrimals(double* buffer) {
     // Copy stored primal solution for solved model to an array.
     // Input array must have getNumVariables() elements.
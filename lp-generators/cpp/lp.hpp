@@ -9,6 +9,8 @@
 
 #include "ClpModel.hpp"
 #include "ClpSimplex.hpp"
+#include "ClpSolve.hpp"
+#include "CoinTime.hpp"
 #include "OsiClpSolverInterface.hpp"
 
 
@@ -43,7 +45,11 @@ class LP {
 
     // Solution
     void solve();
+    void solveMethod(std::string method);
     int getSolutionStatus();
+    int getSolutionIterations();
+    double getSolutionTime() { return solutionTime; }
+    double getObjectiveValue();
     void getSolutionPrimals(double* buffer);
     void getSolutionSlacks(double* buffer);
     void getSolutionDuals(double* buffer);
@@ -55,6 +61,7 @@ class LP {
     int numConstraints;
     int numLHSElements;
     std::string vtypes;
+    double solutionTime;
 
     // Requiring cleanup
     double* lhsMatrixDense;
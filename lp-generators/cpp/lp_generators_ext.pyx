@@ -20,7 +20,11 @@ cdef extern from "lp.hpp":
         void getRhsVector(double*)
         void getObjVector(double*)
         void solve()
+        void solveMethod(string) except +
         int getSolutionStatus();
+        int getSolutionIterations()
+        double getSolutionTime()
+        double getObjectiveValue()
         void getSolutionPrimals(double*)
         void getSolutionSlacks(double*)
         void getSolutionDuals(double*)
@@ -74,9 +78,22 @@ cdef class LPCy(object):
     def solve(self):
         deref(self.wrapped).solve()
 
+    def solve_method(self, method):
+        cdef string strmethod = method.encode('UTF-8')
+        deref(self.wrapped).solveMethod(strmethod)
+
     def get_solution_status(self):
         return deref(self.wrapped).getSolutionStatus()
 
+    def get_solution_iterations(self):
+        return deref(self.wrapped).getSolutionIterations()
+
+    def get_solution_time(self):
+        return deref(self.wrapped).getSolutionTime()
+
+    def get_objective_value(self):
+        return deref(self.wrapped).getObjectiveValue()
+
     def get_solution_primals(self):
         variables = deref(self.wrapped).getNumVariables()
         result = np.zeros(shape=(variables))
@@ -161,6 +161,31 @@ TEST(LPTest, Solve) {
 }
 
 
+TEST(LPTest, SolveMethod) {
+
+    double A[] = {1, 3, 3, 1};
+    double b[] = {4, 4};
+    double c[] = {1, 1};
+
+    // Construct model
+    LP lp;
+    lp.constructDenseCanonical(2, 2, A, b, c);
+
+    // Solve with each algorithm
+    const char* methods[] = {"primal", "dual", "barrier"};
+    for (int i = 0; i < 3; i++) {
+        lp.solveMethod(methods[i]);
+        ASSERT_EQ(0, lp.getSolutionStatus());
+        ASSERT_NEAR(-2, lp.getObjectiveValue(), 1e-6);
+        ASSERT_LE(0, lp.getSolutionIterations());
+        ASSERT_LE(0, lp.getSolutionTime());
+    }
+
+    ASSERT_THROW(lp.solveMethod("unknown"), std::domain_error);
+
+}
+
+
 int main(int argc, char **argv) {
     testing::InitGoogleTest(&argc, argv);
     return RUN_ALL_TESTS();
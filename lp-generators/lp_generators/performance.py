@@ -1,71 +1,187 @@
 ''' Performance calculation functions. Calls SCIP and CLP solvers as
-subprocesses, so both must be available on the system path. '''
+subprocesses, so both must be available on the system path. CLP performance
+can alternatively be measured in-process using the extension module. '''
 
+import concurrent.futures
 import subprocess
 import re
+import threading
 
+import numpy as np
+
+from .lp_ext import LPCy
 from .writers import write_mps, write_mps_ip
 from .utils import temp_file_path
 
 
-def clp_solve_file(file, method):
-    ''' Solve with a clp method and return statistics. '''
-    result = subprocess.run(
-        ['clp', file, '-{}'.format(method)],
+# Mapping of clp command line methods to extension module solve methods.
+CLP_METHODS = {
+    'primalsimplex': 'primal',
+    'dualsimplex': 'dual',
+    'barrier': 'barrier',
+}
+
+
+CLP_OPTIMAL_REGEX = re.compile(
+    'Optimal objective +([0-9e\-\.\+]+) +- +([0-9]+) +iterations +time +([0-9\.]+)')
+CLP_FLOPS_REGEX = re.compile('flop count +([0-9]+)')
+
+
+def parse_clp_output(lines):
+    ''' Return objective, iterations, time (and flops if available) from
+    clp output lines, or None if no optimal solution was reported. '''
+    result = None
+    flops = None
+    for line in lines:
+        match = CLP_OPTIMAL_REGEX.search(line)
+        if match is not None:
+            result = dict(
+                objective=float(match.group(1)),
+                iterations=int(match.group(2)),
+                time=float(match.group(3)))
+        match = CLP_FLOPS_REGEX.search(line)
+        if match is not None:
+            flops = int(match.group(1))
+    if result is not None and flops is not None:
+        result['flops'] = flops
+    return result
+
+
+def clp_solve_file(file, method, timeout=None, pool=None):
+    ''' Solve with a clp method and return statistics. Output is parsed line
+    by line as clp writes it. If clp has not finished after :timeout seconds,
+    the process is killed and the run is reported as a failure.
+
+    If a solver pool (scip_runner.pool.SolverPool) is given, clp is run on
+    dedicated cores from the pool and the cpu time and peak memory (kB) of
+    the clp process are reported as cpu_time and max_rss. '''
+    command = ['clp', file, '-{}'.format(method)]
+    if pool is not None:
+        run = pool.run(command, timeout=timeout)
+        result = None
+        if not run.timed_out:
+            result = parse_clp_output(run.stdout.decode('utf-8').splitlines())
+        if result is None:
+            result = dict(objective=None, iterations=-1, time=-1)
+        result.update(cpu_time=run.usage.cpu_time, max_rss=run.usage.max_rss)
+        return result
+    proc = subprocess.Popen(
+        command,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE)
-    stdout = result.stdout.decode('utf-8')
-    regex = 'Optimal objective +([0-9e\-\.\+]+) +- +([0-9]+) +iterations +time +([0-9\.]+)'
-    match = re.search(regex, stdout)
-    if match is None:
+        stderr=subprocess.DEVNULL,
+        stdin=subprocess.DEVNULL)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill) if timeout is not None else None
+    if timer is not None:
+        timer.start()
+    try:
+        result = parse_clp_output(line.decode('utf-8') for line in proc.stdout)
+        proc.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        proc.stdout.close()
+    if result is None or timed_out.is_set():
         # There are iteration counts to check here.
         # This occurs in infeasible/unbounded cases.
         return dict(objective=None, iterations=-1, time=-1)
-    result = dict(
-        objective=float(match.group(1)),
-        iterations=int(match.group(2)),
-        time=float(match.group(3)))
-    regex = 'flop count +([0-9]+)'
-    match = re.search(regex, stdout)
-    if match is not None:
-        result['flops'] = int(match.group(1))
     return result
 
 
-def scip_strongbranch_file(file):
+def clp_solve_instance(instance, method):
+    ''' Solve in-process with a clp method (given as for clp_solve_file) using
+    the extension module and return statistics. No flop count is available
+    from this method. '''
+    model = LPCy()
+    model.construct_dense_canonical(
+        instance.variables, instance.constraints,
+        np.asarray(instance.lhs()),
+        np.asarray(instance.rhs()),
+        np.asarray(instance.objective()))
+    model.solve_method(CLP_METHODS[method])
+    if model.get_solution_status() != 0:
+        return dict(objective=None, iterations=-1, time=-1)
+    return dict(
+        objective=model.get_objective_value(),
+        iterations=model.get_solution_iterations(),
+        time=model.get_solution_time())
+
+
+def scip_strongbranch_file(file, pool=None):
     ''' Run SCIP and force all full strong branching.
     Terminate at the root node, return strong branching stats.
-    Gives a measure of reoptimisation effort. '''
-    result = subprocess.run(
-            [
-            'scip', '-c', 'read {}'.format(file),
-            '-c', 'set limits nodes 1',
-            '-c', 'set branching allfullstrong priority 1000000',
-            '-c', 'opt',
-            '-c', 'display statistics',
-            '-c', 'quit'],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE)
-    stdout = result.stdout.decode('utf-8')
+    Gives a measure of reoptimisation effort. Runs through :pool if given
+    (see clp_solve_file). '''
+    command = [
+        'scip', '-c', 'read {}'.format(file),
+        '-c', 'set limits nodes 1',
+        '-c', 'set branching allfullstrong priority 1000000',
+        '-c', 'opt',
+        '-c', 'display statistics',
+        '-c', 'quit']
+    if pool is not None:
+        run = pool.run(command)
+        stdout = run.stdout.decode('utf-8')
+    else:
+        result = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        stdout = result.stdout.decode('utf-8')
     regex = 'strong branching +: +([0-9\.]+) +([0-9]+) +([0-9]+) +([0-9\.]+)'
     match = re.search(regex, stdout)
-    return dict(
+    result = dict(
         time=float(match.group(1)),
         calls=int(match.group(2)),
         iterations=int(match.group(3)),
         percall=float(match.group(4)))
+    if pool is not None:
+        result.update(cpu_time=run.usage.cpu_time, max_rss=run.usage.max_rss)
+    return result
 
 
-def clp_simplex_performance(instance):
-    ''' Write an instance as LP, report primal simplex results. '''
-    with temp_file_path('.mps.gz') as file:
-        write_mps(instance, file)
-        primal_result = clp_solve_file(file, 'primalsimplex')
-        dual_result = clp_solve_file(file, 'dualsimplex')
-        barrier_result = clp_solve_file(file, 'barrier')
-        if 'flops' not in barrier_result:
-            barrier_result['flops'] = -1
-    return dict(
+def clp_simplex_performance(instance, max_concurrent=None, timeout=None, in_process=False,
+                            pool=None):
+    ''' Report primal simplex, dual simplex and barrier results for an LP.
+
+    The instance is written as LP and solved by the clp executable. Up to
+    :max_concurrent clp runs (default 3) are made concurrently (set to 1 to
+    run the methods one after another if timing noise from concurrent runs
+    is a concern). Each run is killed after :timeout seconds, in which case
+    it is reported as a failure. If a solver :pool is given, runs are
+    scheduled on the pool's dedicated cores and the cpu time and peak
+    memory of each run are also reported.
+
+    With :in_process=True, the methods are instead run one after another
+    in-process through the extension module, avoiding MPS writing, process
+    startup and log parsing. The barrier flop count is not available this
+    way, so is reported as -1. :timeout, :max_concurrent and :pool do not
+    apply to in-process runs and raise ValueError if given. '''
+    methods = ['primalsimplex', 'dualsimplex', 'barrier']
+    if in_process:
+        if timeout is not None or max_concurrent is not None or pool is not None:
+            raise ValueError(
+                "timeout, max_concurrent and pool are not supported in-process.")
+        primal_result, dual_result, barrier_result = (
+            clp_solve_instance(instance, method) for method in methods)
+    else:
+        max_concurrent = 3 if max_concurrent is None else max_concurrent
+        with temp_file_path('.mps.gz') as file:
+            write_mps(instance, file)
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, min(max_concurrent, len(methods)))) as executor:
+                primal_result, dual_result, barrier_result = executor.map(
+                    lambda method: clp_solve_file(
+                        file, method, timeout=timeout, pool=pool),
+                    methods)
+    if 'flops' not in barrier_result:
+        barrier_result['flops'] = -1
+    performance = dict(
         clp_primal_objective=primal_result['objective'],
         clp_primal_iterations=primal_result['iterations'],
         clp_primal_time=primal_result['time'],
@@ -76,16 +192,28 @@ def clp_simplex_performance(instance):
         clp_barrier_iterations=barrier_result['iterations'],
         clp_barrier_time=barrier_result['time'],
         clp_barrier_flops=barrier_result['flops'])
+    if pool is not None:
+        for name, result in [
+                ('primal', primal_result), ('dual', dual_result),
+                ('barrier', barrier_result)]:
+            performance[f'clp_{name}_cpu_time'] = result['cpu_time']
+            performance[f'clp_{name}_max_rss'] = result['max_rss']
+    return performance
 
 
-def strbr_performance(instance):
+def strbr_performance(instance, pool=None):
     ''' Write an instance as pure IP, report strong branching results. '''
     with temp_file_path('.mps.gz') as file:
         # integrality conversion
         write_mps_ip(instance, file)
-        result = scip_strongbranch_file(file)
-    return dict(
+        result = scip_strongbranch_file(file, pool=pool)
+    performance = dict(
         strbr_time=result['time'],
         strbr_calls=result['calls'],
         strbr_iterations=result['iterations'],
         strbr_percall=result['percall'])
+    if pool is not None:
+        performance.update(
+            strbr_cpu_time=result['cpu_time'],
+            strbr_max_rss=result['max_rss'])
+    return performance
@@ -4,10 +4,86 @@ The search function returns a generator which iterates over step results. '''
 
 import os
 from contextlib import suppress
+import collections
 import functools
+import hashlib
 
+import numpy as np
 
-def local_search(objective, sense, neighbour, start_instance, steps, random_state):
+
+def instance_fingerprint(instance):
+    ''' Digest of the (A, b, c) data and variable types of an instance, used
+    to recognise neighbours which are identical to previously seen instances
+    (e.g. exchange_basis swapping an element back into the basis). '''
+    digest = hashlib.blake2b(digest_size=16)
+    for data in [instance.lhs(), instance.rhs(), instance.objective()]:
+        data = np.ascontiguousarray(data, dtype=np.float64)
+        digest.update(str(data.shape).encode())
+        digest.update(data.tobytes())
+    digest.update(instance.variable_types.encode())
+    return digest.digest()
+
+
+class VisitedTable(object):
+    ''' Bounded memory table of objective values for visited instances, keyed
+    by fingerprint. Entries are evicted in least recently used order once
+    :maxsize entries are stored. Tracks the number of objective evaluations
+    avoided by lookups (hits) and the number of misses. '''
+
+    def __init__(self, maxsize=10000, key=instance_fingerprint):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('maxsize must be positive or None')
+        self.maxsize = maxsize
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        self._values = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, instance):
+        return self.key(instance) in self._values
+
+    def lookup(self, fingerprint):
+        ''' Return (True, value) if the fingerprint has been recorded,
+        otherwise (False, None). Counts towards hit/miss statistics. '''
+        try:
+            value = self._values[fingerprint]
+        except KeyError:
+            self.misses += 1
+            return False, None
+        self._values.move_to_end(fingerprint)
+        self.hits += 1
+        return True, value
+
+    def record(self, fingerprint, value):
+        self._values[fingerprint] = value
+        self._values.move_to_end(fingerprint)
+        if self.maxsize is not None and len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+    def memoize(self, objective):
+        ''' Wrap an objective function so that repeated evaluations of
+        identical instances are answered from the table. '''
+        @functools.wraps(objective)
+        def memoized_fn(instance):
+            fingerprint = self.key(instance)
+            found, value = self.lookup(fingerprint)
+            if not found:
+                value = objective(instance)
+                self.record(fingerprint, value)
+            return value
+        return memoized_fn
+
+    def stats(self):
+        return dict(
+            evaluations_saved=self.hits, evaluations=self.misses,
+            size=len(self._values))
+
+
+def local_search(objective, sense, neighbour, start_instance, steps, random_state,
+                 visited=None, tabu=False):
     ''' Start from a given instance, generating a random neighbour at each step
     and accepting it if it improves the objective function for the given sense.
     Result is a generator, where each step yields a tuple step_info, instance.
@@ -15,7 +91,17 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
         search_step: step count
         search_objective: current objective function value
         search_update: 'improved' if the current step is new, 'reject_poor' otherwise
-    instance is the current instance object at this step '''
+            ('reject_tabu' if the candidate was previously visited and :tabu is set)
+        search_cached: True if the objective value was taken from :visited
+    instance is the current instance object at this step
+
+    If a VisitedTable is given as :visited, objective values of previously
+    seen instances are reused instead of being re-evaluated. With :tabu set,
+    previously seen instances are rejected outright. The number of saved
+    evaluations is available from visited.stats(). '''
+
+    if tabu and visited is None:
+        raise ValueError('Tabu search requires a visited table')
 
     if sense == 'min':
         def accept_next(c_new, c_old):
@@ -36,10 +122,20 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
     for step in range(steps):
 
         # data and objective calculation
-        c_new = objective(next_instance)
+        cached = False
+        if visited is None:
+            c_new = objective(next_instance)
+        else:
+            fingerprint = visited.key(next_instance)
+            cached, c_new = visited.lookup(fingerprint)
+            if not cached:
+                c_new = objective(next_instance)
+                visited.record(fingerprint, c_new)
 
         # step update rule
-        if accept_next(c_new, c_old):
+        if tabu and cached:
+            state = 'reject_tabu'
+        elif accept_next(c_new, c_old):
             instance = next_instance
             c_old = c_new
             is_new = True
@@ -50,7 +146,8 @@ def local_search(objective, sense, neighbour, start_instance, steps, random_stat
         step_info = dict(
             search_step=step,
             search_objective=c_old,
-            search_update=state)
+            search_update=state,
+            search_cached=cached)
         yield step_info, instance
 
         # next candidate
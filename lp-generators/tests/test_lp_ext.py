@@ -62,6 +62,21 @@ def test_solve(easy_model):
     assert np.all(easy_model.get_solution_basis() == [1, 1, 0, 0])
 
 
+@pytest.mark.parametrize('method', ['primal', 'dual', 'barrier'])
+def test_solve_method(easy_model, method):
+    easy_model.solve_method(method)
+    assert easy_model.get_solution_status() == 0
+    assert abs(easy_model.get_objective_value() - -2) < 10 ** -6
+    assert easy_model.get_solution_iterations() >= 0
+    assert easy_model.get_solution_time() >= 0
+    assert np.all(np.abs(easy_model.get_solution_primals() - [1, 1]) < 10 ** -6)
+
+
+def test_solve_method_unknown(easy_model):
+    with pytest.raises(ValueError):
+        easy_model.solve_method('unknown')
+
+
 def test_write_lp(easy_model):
     with temp_file_path('.mps.gz') as file_path:
         easy_model.write_mps(file_path)
@@ -0,0 +1,82 @@
+
+import random
+
+import numpy as np
+import pytest
+
+from lp_generators.search import local_search, VisitedTable, instance_fingerprint
+
+
+class VectorInstance(object):
+    ''' Minimal instance stub: a binary objective vector. '''
+
+    variable_types = 'CC'
+
+    def __init__(self, vector):
+        self.vector = tuple(vector)
+
+    def lhs(self):
+        return np.ones((1, 2))
+
+    def rhs(self):
+        return np.ones(1)
+
+    def objective(self):
+        return np.array(self.vector, dtype=np.float64)
+
+
+def flip_neighbour(instance, random_state):
+    index = random_state.randint(0, len(instance.vector) - 1)
+    return VectorInstance(
+        1 - v if i == index else v for i, v in enumerate(instance.vector))
+
+
+def test_fingerprint():
+    assert instance_fingerprint(VectorInstance([0, 1])) == instance_fingerprint(VectorInstance([0, 1]))
+    assert instance_fingerprint(VectorInstance([0, 1])) != instance_fingerprint(VectorInstance([1, 1]))
+
+
+def test_visited_table_lru():
+    table = VisitedTable(maxsize=2, key=lambda x: x)
+    table.record('a', 1)
+    table.record('b', 2)
+    assert table.lookup('a') == (True, 1)
+    table.record('c', 3)
+    assert table.lookup('b') == (False, None)
+    assert table.lookup('a') == (True, 1)
+    assert table.stats() == dict(evaluations_saved=2, evaluations=1, size=2)
+
+
+def test_local_search_memoized():
+    calls = []
+
+    def objective(instance):
+        calls.append(instance.vector)
+        return sum(instance.vector)
+
+    visited = VisitedTable()
+    steps = list(local_search(
+        objective, 'max', flip_neighbour, VectorInstance([0, 0]),
+        steps=20, random_state=random.Random(1), visited=visited))
+    assert len(steps) == 20
+    assert len(calls) == len(set(calls)) == 4
+    assert visited.stats()['evaluations_saved'] == 16
+    assert steps[-1][0]['search_objective'] == 2
+
+
+def test_local_search_tabu():
+    visited = VisitedTable()
+    steps = list(local_search(
+        lambda instance: sum(instance.vector), 'max', flip_neighbour,
+        VectorInstance([0, 0]), steps=20, random_state=random.Random(1),
+        visited=visited, tabu=True))
+    assert all(
+        step_info['search_update'] == 'reject_tabu'
+        for step_info, _ in steps if step_info['search_cached'])
+
+
+def test_local_search_tabu_requires_table():
+    with pytest.raises(ValueError):
+        list(local_search(
+            sum, 'max', flip_neighbour, VectorInstance([0, 0]),
+            steps=1, random_state=random.Random(1), tabu=True))
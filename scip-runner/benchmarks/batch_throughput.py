@@ -0,0 +1,43 @@
+''' Compare solve throughput of one SCIP process per job against a single
+batch session, using the test instances. Requires scip on the path.
+
+    python benchmarks/batch_throughput.py [repeats] [time_limit]
+'''
+
+import pathlib
+import sys
+import time
+
+from scip_runner.logs import parse_logs_lazy
+from scip_runner.solve import solve, solve_batch
+
+
+def main(repeats=10, time_limit=10):
+    models = sorted(
+        pathlib.Path(__file__).parent.parent.joinpath("tests").glob("*.mps"))
+    jobs = [
+        dict(model_file=model, time_limit=time_limit)
+        for model in models for _ in range(repeats)]
+
+    start = time.monotonic()
+    single = [solve(**job) for job in jobs]
+    single_elapsed = time.monotonic() - start
+
+    start = time.monotonic()
+    batch = solve_batch(jobs)
+    batch_elapsed = time.monotonic() - start
+
+    for name, logs, elapsed in [
+            ('single', single, single_elapsed),
+            ('batch', batch, batch_elapsed)]:
+        solve_time = sum(
+            parse_logs_lazy(job_logs)['timing']['solving'] for job_logs in logs)
+        print(
+            f"{name:>6}: {len(jobs)} jobs in {elapsed:.2f}s "
+            f"({len(jobs) / elapsed:.1f} jobs/s, "
+            f"{elapsed - solve_time:.2f}s outside solving)")
+    print(f"Speedup: {single_elapsed / batch_elapsed:.2f}x")
+
+
+if __name__ == '__main__':
+    main(*(float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]))
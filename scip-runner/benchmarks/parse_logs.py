@@ -0,0 +1,32 @@
+''' Time parsing of SCIP statistics logs: the raw section breakdown, the full
+parse_logs conversion and the lazy summary path. Uses the given log files, or
+the test fixture log by default.
+
+    python benchmarks/parse_logs.py [scip.log ...]
+'''
+
+import pathlib
+import sys
+import timeit
+
+from scip_runner.logs import parse_logs, parse_logs_raw
+from scip_runner.performance import summarise_logs
+
+
+def main(*log_files):
+    if not log_files:
+        log_files = [
+            pathlib.Path(__file__).parent.parent.joinpath("tests", "scip_stats.log")]
+    logs = [pathlib.Path(log_file).read_text() for log_file in log_files]
+    for name, function in [
+            ('parse_logs_raw', lambda log_data: parse_logs_raw(log_data.split('\n'))),
+            ('parse_logs', parse_logs),
+            ('summarise_logs', summarise_logs)]:
+        timer = timeit.Timer(lambda: [function(log_data) for log_data in logs])
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=5, number=number)) / number / len(logs)
+        print(f"{name:>15}: {best * 1e6:8.1f} us per log")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,61 @@
+''' Write summary rows for many runs to a ResultStore, then time loading
+numeric columns back. Also reports the cost of appending full parse_logs
+output one run at a time, using the test fixture log.
+
+    python benchmarks/result_store.py [rows] [directory]
+'''
+
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+from scip_runner.logs import parse_logs
+from scip_runner.performance import summary
+from scip_runner.store import ResultStore
+
+
+def main(rows=1000000, directory=None):
+    with tempfile.TemporaryDirectory(dir=directory) as path:
+        store = ResultStore(pathlib.Path(path).joinpath('summary'))
+        rng = random.Random(0)
+        start = time.monotonic()
+        batch = 10000
+        for _ in range(0, rows, batch):
+            store.extend([
+                dict(
+                    status='problem is solved [optimal solution found]',
+                    solve_time=rng.expovariate(1.0), tree_nodes=rng.randint(1, 10 ** 6),
+                    simplex_iterations=rng.randint(1, 10 ** 7),
+                    primal_dual_integral=rng.uniform(0, 100))
+                for _ in range(batch)])
+        print(f"Wrote {len(store)} summary rows in {time.monotonic() - start:.2f}s")
+
+        start = time.monotonic()
+        columns = store.load('solve_time', 'tree_nodes')
+        elapsed = time.monotonic() - start
+        print(
+            f"Loaded solve_time, tree_nodes ({len(columns['solve_time'])} rows) "
+            f"in {elapsed:.3f}s; mean solve time {sum(columns['solve_time']) / rows:.3f}")
+        start = time.monotonic()
+        store.column('status')
+        print(f"Loaded status strings in {time.monotonic() - start:.3f}s")
+
+        logs = pathlib.Path(__file__).parent.parent.joinpath(
+            "tests", "scip_stats.log").read_text()
+        parsed = parse_logs(logs)
+        store = ResultStore(pathlib.Path(path).joinpath('full'))
+        runs = 100
+        start = time.monotonic()
+        for i in range(runs):
+            store.append(dict(run=i, **parsed), logs)
+        elapsed = time.monotonic() - start
+        print(
+            f"Appended {runs} full statistics rows ({len(store.columns())} columns) "
+            f"with logs: {elapsed / runs * 1000:.1f}ms per run")
+        assert summary(parsed)['solve_time'] == store.column('timing.solving')[0]
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]), *sys.argv[2:3])
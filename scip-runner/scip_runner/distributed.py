@@ -0,0 +1,439 @@
+''' Distribute solver runs to worker daemons on other machines. A Coordinator
+listens for workers over TCP and exposes the same awaitable solve_async
+interface as scip_runner.solve; each Worker connects to the coordinator,
+announces how many runs it will take at once, and runs jobs with the local
+solve_async. Run a worker daemon with:
+
+    python -m scip_runner.distributed HOST PORT [--slots N]
+
+Model, settings and solution files are either shipped with each job as
+bytes (default), or passed as paths on a filesystem shared by all machines
+(ship_files=False). Jobs running on a worker whose connection is lost are
+re-queued for other workers.
+
+Connections are not authenticated: the coordinator listens on the loopback
+interface by default, and should only be opened to other machines (e.g.
+host='0.0.0.0') on a trusted network.
+
+Messages are a 4 byte big-endian length, a JSON header of that length, then
+any binary blobs listed by size in the header. '''
+
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import os
+import pathlib
+import socket
+import struct
+import tempfile
+import typing
+
+from .pool import ResourceUsage
+from .logs import Progress
+from .metrics import RunMetrics
+from .solve import Logs, solve_async
+
+
+INPUT_FILES = ('model_file', 'settings_file', 'read_solution_file')
+ATTRIBUTE_TYPES = {cls.__name__: cls for cls in (ResourceUsage, Progress, RunMetrics)}
+
+
+class WorkerLost(Exception):
+    ''' A job was lost with its worker more times than allowed. '''
+
+
+class RemoteSolveError(Exception):
+    ''' The solve raised an error on the worker. '''
+
+
+def encode_message(header, blobs=()):
+    header = json.dumps(dict(header, sizes=[len(blob) for blob in blobs])).encode()
+    return b''.join([struct.pack('!I', len(header)), header, *blobs])
+
+
+async def send_message(writer, lock, header, blobs=()):
+    ''' Write one message and wait until the peer has taken enough of the
+    output for it to drain, so that a slow peer holds back its senders.
+    :lock (one per writer) serialises the tasks sending on :writer. '''
+    async with lock:
+        writer.write(encode_message(header, blobs))
+        await writer.drain()
+
+
+async def read_message(reader):
+    ''' Read one message, returning (header, blobs). Raises
+    asyncio.IncompleteReadError if the connection closes. '''
+    size, = struct.unpack('!I', await reader.readexactly(4))
+    header = json.loads(await reader.readexactly(size))
+    blobs = [await reader.readexactly(size) for size in header.pop('sizes')]
+    return header, blobs
+
+
+def _keepalive(writer):
+    # Detect machines which vanish without closing the connection.
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+def _encode_attributes(logs):
+    ''' Attributes of the result of a worker's solve (e.g. Logs) that can be
+    sent as JSON; none for plain values such as a str. '''
+    attributes = {}
+    for name, value in getattr(logs, '__dict__', {}).items():
+        if dataclasses.is_dataclass(value) and type(value).__name__ in ATTRIBUTE_TYPES:
+            value = dict(dataclasses.asdict(value), __type__=type(value).__name__)
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        attributes[name] = value
+    return attributes
+
+
+def _decode_attributes(attributes):
+    for name, value in attributes.items():
+        if isinstance(value, dict) and '__type__' in value:
+            cls = ATTRIBUTE_TYPES[value.pop('__type__')]
+            if cls is RunMetrics and value['usage'] is not None:
+                value['usage'] = ResourceUsage(**value['usage'])
+            attributes[name] = cls(**value)
+    return attributes
+
+
+@dataclasses.dataclass
+class _Job:
+    id: int
+    header: typing.Dict
+    blobs: typing.List[bytes]
+    write_solution_file: typing.Optional[str]
+    future: asyncio.Future
+    attempts: int = 0
+    connection: typing.Any = None
+
+
+@dataclasses.dataclass(eq=False)
+class _Connection:
+    name: str
+    slots: int
+    writer: asyncio.StreamWriter
+    lost: asyncio.Future
+    send_lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+    in_flight: typing.Dict = dataclasses.field(default_factory=dict)
+
+
+class Coordinator(object):
+    ''' Queue solver runs for connected workers.
+
+        host, port:     Address to listen on (default: loopback only; port 0
+                        picks a free port, see address after start).
+        ship_files:     Send input files to workers as bytes. If False, file
+                        arguments are passed as absolute paths, which must be
+                        valid on every worker.
+        max_attempts:   Number of times a job is sent to a worker before
+                        giving up (with WorkerLost) if workers keep dropping.
+
+    Usage:
+
+        async with Coordinator(port=5555) as coordinator:
+            logs = await coordinator.solve_async(model_file, time_limit=10)
+
+    Logs carry the name of the worker which ran them (logs.worker). '''
+
+    def __init__(self, host='127.0.0.1', port=0, ship_files=True, max_attempts=3):
+        self.host = host
+        self.port = port
+        self.ship_files = ship_files
+        self.max_attempts = max_attempts
+        self.requeued = 0
+        self._closed = False
+        self._ids = itertools.count()
+        self._queue = None
+        self._server = None
+        self._connections = set()
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._server = await asyncio.start_server(
+            self._handle_worker, self.host, self.port)
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()[:2]
+
+    @property
+    def workers(self):
+        return sorted(connection.name for connection in self._connections)
+
+    async def close(self):
+        self._closed = True
+        self._server.close()
+        for connection in list(self._connections):
+            connection.writer.close()
+        await self._server.wait_closed()
+        while not self._queue.empty():
+            _, job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Coordinator closed."))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _handle_worker(self, reader, writer):
+        _keepalive(writer)
+        try:
+            header, _ = await read_message(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        loop = asyncio.get_running_loop()
+        connection = _Connection(
+            name=header['name'], slots=header['slots'], writer=writer,
+            lost=loop.create_future())
+        self._connections.add(connection)
+        dispatchers = [
+            loop.create_task(self._dispatch(connection))
+            for _ in range(connection.slots)]
+        try:
+            while True:
+                header, blobs = await read_message(reader)
+                attempt = connection.in_flight.get(header['id'])
+                if attempt is not None and not attempt.done():
+                    attempt.set_result((header, blobs))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(connection)
+            connection.lost.set_result(None)
+            await asyncio.gather(*dispatchers)
+            writer.close()
+
+    def _requeue(self, job):
+        if job.future.done():
+            return
+        if self._closed:
+            job.future.set_exception(RuntimeError("Coordinator closed."))
+            return
+        if job.attempts >= self.max_attempts:
+            job.future.set_exception(WorkerLost(
+                f"Job lost with its worker {job.attempts} times."))
+            return
+        self.requeued += 1
+        self._queue.put_nowait((job.id, job))
+
+    async def _dispatch(self, connection):
+        ''' Feed jobs to one slot of a worker until the worker is lost. '''
+        loop = asyncio.get_running_loop()
+        while True:
+            get = loop.create_task(self._queue.get())
+            await asyncio.wait([get, connection.lost], return_when=asyncio.FIRST_COMPLETED)
+            if connection.lost.done():
+                get.cancel()
+                if get.done() and not get.cancelled():
+                    self._queue.put_nowait(get.result())
+                return
+            _, job = get.result()
+            if job.future.done():
+                continue
+            job.attempts += 1
+            job.connection = connection
+            attempt = connection.in_flight[job.id] = loop.create_future()
+            try:
+                try:
+                    await send_message(
+                        connection.writer, connection.send_lock,
+                        job.header, job.blobs)
+                except ConnectionError:
+                    pass    # The worker is lost: the job is re-queued below.
+                await asyncio.wait(
+                    [attempt, connection.lost], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                del connection.in_flight[job.id]
+                job.connection = None
+            if not attempt.done():
+                self._requeue(job)
+                return
+            self._finish(job, connection.name, *attempt.result())
+
+    def _finish(self, job, worker, header, blobs):
+        if job.future.done():
+            return
+        if header.get('error') is not None:
+            job.future.set_exception(RemoteSolveError(header['error']))
+            return
+        logs = Logs(
+            blobs[0].decode(), worker=worker,
+            **_decode_attributes(header['attributes']))
+        if job.write_solution_file is not None and len(blobs) > 1:
+            pathlib.Path(job.write_solution_file).write_bytes(blobs[1])
+        job.future.set_result(logs)
+
+    async def solve_async(self, model_file, **kwargs):
+        ''' Run SCIP on a worker and return the logs. Accepts the keyword
+        arguments of scip_runner.solve.solve_async which can be sent as
+        JSON (not pool or the progress callbacks). A solution file written
+        by the worker is copied back to write_solution_file. '''
+        loop = asyncio.get_running_loop()
+        kwargs = dict(kwargs, model_file=model_file)
+        for key, value in kwargs.items():
+            if key in INPUT_FILES or key == 'write_solution_file':
+                continue
+            try:
+                json.dumps(value)
+            except TypeError:
+                raise TypeError(f"Argument {key} cannot be sent to a worker.") from None
+        files, blobs = {}, []
+        for key in INPUT_FILES:
+            if kwargs.get(key) is None:
+                continue
+            path = pathlib.Path(kwargs.pop(key))
+            if self.ship_files:
+                files[key] = path.name
+                blobs.append(await loop.run_in_executor(None, path.read_bytes))
+            else:
+                kwargs[key] = str(path.absolute())
+        write_solution_file = None
+        if self.ship_files and kwargs.get('write_solution_file') is not None:
+            write_solution_file = str(kwargs.pop('write_solution_file'))
+        elif kwargs.get('write_solution_file') is not None:
+            kwargs['write_solution_file'] = str(pathlib.Path(
+                kwargs['write_solution_file']).absolute())
+        job_id = next(self._ids)
+        job = _Job(
+            id=job_id,
+            header=dict(
+                type='job', id=job_id, kwargs=kwargs, files=files,
+                return_solution=write_solution_file is not None),
+            blobs=blobs, write_solution_file=write_solution_file,
+            future=loop.create_future())
+        self._queue.put_nowait((job.id, job))
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            connection = job.connection
+            if connection is not None and not connection.writer.is_closing():
+                # Sent from a task of its own, as this one is cancelled.
+                asyncio.ensure_future(self._send_cancel(connection, job.id))
+            raise
+
+    @staticmethod
+    async def _send_cancel(connection, job_id):
+        try:
+            await send_message(
+                connection.writer, connection.send_lock,
+                dict(type='cancel', id=job_id))
+        except ConnectionError:
+            pass
+
+
+class Worker(object):
+    ''' Worker daemon: connects to the coordinator at :host, :port and runs
+    up to :slots jobs at once using :solve (an async function accepting the
+    keyword arguments of solve_async; default solve_async). :name identifies
+    the worker in logs (default hostname:pid). '''
+
+    def __init__(self, host, port, slots=1, solve=None, name=None):
+        self.host = host
+        self.port = port
+        self.slots = slots
+        self.solve = solve or solve_async
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    async def run(self):
+        ''' Serve jobs until the coordinator closes the connection. '''
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        _keepalive(writer)
+        lock = asyncio.Lock()
+        await send_message(
+            writer, lock, dict(type='hello', name=self.name, slots=self.slots))
+        tasks = {}
+        try:
+            while True:
+                try:
+                    header, blobs = await read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if header['type'] == 'job':
+                    task = asyncio.get_running_loop().create_task(
+                        self._run_job(header, blobs, writer, lock))
+                    tasks[header['id']] = task
+                    task.add_done_callback(
+                        lambda _, job_id=header['id']: tasks.pop(job_id, None))
+                elif header['type'] == 'cancel' and header['id'] in tasks:
+                    tasks[header['id']].cancel()
+        finally:
+            # Close first: jobs cancelled by shutdown are not reported back,
+            # the coordinator re-queues them.
+            writer.close()
+            for task in list(tasks.values()):
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def serve(self, retry_interval=5.0):
+        ''' Run forever, reconnecting to the coordinator when it goes away
+        or cannot be reached. '''
+        while True:
+            try:
+                await self.run()
+            except OSError:
+                pass
+            await asyncio.sleep(retry_interval)
+
+    async def _send(self, writer, lock, header, blobs=()):
+        if writer.is_closing():
+            return
+        try:
+            await send_message(writer, lock, header, blobs)
+        except ConnectionError:
+            pass    # The coordinator re-queues the job.
+
+    async def _run_job(self, header, blobs, writer, lock):
+        response = dict(type='result', id=header['id'], error=None)
+        result = []
+        with tempfile.TemporaryDirectory() as directory:
+            kwargs = header['kwargs']
+            solution_file = pathlib.Path(directory, 'solution.sol')
+            try:
+                for (key, name), data in zip(header['files'].items(), blobs):
+                    if key not in INPUT_FILES or pathlib.Path(name).name != name:
+                        raise ValueError(f"Invalid input file {key}: {name}.")
+                    # Keep file names, SCIP chooses readers by extension.
+                    path = pathlib.Path(directory, key, name)
+                    path.parent.mkdir()
+                    path.write_bytes(data)
+                    kwargs[key] = str(path)
+                if header['return_solution']:
+                    kwargs['write_solution_file'] = str(solution_file)
+                logs = await self.solve(**kwargs)
+                response['attributes'] = _encode_attributes(logs)
+                result.append(str(logs).encode())
+                if header['return_solution'] and solution_file.exists():
+                    result.append(solution_file.read_bytes())
+            except asyncio.CancelledError:
+                await self._send(writer, lock, dict(response, error='Cancelled.'))
+                raise
+            except Exception as error:
+                response['error'] = f'{type(error).__name__}: {error}'
+        await self._send(writer, lock, response, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a SCIP worker daemon.")
+    parser.add_argument('host')
+    parser.add_argument('port', type=int)
+    parser.add_argument('--slots', type=int, default=len(os.sched_getaffinity(0)))
+    parser.add_argument('--name', default=None)
+    args = parser.parse_args()
+    worker = Worker(args.host, args.port, slots=args.slots, name=args.name)
+    asyncio.run(worker.serve())
+
+
+if __name__ == '__main__':
+    main()
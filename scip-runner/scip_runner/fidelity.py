@@ -0,0 +1,125 @@
+''' Multi-fidelity evaluation of models for instance space search. Every
+candidate is first solved with a short time limit, and only those scoring in
+the top fraction of what has been seen at that limit are solved again with
+longer limits (asynchronous successive halving, as in ASHA). Most of the
+solver time then goes to the promising candidates. '''
+
+import bisect
+import dataclasses
+import math
+import typing
+
+from .logs import parse_logs
+from .solve import default_limiter, solve_async
+
+
+@dataclasses.dataclass
+class Rung:
+    ''' Results at one fidelity. '''
+    time_limit: float
+    # Sorted scores of all candidates evaluated at this limit.
+    scores: typing.List[float] = dataclasses.field(default_factory=list)
+    # str(model file) -> score at this limit.
+    results: typing.Dict[str, float] = dataclasses.field(default_factory=dict)
+    promoted: int = 0
+    # Solves whose statistics could not be scored (e.g. killed at the
+    # process timeout), given the penalty score.
+    failed: int = 0
+    solver_time: float = 0.0
+
+
+def last_score(scores):
+    return scores[-1]
+
+
+class MultiFidelityEvaluator(object):
+    ''' Evaluate coroutine for the GA drivers, scoring each candidate by
+    solving it with increasing :time_limits.
+
+        score:          Function of the parsed statistics (logs.parse_logs)
+                        of a solve to a fitness value (higher is better).
+        time_limits:    Increasing time limits, one per rung.
+        eta:            A candidate is promoted to the next rung if its
+                        score is in the top 1 / eta of the scores at its
+                        current rung (including its own).
+        model_file:     Function of a candidate to the model file to solve
+                        (default: the candidate is the model file).
+        fitness:        Function of the list of scores at each rung the
+                        candidate reached to the returned fitness (default:
+                        the last). Scores should be comparable across time
+                        limits (e.g. capped solve time or a primal-dual
+                        integral) or combined here.
+        limiter:        Concurrency limiter for solves (default: the
+                        process-wide limiter).
+        penalty:        Score given to a solve whose statistics cannot be
+                        parsed or scored (e.g. killed at the process
+                        timeout); such candidates are not promoted.
+
+    Other keyword arguments are passed to solve_async. Promotion is decided
+    when a candidate finishes a rung, against the results so far; the first
+    candidates at a rung are not promoted until there are eta of them.
+    Per-rung results are kept in :rungs. '''
+
+    def __init__(self, score, time_limits, eta=3, model_file=None, fitness=last_score,
+                 limiter=None, penalty=-math.inf, **solve_kwargs):
+        if list(time_limits) != sorted(time_limits) or not time_limits:
+            raise ValueError("time_limits must be increasing.")
+        if eta < 2:
+            raise ValueError("eta must be at least 2.")
+        self.score = score
+        self.eta = eta
+        self.model_file = model_file
+        self.fitness = fitness
+        self.limiter = limiter
+        self.penalty = penalty
+        self.solve_kwargs = solve_kwargs
+        self.rungs = [Rung(time_limit=time_limit) for time_limit in time_limits]
+        self.candidates = 0
+
+    def _promote(self, rung, score):
+        ''' True if a candidate with :score (already recorded) at :rung is
+        promoted. '''
+        better = len(rung.scores) - bisect.bisect_right(rung.scores, score)
+        if better < len(rung.scores) // self.eta:
+            rung.promoted += 1
+            return True
+        return False
+
+    async def __call__(self, candidate):
+        model_file = candidate if self.model_file is None else self.model_file(candidate)
+        limiter = self.limiter or default_limiter()
+        self.candidates += 1
+        scores = []
+        for index, rung in enumerate(self.rungs):
+            async with limiter:
+                logs = await solve_async(
+                    model_file, time_limit=rung.time_limit, **self.solve_kwargs)
+            metrics = getattr(logs, 'metrics', None)
+            rung.solver_time += metrics.wall_time if metrics is not None else rung.time_limit
+            failed = False
+            try:
+                score = self.score(parse_logs(logs))
+            except (KeyError, ValueError, IndexError, TypeError):
+                failed = True
+                rung.failed += 1
+                score = self.penalty
+            scores.append(score)
+            bisect.insort(rung.scores, score)
+            rung.results[str(model_file)] = score
+            if failed or index == len(self.rungs) - 1 or not self._promote(rung, score):
+                break
+        return self.fitness(scores)
+
+    def stats(self):
+        ''' Evaluations and promotions per rung, measured solver time, and
+        the time limit budget used as a fraction of solving every candidate
+        at the longest limit. '''
+        full = self.candidates * self.rungs[-1].time_limit
+        budget = sum(len(rung.scores) * rung.time_limit for rung in self.rungs)
+        return dict(
+            candidates=self.candidates,
+            evaluations=[len(rung.scores) for rung in self.rungs],
+            promoted=[rung.promoted for rung in self.rungs],
+            failed=[rung.failed for rung in self.rungs],
+            solver_time=sum(rung.solver_time for rung in self.rungs),
+            budget_fraction=budget / full if full else None)
@@ -1,5 +1,8 @@
 
+import collections.abc
 import contextlib
+import dataclasses
+import re
 
 
 def parse_logs_raw(lines):
@@ -35,13 +38,16 @@ def parse_logs_raw(lines):
 def convert_simple(value):
     if value.strip() == '-':
         return None
-    try:
-        return int(value)
-    except ValueError:
+    if '.' not in value:
+        # Skip the int attempt (and its exception) for the common floats.
         try:
-            return float(value)
+            return int(value)
         except ValueError:
-            return value
+            pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
 
 
 def convert_split(value):
@@ -79,35 +85,21 @@ def normalise_name(name):
     return name
 
 
-def parse_logs(log_data):
-
-    parsed_raw  = parse_logs_raw(log_data.split('\n'))
-
-    statistics = {
-        'solve_status': parsed_raw['SCIP Status']['data'],
-    }
-
-    section = parsed_raw['Total Time']
-    statistics['timing'] = {
+def convert_timing(section):
+    return {
         'total' if key == 'data' else key: float(value.split()[0])
         for key, value in section.items()
     }
 
-    section = parsed_raw['Original Problem']
 
-    for section_name in [
-        'Presolvers', 'Constraints', 'Constraint Timings', 'Propagators', 'Propagator Timings',
-        'Conflict Analysis', 'Separators', 'Pricers', 'Branching Rules', 'Primal Heuristics',
-        'Diving Statistics', 'Neighborhoods', 'LP'
-        ]:
-        statistics[normalise_name(section_name)] = parse_grid_section(parsed_raw[section_name])
+def convert_separators(section):
+    separators = parse_grid_section(section)
+    del separators['cut pool']
+    return separators
 
-    for section_name in [
-        'B&B Tree', 'Root Node', 'Solution'
-        ]:
-        statistics[normalise_name(section_name)] = parse_simple_section(parsed_raw[section_name])
 
-    tree_stats = statistics['tree']
+def convert_tree(section):
+    tree_stats = parse_simple_section(section)
     nodes, extra = tree_stats['nodes']
     internal_nodes, _, leaf_nodes, _ = extra.split()
     tree_stats['nodes'] = nodes
@@ -119,8 +111,11 @@ def parse_logs(log_data):
     tree_stats['internal_nodes_total'] = convert_simple(internal_nodes)
     tree_stats['leaf_nodes_total'] = convert_simple(leaf_nodes)
     tree_stats['repropagations'] = tree_stats['repropagations'][0]
+    return tree_stats
+
 
-    solution_stats = statistics['solution']
+def convert_solution(section):
+    solution_stats = parse_simple_section(section)
     solutions_found, improvements = solution_stats['solutions_found']
     solution_stats['solutions_found'] = solutions_found
     solution_stats['improvements'] = convert_simple(improvements.split()[0])
@@ -131,14 +126,169 @@ def parse_logs(log_data):
     average_gap, primal_dual_integral = solution_stats['average_gap']
     solution_stats['average_gap'] = average_gap
     solution_stats['primal_dual_integral'] = convert_simple(primal_dual_integral.split()[0])
+    return solution_stats
 
-    del statistics['separators']['cut pool']
 
-    # print any remaining tuples (unprocessed split values)
-    # for section, section_data in statistics.items():
-    #     if type(section_data) is dict:
-    #         for subsection, value in section_data.items():
-    #             if type(value) is tuple:
-    #                 print(section, subsection, value)
+# Parsed statistics keys, in output order, with the log section each is
+# read from and the conversion applied to the raw section.
+SECTION_PARSERS = {
+    'solve_status': ('SCIP Status', lambda section: section['data']),
+    'timing': ('Total Time', convert_timing),
+}
+for section_name in [
+        'Presolvers', 'Constraints', 'Constraint Timings', 'Propagators', 'Propagator Timings',
+        'Conflict Analysis', 'Separators', 'Pricers', 'Branching Rules', 'Primal Heuristics',
+        'Diving Statistics', 'Neighborhoods', 'LP']:
+    SECTION_PARSERS[normalise_name(section_name)] = (
+        section_name,
+        convert_separators if section_name == 'Separators' else parse_grid_section)
+SECTION_PARSERS.update({
+    'tree': ('B&B Tree', convert_tree),
+    'root_node': ('Root Node', parse_simple_section),
+    'solution': ('Solution', convert_solution),
+})
+
+STATISTICS_START = re.compile(r'^SCIP Status', re.M)
+# Anchored on a literal newline rather than ^ with re.M, which the regex
+# engine attempts at every position of the log.
+SECTION_LABEL = re.compile(r'\n([^ \n][^:\n]*):')
+
+
+def index_sections(log_data):
+    ''' Single pass over the statistics part of the log, returning the
+    (start, end) offsets of each top level section by label. As for
+    parse_logs_raw, later sections replace earlier ones of the same name. '''
+    start = STATISTICS_START.search(log_data)
+    if start is None:
+        return {}
+    offsets = {}
+    label = 'SCIP Status'
+    section_start = start.start()
+    for match in SECTION_LABEL.finditer(log_data, section_start):
+        offsets[label] = (section_start, match.start())
+        label = match.group(1).rstrip()
+        section_start = match.start() + 1
+    offsets[label] = (section_start, len(log_data))
+    return offsets
+
+
+def parse_section_raw(text):
+    ''' Parse the lines of one section as for parse_logs_raw. '''
+    section = {}
+    for line in text.split('\n'):
+        label, mid, values = line.partition(':')
+        if mid != ':':
+            continue
+        label = label.rstrip()
+        if label.startswith(' '):
+            section[label.lstrip()] = values.strip()
+        else:
+            section['data'] = values.strip()
+    return section
+
+
+class LazyStatistics(collections.abc.Mapping):
+    ''' Read-only mapping giving the same statistics as parse_logs. Section
+    offsets are found in one pass on construction; each section is parsed
+    the first time it is accessed. Missing sections raise KeyError. '''
+
+    def __init__(self, log_data):
+        self._log_data = log_data
+        self._offsets = index_sections(log_data)
+        self._parsed = {}
+
+    def raw_section(self, label):
+        start, end = self._offsets[label]
+        return parse_section_raw(self._log_data[start:end])
+
+    def __getitem__(self, key):
+        try:
+            return self._parsed[key]
+        except KeyError:
+            label, converter = SECTION_PARSERS[key]
+            self._parsed[key] = converter(self.raw_section(label))
+            return self._parsed[key]
 
-    return statistics
+    def __iter__(self):
+        return iter(SECTION_PARSERS)
+
+    def __len__(self):
+        return len(SECTION_PARSERS)
+
+
+def parse_logs_lazy(log_data):
+    return LazyStatistics(log_data)
+
+
+def parse_logs(log_data):
+    ''' Parse all statistics sections of a SCIP log into nested dicts. '''
+    statistics = LazyStatistics(log_data)
+    statistics.raw_section('Original Problem')
+    return {key: statistics[key] for key in statistics}
+
+
+@dataclasses.dataclass
+class Progress:
+    ''' Solve progress taken from the most recent line of the SCIP display
+    table. Gap is a percentage. Values are None until first displayed. '''
+    time: float = None
+    nodes: int = None
+    dual_bound: float = None
+    primal_bound: float = None
+    gap: float = None
+    display_lines: int = 0
+
+
+def convert_display_int(value):
+    ''' Integers in the display table are abbreviated with k/M suffixes
+    when they exceed the column width. '''
+    value = value.strip()
+    for suffix, multiplier in [('k', 1000), ('M', 1000000)]:
+        if value.endswith(suffix):
+            return int(value[:-1]) * multiplier
+    return int(value)
+
+
+def convert_display_float(value):
+    value = value.strip().rstrip('%')
+    if value in ('--', '-', ''):
+        return None
+    if value.lower() in ('inf', 'infinity'):
+        return float('inf')
+    if value.lower() in ('-inf', '-infinity'):
+        return float('-inf')
+    return float(value)
+
+
+class ProgressParser(object):
+    ''' Incrementally consume SCIP output lines, tracking the latest solve
+    progress from the display table. '''
+
+    def __init__(self):
+        self.columns = None
+        self.progress = Progress()
+
+    def feed(self, line):
+        ''' Parse one line of output. Returns True if the line was a display
+        table row (i.e. progress was updated). '''
+        fields = [field.strip() for field in line.rstrip('\n').split('|')]
+        if len(fields) < 2:
+            return False
+        if 'node' in fields and 'dualbound' in fields:
+            self.columns = fields
+            return False
+        if self.columns is None or len(fields) != len(self.columns):
+            return False
+        row = dict(zip(self.columns, fields))
+        try:
+            progress = Progress(
+                time=float(row['time'].split()[-1].rstrip('s')),
+                nodes=convert_display_int(row['node']),
+                dual_bound=convert_display_float(row['dualbound']),
+                primal_bound=convert_display_float(row['primalbound']),
+                gap=convert_display_float(row['gap']) if 'gap' in row else None,
+                display_lines=self.progress.display_lines + 1)
+        except (KeyError, ValueError, IndexError):
+            return False
+        self.progress = progress
+        return True
@@ -0,0 +1,91 @@
+''' Timing and resource records of solver runs (attached to logs returned by
+the solve functions as logs.metrics), and aggregation across many runs to
+report throughput and the overhead of running SCIP as a subprocess. '''
+
+import dataclasses
+import typing
+
+from .pool import ResourceUsage
+
+
+@dataclasses.dataclass
+class RunMetrics:
+    ''' Record of one solver process. Times are in seconds.
+
+        started:        Wall clock time (time.time) the run was requested.
+        queue_wait:     Time spent waiting for pool cores before spawning.
+        spawn_latency:  Time taken to create the process.
+        wall_time:      Time from spawning to reaping the process.
+        returncode:     Exit status (negative: killed by that signal).
+        timed_out:      Cut off at the process timeout (PROC_TIMEOUT_MUL).
+        usage:          ResourceUsage of the process (None for streamed runs).
+        scip_time:      Total time reported in SCIP's statistics (None if
+                        the log has no statistics).
+        jobs:           Number of models solved by the process (batch
+                        sessions share one record between their jobs).
+    '''
+    started: float
+    queue_wait: float
+    spawn_latency: float
+    wall_time: float
+    returncode: int
+    timed_out: bool = False
+    usage: typing.Optional[ResourceUsage] = None
+    scip_time: typing.Optional[float] = None
+    jobs: int = 1
+
+    @property
+    def finished(self):
+        return self.started + self.queue_wait + self.wall_time
+
+    @property
+    def exit_signal(self):
+        return -self.returncode if self.returncode < 0 else None
+
+    @property
+    def overhead(self):
+        ''' Process time not accounted for by SCIP's reported total time. '''
+        if self.scip_time is None:
+            return None
+        return self.wall_time - self.scip_time
+
+
+def aggregate_metrics(records):
+    ''' Summarise RunMetrics of many runs (or Logs carrying them). Jobs
+    sharing a batch session are counted once. Returns a dict of totals,
+    means and rates; totals over optional fields (scip_time, cpu_time) only
+    include runs which have them. '''
+    metrics = {}
+    for record in records:
+        record = getattr(record, 'metrics', record)
+        if record is not None:
+            metrics[id(record)] = record
+    metrics = list(metrics.values())
+    if not metrics:
+        return dict(runs=0, jobs=0)
+    elapsed = max(m.finished for m in metrics) - min(m.started for m in metrics)
+    jobs = sum(m.jobs for m in metrics)
+    reported = [m for m in metrics if m.scip_time is not None]
+    measured = [m for m in metrics if m.usage is not None]
+    reported_wall = sum(m.wall_time for m in reported)
+    measured_wall = sum(m.wall_time for m in measured)
+    overhead = sum(m.overhead for m in reported)
+    cpu_time = sum(m.usage.cpu_time for m in measured)
+    return dict(
+        runs=len(metrics),
+        jobs=jobs,
+        elapsed=elapsed,
+        throughput=jobs / elapsed if elapsed > 0 else None,
+        wall_time=sum(m.wall_time for m in metrics),
+        scip_time=sum(m.scip_time for m in reported),
+        overhead=overhead,
+        overhead_fraction=overhead / reported_wall if reported_wall > 0 else None,
+        cpu_time=cpu_time,
+        cpu_utilisation=cpu_time / measured_wall if measured_wall > 0 else None,
+        max_rss=max((m.usage.max_rss for m in measured), default=None),
+        mean_queue_wait=sum(m.queue_wait for m in metrics) / len(metrics),
+        max_queue_wait=max(m.queue_wait for m in metrics),
+        mean_spawn_latency=sum(m.spawn_latency for m in metrics) / len(metrics),
+        timeouts=sum(m.timed_out for m in metrics),
+        failures=sum(m.returncode != 0 for m in metrics),
+    )
@@ -5,9 +5,8 @@ import pathlib
 import shutil
 import uuid
 
-from .logs import parse_logs
-from .solve import solve_async
-
+from .logs import parse_logs, parse_logs_lazy
+from .solve import default_limiter, solve_async
 
 
 def handle_failure(model_file, settings_file, logs):
@@ -35,15 +34,76 @@ def summary(parsed_logs):
     }
 
 
-async def compare_branching(model_file, configs, time_limit=None):
+def summarise_logs(logs):
+    ''' Fast path for summary(parse_logs(logs)): only the sections needed
+    for the summary are parsed. '''
+    return summary(parse_logs_lazy(logs))
+
+
+async def _solve_parsed(limiter, model_file, settings_file, record_failures,
+                        **kwargs):
+    ''' Solve under the given concurrency limiter, returning logs and parsed
+    statistics. With :record_failures, failures to parse are written out for
+    inspection (see handle_failure). '''
+    async with limiter:
+        logs = await solve_async(model_file, settings_file=settings_file, **kwargs)
+    try:
+        return logs, parse_logs(logs)
+    except:
+        if record_failures:
+            handle_failure(model_file, settings_file, logs)
+        raise
+
+
+async def _compare_configs(model_file, configs, data, limiter, record_failures,
+                           **kwargs):
+    ''' Run all configurations concurrently, adding results to :data in
+    configuration order. If any fails, the others are cancelled (killing
+    their solves) before the error is raised. '''
+    tasks = [
+        asyncio.ensure_future(_solve_parsed(
+            limiter, model_file, settings_file, record_failures, **kwargs))
+        for settings_file in configs.values()]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    for name, (logs, parsed) in zip(configs, results):
+        data[f'{name}_logs'] = logs
+        data[name] = parsed
+    compare = {
+        name: summary(data[name])
+        for name in configs
+    }
+    return compare, data
+
+
+async def compare_branching(model_file, configs, time_limit=None, limiter=None,
+                            reference_cache=None):
     ''' Compare branching methods by first solving the model with default
     settings, then providing the solution to SCIP before solving the model
-    with each custom configuration. '''
+    with each custom configuration. Configurations are solved concurrently,
+    subject to :limiter (default: the process-wide limiter). If a
+    ReferenceCache is given, the default solve is taken from (or added to)
+    the cache instead of being run every time. '''
+    limiter = limiter or default_limiter()
     data = {}
+    if reference_cache is not None:
+        reference = await reference_cache.get(
+            model_file, time_limit=time_limit, limiter=limiter)
+        data['default_logs'] = reference.logs
+        data['default'] = reference.statistics
+        return await _compare_configs(
+            model_file, configs, data, limiter, True,
+            read_solution_file=reference.solution_file, time_limit=time_limit)
     solution_file = str(model_file) + ".sol"
-    logs = await solve_async(
-        model_file, write_solution_file=solution_file,
-        time_limit=time_limit)
+    async with limiter:
+        logs = await solve_async(
+            model_file, write_solution_file=solution_file,
+            time_limit=time_limit)
     try:
         data['default_logs'] = logs
         data["default"] = parse_logs(logs)
@@ -52,36 +112,27 @@ async def compare_branching(model_file, configs, time_limit=None):
         raise
     if not pathlib.Path(solution_file).exists():
         raise ValueError("No solution file written.")
-    for name, settings_file in configs.items():
-        logs = await solve_async(
-            model_file, settings_file=settings_file,
-            read_solution_file=solution_file,
-            time_limit=time_limit)
-        data[f'{name}_logs'] = logs
-        try:
-            data[name] = parse_logs(logs)
-        except:
-            handle_failure(model_file, settings_file, logs)
-            raise
-    compare = {
-        name: summary(data[name])
-        for name in configs
-    }
-    return compare, data
+    return await _compare_configs(
+        model_file, configs, data, limiter, True,
+        read_solution_file=solution_file, time_limit=time_limit)
 
 
-async def compare_heuristics(model_file, configs, time_limit=None):
+async def compare_heuristics(model_file, configs, time_limit=None, limiter=None):
     ''' Compare primal heuristic settings by solving with each custom
-    configuration and reporting the primal integral. '''
-    data = {}
-    for name, settings_file in configs.items():
-        logs = await solve_async(
-            model_file, settings_file=settings_file,
-            time_limit=time_limit)
-        data[f'{name}_logs'] = logs
-        data[name] = parse_logs(logs)
-    compare = {
-        name: summary(data[name])
-        for name in configs
-    }
-    return compare, data
+    configuration and reporting the primal integral. Configurations are
+    solved concurrently, subject to :limiter (default: the process-wide
+    limiter). Failures to parse are raised without being written out. '''
+    limiter = limiter or default_limiter()
+    return await _compare_configs(
+        model_file, configs, {}, limiter, False, time_limit=time_limit)
+
+
+def store_comparison(store, data, **fields):
+    ''' Append the parsed statistics of each configuration in :data (as
+    returned by compare_branching or compare_heuristics) to a ResultStore,
+    one row per configuration with its logs. :fields (e.g. model name) are
+    added as columns to every row, along with the configuration name. '''
+    names = [name for name in data if not name.endswith('_logs')]
+    return store.extend(
+        [dict(fields, config=name, **data[name]) for name in names],
+        logs=[data[f'{name}_logs'] for name in names])
@@ -0,0 +1,271 @@
+''' Scheduler for solver subprocesses. Each run is pinned to a dedicated set
+of cores and optionally limited in memory and cpu time, so that timing
+results stay comparable when many solvers run in parallel. Resource usage of
+each child (cpu time, peak memory) is collected with wait4. '''
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import functools
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+import typing
+
+
+@dataclasses.dataclass
+class ResourceUsage:
+    ''' Resource usage of a single solver process. :max_rss is in kilobytes
+    (Linux carries the high water mark across exec, so this is at least the
+    size of the forking process). '''
+    user_time: float
+    system_time: float
+    max_rss: int
+    wall_time: float
+
+    @property
+    def cpu_time(self):
+        return self.user_time + self.system_time
+
+
+@dataclasses.dataclass
+class ProcessResult:
+    stdout: bytes
+    stderr: bytes
+    returncode: int
+    timed_out: bool
+    usage: ResourceUsage
+    cores: typing.Tuple = ()
+    # Wall clock time the run was requested, and seconds spent waiting for
+    # cores and creating the process.
+    started: float = None
+    queue_wait: float = 0.0
+    spawn_latency: float = 0.0
+
+
+def _exit_code(status):
+    ''' Return code (negative signal number if killed) from a wait status,
+    as os.waitstatus_to_exitcode does from Python 3.9. '''
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_process(command, *, timeout=None, affinity=None, on_spawn=None,
+                on_exit=None):
+    ''' Run :command (a shell string or argument list) to completion and
+    return its output and resource usage. The process is killed if it has not
+    finished after :timeout seconds. If :affinity (a set of cores) is given,
+    the process is pinned to it from the start: the calling thread is pinned
+    while the process is created, so the child inherits the affinity without
+    running any Python after the fork. :on_spawn is called with the pid as
+    soon as the process is created, and :on_exit once it has exited but
+    before it is reaped. Shell commands should exec the solver so that usage
+    is measured for the solver process itself. '''
+    started = time.time()
+    start = time.monotonic()
+    if affinity is not None:
+        thread_affinity = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, affinity)
+    try:
+        proc = subprocess.Popen(
+            command, shell=isinstance(command, str),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL)
+    finally:
+        if affinity is not None:
+            os.sched_setaffinity(0, thread_affinity)
+    spawn_latency = time.monotonic() - start
+    timed_out = threading.Event()
+    # The child is only reaped by wait4 below. Until then its pid cannot be
+    # reused, so it is safe to signal while :running is set.
+    lock = threading.Lock()
+    running = True
+
+    def kill():
+        with lock:
+            if running:
+                os.kill(proc.pid, signal.SIGKILL)
+
+    def time_out():
+        timed_out.set()
+        kill()
+
+    timer = None
+    try:
+        if on_spawn is not None:
+            on_spawn(proc.pid)
+        if timeout is not None:
+            timer = threading.Timer(timeout, time_out)
+            timer.start()
+        stderr = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr.append(proc.stderr.read()))
+        stderr_reader.start()
+        stdout = proc.stdout.read()
+        stderr_reader.join()
+    except BaseException:
+        kill()
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        with lock:
+            running = False
+        if on_exit is not None:
+            on_exit(proc.pid)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = _exit_code(status)
+        proc.stdout.close()
+        proc.stderr.close()
+    return ProcessResult(
+        stdout=stdout, stderr=stderr[0], returncode=proc.returncode,
+        timed_out=timed_out.is_set(),
+        usage=ResourceUsage(
+            user_time=rusage.ru_utime, system_time=rusage.ru_stime,
+            max_rss=rusage.ru_maxrss, wall_time=time.monotonic() - start),
+        started=started, spawn_latency=spawn_latency)
+
+
+async def run_process_async(command, *, timeout=None, on_spawn=None):
+    ''' Run :command as for run_process without blocking the event loop.
+    Each run waits for its process in a thread of its own (so concurrent runs
+    are not queued behind each other), and the process is killed if the
+    calling task is cancelled. '''
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    lock = threading.Lock()
+    pids = set()
+    cancelled = False
+
+    def spawned(pid):
+        with lock:
+            pids.add(pid)
+            if cancelled:
+                os.kill(pid, signal.SIGKILL)
+        if on_spawn is not None:
+            on_spawn(pid)
+
+    def exited(pid):
+        # Called before the process is reaped, so a pid still in :pids
+        # cannot have been reused.
+        with lock:
+            pids.discard(pid)
+
+    def deliver(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        with lock:
+            if cancelled:
+                return
+        result = error = None
+        try:
+            result = run_process(
+                command, timeout=timeout, on_spawn=spawned, on_exit=exited)
+        except BaseException as exc:
+            error = exc
+        try:
+            loop.call_soon_threadsafe(deliver, result, error)
+        except RuntimeError:
+            pass    # The loop has closed since the run was cancelled.
+
+    threading.Thread(target=target, name='run_process').start()
+    try:
+        return await future
+    except asyncio.CancelledError:
+        with lock:
+            cancelled = True
+            for pid in pids:
+                os.kill(pid, signal.SIGKILL)
+        raise
+
+
+class SolverPool(object):
+    ''' Run solver processes with dedicated cores and resource limits.
+
+        cores:          Cores available to the pool (default: all cores
+                        available to this process).
+        cores_per_run:  Number of cores pinned for each run. The number of
+                        concurrent runs is len(cores) // cores_per_run.
+        memory_limit:   Address space limit for each run in bytes.
+        cpu_limit:      CPU time limit for each run in seconds.
+
+    Limits are applied by running commands under the prlimit utility
+    (util-linux). Runs beyond the concurrency limit wait for a free set of
+    cores. Use
+    run() from synchronous code (blocks the calling thread) or run_async()
+    from a coroutine. '''
+
+    def __init__(self, cores=None, cores_per_run=1, memory_limit=None, cpu_limit=None):
+        if cores is None:
+            cores = sorted(os.sched_getaffinity(0))
+        cores = list(cores)
+        if cores_per_run < 1 or len(cores) < cores_per_run:
+            raise ValueError("Need at least cores_per_run cores in the pool.")
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self._slots = queue.Queue()
+        for i in range(0, len(cores) - cores_per_run + 1, cores_per_run):
+            self._slots.put(tuple(cores[i:i + cores_per_run]))
+        self.concurrency = self._slots.qsize()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency)
+
+    def _limited(self, command):
+        ''' :command run under the prlimit utility (util-linux), which sets
+        the limits and then execs it, so the solver never runs without them
+        and its usage is still measured by wait4. '''
+        limits = []
+        if self.memory_limit is not None:
+            limits.append(f'--as={self.memory_limit}:{self.memory_limit}')
+        if self.cpu_limit is not None:
+            # Hard limit one second later: SIGXCPU first, then SIGKILL.
+            limit = int(self.cpu_limit)
+            limits.append(f'--cpu={limit}:{limit + 1}')
+        if not limits:
+            return command
+        if isinstance(command, str):
+            command = ['/bin/sh', '-c', command]
+        return ['prlimit', *limits, '--', *command]
+
+    def run(self, command, timeout=None, submitted=None):
+        ''' Run :command once a set of cores is free, returning a
+        ProcessResult with the cores used and time spent waiting for them
+        (since :submitted, a time.monotonic value, if given) attached. '''
+        submitted = time.monotonic() if submitted is None else submitted
+        cores = self._slots.get()
+        queue_wait = time.monotonic() - submitted
+        try:
+            result = run_process(
+                self._limited(command), timeout=timeout, affinity=cores)
+        finally:
+            self._slots.put(cores)
+        result.cores = cores
+        result.queue_wait = queue_wait
+        result.started -= queue_wait
+        return result
+
+    async def run_async(self, command, timeout=None):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(
+                self.run, command, timeout=timeout, submitted=time.monotonic()))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
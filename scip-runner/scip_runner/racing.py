@@ -0,0 +1,158 @@
+''' Racing comparison of solver configurations (F-race). Configurations are
+run on a set of models in rounds; after each round a Friedman test over the
+models seen so far checks whether the configurations differ, and if so
+those significantly worse than the best are dropped. Only survivors are run
+on later models, so clearly dominated settings stop costing solver time. '''
+
+import asyncio
+import dataclasses
+import math
+import statistics
+import typing
+
+from .performance import compare_heuristics
+from .solve import default_limiter
+
+
+def chi2_sf(x, df):
+    ''' Survival function of the chi-squared distribution with integer
+    :df degrees of freedom (closed form). '''
+    if x <= 0:
+        return 1.0
+    if df % 2 == 0:
+        term = total = math.exp(-x / 2)
+        for i in range(1, df // 2):
+            term *= x / (2 * i)
+            total += term
+        return min(total, 1.0)
+    root = math.sqrt(x)
+    total = math.erfc(root / math.sqrt(2))
+    term = math.sqrt(2 / math.pi) * math.exp(-x / 2) * root
+    for j in range(1, (df + 1) // 2):
+        total += term
+        term *= x / (2 * j + 1)
+    return min(total, 1.0)
+
+
+def block_ranks(costs):
+    ''' Ranks (1 = lowest cost) of one block of costs, ties averaged. '''
+    order = sorted(range(len(costs)), key=costs.__getitem__)
+    ranks = [0.0] * len(costs)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) and costs[order[end + 1]] == costs[order[start]]:
+            end += 1
+        for i in order[start:end + 1]:
+            ranks[i] = (start + end) / 2 + 1
+        start = end + 1
+    return ranks
+
+
+@dataclasses.dataclass
+class FriedmanResult:
+    statistic: float
+    p_value: float
+    rank_sums: typing.List[float]
+    # Rank sum difference from the best beyond which a treatment is worse.
+    critical_difference: float
+
+
+def friedman_test(blocks, alpha=0.05):
+    ''' Friedman test on :blocks, a list of equal length cost lists (one
+    per model, one cost per configuration). Uses the tie-corrected statistic
+    and, for the post-hoc comparison, Conover's rank sum difference with a
+    normal quantile in place of Student's t. '''
+    n, k = len(blocks), len(blocks[0])
+    ranks = [block_ranks(costs) for costs in blocks]
+    rank_sums = [sum(column) for column in zip(*ranks)]
+    total_squares = sum(rank * rank for block in ranks for rank in block)
+    tie_free = n * k * (k + 1) ** 2 / 4
+    if n < 2 or k < 2 or total_squares == tie_free:
+        return FriedmanResult(0.0, 1.0, rank_sums, math.inf)
+    statistic = (k - 1) * sum(
+        (rank_sum - n * (k + 1) / 2) ** 2 for rank_sum in rank_sums
+    ) / (total_squares - tie_free)
+    denominator = (n - 1) * (k - 1)
+    spread = 2 * (n * total_squares - sum(r * r for r in rank_sums)) / denominator
+    critical_difference = (
+        statistics.NormalDist().inv_cdf(1 - alpha / 2) * math.sqrt(max(spread, 0.0)))
+    return FriedmanResult(statistic, chi2_sf(statistic, k - 1), rank_sums, critical_difference)
+
+
+@dataclasses.dataclass
+class RaceResult:
+    survivors: typing.List[str]
+    # Configuration name -> number of models completed when it was dropped.
+    eliminated: typing.Dict[str, int]
+    # Configuration name -> cost on each model it was run on.
+    costs: typing.Dict[str, typing.List[float]]
+    # (compare, data) from the comparison function for each model run.
+    results: typing.List[typing.Tuple]
+    runs: int
+    full_runs: int
+
+
+def primal_integral_cost(summary):
+    return summary['primal_dual_integral']
+
+
+async def race(model_files, configs, cost=primal_integral_cost, time_limit=None,
+               limiter=None, alpha=0.05, min_rounds=5, models_per_round=1,
+               compare=compare_heuristics):
+    ''' Race :configs (name -> settings file) over :model_files.
+
+        cost:               Function of a summary dict (see
+                            performance.summary) to minimise; missing or
+                            non-numeric costs count as worst.
+        min_rounds:         Number of models all configurations are run on
+                            before any can be dropped.
+        models_per_round:   Models run concurrently between tests.
+        compare:            Comparison coroutine called as
+                            compare(model_file, configs, time_limit=...,
+                            limiter=...), e.g. compare_heuristics (default)
+                            or compare_branching with a reference cache.
+
+    Stops early once a single configuration remains. Returns a RaceResult;
+    runs / full_runs is the fraction of solver runs used compared to
+    running every configuration on every model. '''
+    limiter = limiter or default_limiter()
+    survivors = list(configs)
+    costs = {name: [] for name in configs}
+    eliminated = {}
+    results = []
+    runs = 0
+    models = list(model_files)
+    done = 0
+    while done < len(models) and len(survivors) > 1:
+        round_models = models[done:done + models_per_round]
+        round_results = await asyncio.gather(*(
+            compare(
+                model_file, {name: configs[name] for name in survivors},
+                time_limit=time_limit, limiter=limiter)
+            for model_file in round_models))
+        for compare_summary, data in round_results:
+            results.append((compare_summary, data))
+            runs += len(survivors)
+            for name in survivors:
+                value = cost(compare_summary[name])
+                if not isinstance(value, (int, float)) or math.isnan(value):
+                    value = math.inf
+                costs[name].append(value)
+        done += len(round_models)
+        if done < min_rounds:
+            continue
+        blocks = [
+            [costs[name][i] for name in survivors]
+            for i in range(done)]
+        test = friedman_test(blocks, alpha=alpha)
+        if test.p_value >= alpha:
+            continue
+        best = min(test.rank_sums)
+        for name, rank_sum in zip(list(survivors), test.rank_sums):
+            if rank_sum - best > test.critical_difference:
+                survivors.remove(name)
+                eliminated[name] = done
+    return RaceResult(
+        survivors=survivors, eliminated=eliminated, costs=costs,
+        results=results, runs=runs, full_runs=len(models) * len(configs))
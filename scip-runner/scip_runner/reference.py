@@ -0,0 +1,117 @@
+''' Cache of reference solves: the default settings run of a model whose
+solution is given to SCIP when comparing other configurations. Entries are
+keyed by the content hash of the model file and the time limit, so renamed
+or copied models hit the cache and edited models do not. '''
+
+import asyncio
+import contextlib
+import dataclasses
+import functools
+import hashlib
+import os
+import pathlib
+import typing
+import uuid
+import weakref
+
+from .logs import parse_logs
+from .solve import default_limiter, solve_async
+
+
+@dataclasses.dataclass
+class Reference:
+    logs: str
+    statistics: typing.Dict
+    solution_file: pathlib.Path
+
+
+def model_digest(model_file, time_limit=None):
+    ''' sha256 of the model file contents and time limit. '''
+    digest = hashlib.sha256()
+    with open(model_file, 'rb') as infile:
+        for chunk in iter(functools.partial(infile.read, 1 << 20), b''):
+            digest.update(chunk)
+    digest.update(f'\0time_limit={time_limit}'.encode())
+    return digest.hexdigest()
+
+
+class ReferenceCache(object):
+    ''' Reference solutions and default-run logs stored in :directory.
+
+    Concurrent requests for the same model (in one event loop) share a
+    single solve: the first starts it and the rest wait on its result.
+    Failed solves are not cached. Files are written under temporary names
+    and renamed into place, so several processes can share a directory
+    (at worst duplicating a solve). Counters: hits (found on disk), joins
+    (waited on a solve in progress), solves (reference solves started). '''
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.joins = 0
+        self.solves = 0
+        # Futures belong to one event loop; keep in-flight solves per loop.
+        self._in_flight = weakref.WeakKeyDictionary()
+
+    def _paths(self, key):
+        return (
+            self.directory.joinpath(f'{key}.sol'),
+            self.directory.joinpath(f'{key}.log'))
+
+    def _load(self, key):
+        solution_file, log_file = self._paths(key)
+        # The log file is renamed into place last, marking a complete entry.
+        if not log_file.exists() or not solution_file.exists():
+            return None
+        logs = log_file.read_text()
+        return Reference(logs=logs, statistics=parse_logs(logs), solution_file=solution_file)
+
+    async def _solve(self, model_file, key, time_limit, limiter):
+        solution_file, log_file = self._paths(key)
+        temp = f'{key}.{uuid.uuid4().hex}'
+        temp_solution = self.directory.joinpath(f'{temp}.sol.tmp')
+        temp_log = self.directory.joinpath(f'{temp}.log.tmp')
+        try:
+            async with limiter:
+                logs = await solve_async(
+                    model_file, write_solution_file=temp_solution,
+                    time_limit=time_limit)
+            statistics = parse_logs(logs)
+            if not temp_solution.exists():
+                raise ValueError("No solution file written.")
+            temp_log.write_text(logs)
+            os.replace(temp_solution, solution_file)
+            os.replace(temp_log, log_file)
+        finally:
+            for file in (temp_solution, temp_log):
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(file)
+        return Reference(logs=logs, statistics=statistics, solution_file=solution_file)
+
+    async def get(self, model_file, time_limit=None, limiter=None):
+        ''' Return the Reference for :model_file, solving it (subject to
+        :limiter, default the process-wide limiter) if it is not cached. '''
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(None, model_digest, model_file, time_limit)
+        in_flight = self._in_flight.setdefault(loop, {})
+        if key in in_flight:
+            self.joins += 1
+            return await asyncio.shield(in_flight[key])
+        reference = self._load(key)
+        if reference is not None:
+            self.hits += 1
+            return reference
+        self.solves += 1
+        task = loop.create_task(self._solve(
+            model_file, key, time_limit, limiter or default_limiter()))
+        in_flight[key] = task
+
+        def done(task):
+            del in_flight[key]
+            if not task.cancelled():
+                task.exception()   # Retrieved by waiters, if any remain.
+
+        task.add_done_callback(done)
+        # Shielded: a cancelled waiter does not cancel the solve for others.
+        return await asyncio.shield(task)
@@ -1,39 +1,135 @@
 
 import asyncio
-import subprocess
+import os
+import shlex
+import signal
+import time
+import weakref
 from pathlib import Path
 
+from .logs import ProgressParser
+from .metrics import RunMetrics
+from .pool import run_process, run_process_async
+
 PROC_TIMEOUT_MUL = 1.5
+INTERRUPT_GRACE = 10.0
 
 
-def _command(model_file, *,  settings_file=None,
-             read_solution_file=None,
-             write_solution_file=None,
-             time_limit=None):
-    ''' Produce a subprocess command to solve the given model with SCIP
-    using the given settings. '''
+class Logs(str):
+    ''' SCIP log text returned by the solve functions. Behaves as a string,
+    with information about the run attached as attributes:
+
+        metrics:    RunMetrics of the SCIP process (timing, exit status, usage)
+        usage:      ResourceUsage of the SCIP process (not for streamed runs)
+        cores:      Cores the SCIP process was pinned to (runs through a SolverPool)
+        progress:   Last Progress read from the display table (streamed runs)
+        stopped:    True if the run was interrupted by an early stop callback
+        timed_out:  True if the run was cut off at the process timeout
+    '''
+    metrics = None
+    usage = None
+    cores = None
+    progress = None
+    stopped = False
+    timed_out = False
+
+    def __new__(cls, text, **attributes):
+        logs = super().__new__(cls, text)
+        logs.__dict__.update(attributes)
+        return logs
+
+
+class ConcurrencyLimiter(object):
+    ''' Limit the number of solver runs in progress at once. A single limiter
+    can be shared by any number of coroutines (e.g. comparisons on many
+    models) so that together they saturate, but do not oversubscribe, the
+    machine. Usage:
+
+        async with limiter:
+            logs = await solve_async(...)
+    '''
+
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError("Concurrency limit must be at least 1.")
+        self.limit = limit
+        # asyncio primitives belong to one event loop; keep one per loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return self._semaphores[loop]
+
+    async def __aenter__(self):
+        await self._semaphore().acquire()
+        return self
+
+    async def __aexit__(self, *args):
+        self._semaphore().release()
+
+
+_default_limiter = ConcurrencyLimiter(len(os.sched_getaffinity(0)))
+
+
+def default_limiter():
+    ''' Process-wide limiter, allowing one solver run per available core
+    unless changed by set_concurrency_limit. '''
+    return _default_limiter
+
+
+def set_concurrency_limit(limit):
+    ''' Replace the process-wide limiter (affects runs started afterwards). '''
+    global _default_limiter
+    _default_limiter = ConcurrencyLimiter(limit)
+
+
+def _job_script(model_file, *,  settings_file=None,
+                read_solution_file=None,
+                write_solution_file=None,
+                time_limit=None):
+    ''' Produce the SCIP shell commands to solve the given model using the
+    given settings and display statistics. Arguments are quoted (SCIP's
+    shell reads quoted words), so each is passed as a single word and cannot
+    add SCIP commands. '''
     if not Path(model_file).exists():
         raise ValueError(f"Model file {model_file} not found.")
-    cmd = f'read {model_file}'
+    quote = lambda value: shlex.quote(str(value))
+    cmd = f'read {quote(model_file)}'
     if settings_file:
-        cmd += f' set load {settings_file}'
+        cmd += f' set load {quote(settings_file)}'
     if read_solution_file:
         if not Path(read_solution_file).exists():
             raise ValueError(f"Solution file {read_solution_file} not found.")
-        cmd += f' read {read_solution_file}'
+        cmd += f' read {quote(read_solution_file)}'
     if time_limit:
-        cmd += f' set limits time {time_limit}'
+        cmd += f' set limits time {quote(time_limit)}'
     cmd += ' set timing clocktype 1'
     cmd += ' optimize'
     if write_solution_file:
-        cmd += f' write solution {write_solution_file}'
+        cmd += f' write solution {quote(write_solution_file)}'
     cmd += ' display statistics'
-    cmd += ' quit'
-    return f"scip -c '{cmd}'"
+    return cmd
+
+
+def _command(*args, **kwargs):
+    ''' Produce a subprocess command to solve the given model with SCIP
+    using the given settings. The SCIP commands are quoted as a single shell
+    word, so arguments cannot inject shell commands. '''
+    return "scip -c " + shlex.quote(f"{_job_script(*args, **kwargs)} quit")
+
 
+def _batch_command(jobs):
+    ''' Produce a subprocess command solving each job (a dict of _command
+    keyword arguments including model_file) in turn in one SCIP session.
+    Parameters are reset to defaults before each job. '''
+    cmd = ' '.join(f'set default {_job_script(**job)}' for job in jobs)
+    return "scip -c " + shlex.quote(f"{cmd} quit")
 
-def _handle_process_output(retcode, stdout):
-    logs = stdout.decode()
+
+def _handle_process_output(retcode, stdout, **attributes):
+    logs = Logs(stdout.decode(), **attributes)
     if logs.strip().endswith("SCIP>"):
     # if "SCIP Status" not in logs:
         header, mid, message = logs.partition("by T. Koch (zimpl.zib.de)")
@@ -46,32 +142,218 @@ def _handle_process_output(retcode, stdout):
     return logs
 
 
-def solve(*args, **kwargs):
-    ''' Run SCIP with given inputs and return the logs. '''
-    proc = subprocess.Popen(
-        _command(*args, **kwargs), shell=True,
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-        stdin=subprocess.DEVNULL)
-    stdout, stderr = proc.communicate()
-    return _handle_process_output(proc.returncode, stdout)
+# Messages SCIP prints after reading (or failing to read) a problem file.
+READ_MESSAGES = ('read problem', 'error reading file')
 
 
-async def solve_async(*args, proc_timeout=None, **kwargs):
-    if proc_timeout is None:
-        if "time_limit" in kwargs and kwargs["time_limit"] is not None:
-            proc_timeout = kwargs["time_limit"] * PROC_TIMEOUT_MUL
-        else:
-            proc_timeout = 3600.0
+def _split_batch_output(retcode, stdout, jobs, **attributes):
+    ''' Split the log of a batch session into per-job logs. Each job's log
+    starts at SCIP's report of reading its own model, found in job order
+    (so solution files read by a job, which SCIP also reports as problems,
+    do not start a new job); the session header is kept with the first job.
+    SCIP drops the remaining commands after a failed read, so jobs after
+    one, or after the session was cut off, get empty logs. '''
+    logs = _handle_process_output(retcode, stdout)
+    lines = logs.splitlines(keepends=True)
+    starts = []
+    position = 0
+    for job in jobs:
+        prefixes = tuple(f"{message} <{job['model_file']}>" for message in READ_MESSAGES)
+        start = next(
+            (i for i in range(position, len(lines)) if lines[i].startswith(prefixes)),
+            None)
+        if start is None:
+            break
+        starts.append(start)
+        position = start + 1
+    starts = [0] + starts[1:]
+    job_logs = [
+        Logs("".join(lines[start:end]), **attributes)
+        for start, end in zip(starts, starts[1:] + [len(lines)])]
+    return job_logs + [
+        Logs("", **attributes) for _ in range(len(jobs) - len(job_logs))]
+
+
+def _batch_proc_timeout(jobs):
+    return sum(_proc_timeout(job) for job in jobs)
+
+
+def _proc_timeout(kwargs):
+    if "time_limit" in kwargs and kwargs["time_limit"] is not None:
+        return kwargs["time_limit"] * PROC_TIMEOUT_MUL
+    return 3600.0
+
+
+def _scip_time(logs):
+    ''' Total time from SCIP's statistics, if the log has them. Only the
+    last total time line is read, rather than indexing the statistics. '''
+    start = logs.rfind('\nTotal Time')
+    if start == -1:
+        return None
+    end = logs.find('\n', start + 1)
+    _, _, value = logs[start + 1:end if end != -1 else len(logs)].partition(':')
+    try:
+        return float(value.split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def _run_metrics(result, scip_time, jobs=1):
+    return RunMetrics(
+        started=result.started, queue_wait=result.queue_wait,
+        spawn_latency=result.spawn_latency, wall_time=result.usage.wall_time,
+        returncode=result.returncode, timed_out=result.timed_out,
+        usage=result.usage, scip_time=scip_time, jobs=jobs)
+
+
+def _result_logs(result):
+    ''' Logs of a completed ProcessResult, with its metrics attached. '''
+    logs = _handle_process_output(
+        result.returncode, result.stdout, usage=result.usage,
+        cores=result.cores or None, timed_out=result.timed_out)
+    logs.metrics = _run_metrics(result, _scip_time(logs))
+    return logs
+
+
+def _result_batch_logs(result, jobs):
+    ''' Per-job logs of a batch session, sharing the session's metrics. '''
+    job_logs = _split_batch_output(
+        result.returncode, result.stdout, jobs, usage=result.usage,
+        cores=result.cores or None, timed_out=result.timed_out)
+    scip_times = [total for total in map(_scip_time, job_logs) if total is not None]
+    metrics = _run_metrics(
+        result, sum(scip_times) if scip_times else None, jobs=len(jobs))
+    for logs in job_logs:
+        logs.metrics = metrics
+    return job_logs
+
+
+def solve(*args, pool=None, **kwargs):
+    ''' Run SCIP with given inputs and return the logs. If a SolverPool is
+    given, the run waits for free cores in the pool (and is cut off at the
+    process timeout). The logs carry RunMetrics of the SCIP process. '''
+    if pool is not None:
+        return _result_logs(pool.run(
+            "exec " + _command(*args, **kwargs),
+            timeout=_proc_timeout(kwargs)))
+    return _result_logs(run_process("exec " + _command(*args, **kwargs)))
+
+
+async def _solve_streaming(command, *, proc_timeout, on_progress, early_stop):
+    ''' Run SCIP reading its output line by line, tracking solve progress.
+    On early stop or timeout SCIP is sent SIGINT, which interrupts the solve
+    but still runs the remaining commands (writing statistics). If SCIP has
+    not exited INTERRUPT_GRACE seconds after a timeout, it is killed and the
+    partial logs are returned with the last known progress. Resource usage
+    is not available for streamed runs. '''
+    started = time.time()
+    start = time.monotonic()
     proc = await asyncio.create_subprocess_shell(
-        "exec " + _command(*args, **kwargs),
+        "exec " + command,
         stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
         stdin=asyncio.subprocess.DEVNULL)
+    spawn_latency = time.monotonic() - start
+    parser = ProgressParser()
+    lines = []
+    stopped = False
+
+    async def consume():
+        nonlocal stopped
+        async for line in proc.stdout:
+            lines.append(line)
+            if not parser.feed(line.decode()):
+                continue
+            if on_progress is not None:
+                on_progress(parser.progress)
+            if early_stop is not None and not stopped and early_stop(parser.progress):
+                stopped = True
+                proc.send_signal(signal.SIGINT)
+        await proc.wait()
+
+    consumer = asyncio.ensure_future(consume())
+    timed_out = False
     try:
-        stdout, stderr = await asyncio.wait_for(
-            proc.communicate(),
-            timeout=proc_timeout)
-    except asyncio.TimeoutError:
-        proc.kill()
-        stdout, stderr = await proc.communicate()
-    return _handle_process_output(proc.returncode, stdout)
+        try:
+            await asyncio.wait_for(asyncio.shield(consumer), timeout=proc_timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            proc.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(asyncio.shield(consumer), timeout=INTERRUPT_GRACE)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await consumer
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+        consumer.cancel()
+        raise
+    logs = _handle_process_output(
+        proc.returncode, b"".join(lines), progress=parser.progress,
+        stopped=stopped, timed_out=timed_out)
+    logs.metrics = RunMetrics(
+        started=started, queue_wait=0.0, spawn_latency=spawn_latency,
+        wall_time=time.monotonic() - start, returncode=proc.returncode,
+        timed_out=timed_out, scip_time=_scip_time(logs))
+    return logs
+
+
+async def solve_async(*args, proc_timeout=None, pool=None, stream=False,
+                      on_progress=None, early_stop=None, **kwargs):
+    ''' Run SCIP asynchronously and return the logs. The process is killed
+    after :proc_timeout seconds (default is a multiple of the time limit).
+    Runs are scheduled through :pool if given (see solve).
+
+    With :stream=True (implied by either callback), output is consumed line
+    by line and the logs carry the last solve Progress (nodes, bounds, gap).
+    :on_progress is called with each Progress update. If :early_stop returns
+    True for a Progress update, the solve is interrupted and SCIP reports
+    statistics for the partial solve, e.g.
+
+        early_stop=lambda progress: progress.nodes > 1000
+
+    Runs which time out are interrupted rather than killed (see
+    _solve_streaming). Streaming is not available with a pool. Cancelling
+    the call kills SCIP (except for pooled runs, which run to completion). '''
+    if proc_timeout is None:
+        proc_timeout = _proc_timeout(kwargs)
+    if stream or on_progress is not None or early_stop is not None:
+        if pool is not None:
+            raise ValueError("Streaming is not supported for pooled runs.")
+        return await _solve_streaming(
+            _command(*args, **kwargs), proc_timeout=proc_timeout,
+            on_progress=on_progress, early_stop=early_stop)
+    if pool is not None:
+        return _result_logs(await pool.run_async(
+            "exec " + _command(*args, **kwargs), timeout=proc_timeout))
+    return _result_logs(await run_process_async(
+        "exec " + _command(*args, **kwargs), timeout=proc_timeout))
+
+
+def solve_batch(jobs, *, pool=None):
+    ''' Solve a list of jobs in a single SCIP process, avoiding startup cost
+    for each model. Each job is a dict of keyword arguments as for solve,
+    including model_file, e.g.
+
+        [dict(model_file=..., settings_file=..., time_limit=10), ...]
+
+    Returns a list of per-job logs, sharing the RunMetrics of the session. '''
+    command = "exec " + _batch_command(jobs)
+    if pool is not None:
+        return _result_batch_logs(
+            pool.run(command, timeout=_batch_proc_timeout(jobs)), jobs)
+    return _result_batch_logs(run_process(command), jobs)
+
+
+async def solve_batch_async(jobs, *, proc_timeout=None, pool=None):
+    ''' Asynchronous version of solve_batch. The session is killed after
+    :proc_timeout seconds (default is the sum of the job timeouts). '''
+    if proc_timeout is None:
+        proc_timeout = _batch_proc_timeout(jobs)
+    command = "exec " + _batch_command(jobs)
+    if pool is not None:
+        return _result_batch_logs(
+            await pool.run_async(command, timeout=proc_timeout), jobs)
+    return _result_batch_logs(
+        await run_process_async(command, timeout=proc_timeout), jobs)
@@ -0,0 +1,238 @@
+''' Append-only columnar store for solver results. Each row is a flattened
+record (nested dicts such as parse_logs output become dotted keys, e.g.
+'timing.solving'), stored one file per column so that analysis can load a few
+metrics for many runs without reading anything else. Raw logs are kept
+zlib-compressed in a side blob, indexed by row.
+
+Layout of the store directory:
+
+    columns/<key>.f64    Numeric columns: native float64 values, NaN for
+                         missing (ints are exact up to 2 ** 53).
+    columns/<key>.jsonl  Other columns: one JSON value per line, null for
+                         missing. A numeric column is converted to JSON lines
+                         if a non-numeric value is later appended to it.
+    logs.blob            Concatenated compressed logs.
+    logs.idx             (offset, length) pairs into logs.blob, one per row.
+                         The number of committed rows is len(logs.idx) // 16.
+
+Appends take an exclusive flock on the store (reads take a shared lock), so
+runners in separate processes can write to the same store. The row index is
+written last; a writer which dies mid-append leaves a pending marker and the
+partial rows are discarded by the next append. '''
+
+import array
+import contextlib
+import fcntl
+import json
+import math
+import os
+import pathlib
+import urllib.parse
+import zlib
+
+
+INDEX_ITEM = array.array('Q').itemsize
+
+
+def flatten(record, prefix=''):
+    ''' Flatten nested dicts into a single dict with dotted keys. '''
+    flat = {}
+    for key, value in record.items():
+        key = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, key + '.'))
+        else:
+            flat[key] = value
+    return flat
+
+
+def is_numeric(value):
+    return value is None or isinstance(value, (int, float))
+
+
+class ResultStore(object):
+    ''' Columnar result store in directory :path (created if needed).
+
+        store = ResultStore('results')
+        store.append(dict(model='a.mps', config='pscost', **parse_logs(logs)), logs)
+        columns = store.load('timing.solving', 'tree.nodes')
+
+    Numeric columns load as array('d') (use numpy.frombuffer for a
+    zero-copy ndarray), other columns as lists. '''
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self._columns = self.path.joinpath('columns')
+        os.makedirs(self._columns, exist_ok=True)
+        self._lock_file = self.path.joinpath('lock')
+        self._pending_file = self.path.joinpath('pending')
+        self._blob_file = self.path.joinpath('logs.blob')
+        self._index_file = self.path.joinpath('logs.idx')
+
+    @contextlib.contextmanager
+    def _lock(self, operation):
+        # A new open file description per call, so that the lock also
+        # excludes other threads of this process.
+        with open(self._lock_file, 'a') as lock:
+            fcntl.flock(lock, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _column_file(self, key, suffix):
+        return self._columns.joinpath(urllib.parse.quote(key, safe='') + suffix)
+
+    def _column_files(self):
+        ''' Map of column key to file, preferring JSON lines if a column was
+        left in both formats by an interrupted conversion. '''
+        files = {}
+        for file in sorted(self._columns.iterdir()):
+            if file.suffix in ('.f64', '.jsonl'):
+                key = urllib.parse.unquote(file.stem)
+                if key not in files or file.suffix == '.jsonl':
+                    files[key] = file
+        return files
+
+    def _index(self):
+        index = array.array('Q')
+        with contextlib.suppress(FileNotFoundError):
+            with open(self._index_file, 'rb') as infile:
+                data = infile.read()
+            index.frombytes(data[:len(data) - len(data) % (2 * INDEX_ITEM)])
+        return index
+
+    def __len__(self):
+        with self._lock(fcntl.LOCK_SH):
+            return len(self._index()) // 2
+
+    def columns(self):
+        ''' Keys of all columns in the store, sorted. '''
+        with self._lock(fcntl.LOCK_SH):
+            return sorted(self._column_files())
+
+    def _read_column(self, file, rows):
+        if file.suffix == '.f64':
+            values = array.array('d')
+            with open(file, 'rb') as infile:
+                values.frombytes(infile.read(rows * values.itemsize))
+            values.extend([math.nan] * (rows - len(values)))
+            return values
+        with open(file) as infile:
+            values = [json.loads(line) for line, _ in zip(infile, range(rows))]
+        return values + [None] * (rows - len(values))
+
+    def load(self, *keys):
+        ''' Load the given columns as a dict of key to column. Columns which
+        do not exist in the store raise KeyError. '''
+        with self._lock(fcntl.LOCK_SH):
+            rows = len(self._index()) // 2
+            files = self._column_files()
+            return {key: self._read_column(files[key], rows) for key in keys}
+
+    def column(self, key):
+        return self.load(key)[key]
+
+    def logs(self, row):
+        ''' Decompressed logs stored with :row, or None if there were none. '''
+        with self._lock(fcntl.LOCK_SH):
+            index = self._index()
+            rows = len(index) // 2
+            if row < 0:
+                row += rows
+            if not 0 <= row < rows:
+                raise IndexError("Row out of range.")
+            offset, length = index[2 * row], index[2 * row + 1]
+            if length == 0:
+                return None
+            with open(self._blob_file, 'rb') as infile:
+                infile.seek(offset)
+                return zlib.decompress(infile.read(length)).decode()
+
+    def _repair(self, rows, blob_end):
+        ''' Discard anything written by an append which did not commit. '''
+        for key, file in self._column_files().items():
+            if file.suffix == '.jsonl':
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(self._column_file(key, '.f64'))
+                with open(file, 'rb+') as outfile:
+                    for _ in range(rows):
+                        outfile.readline()
+                    outfile.truncate()
+            else:
+                os.truncate(file, min(os.path.getsize(file), rows * 8))
+        with contextlib.suppress(FileNotFoundError):
+            os.truncate(self._blob_file, blob_end)
+        with contextlib.suppress(FileNotFoundError):
+            os.truncate(self._index_file, rows * 2 * INDEX_ITEM)
+        os.unlink(self._pending_file)
+
+    def _to_jsonl(self, key, rows):
+        ''' Convert a numeric column to JSON lines. '''
+        source = self._column_file(key, '.f64')
+        target = self._column_file(key, '.jsonl')
+        values = self._read_column(source, rows)
+        temp = target.with_suffix('.tmp')
+        with open(temp, 'w') as outfile:
+            outfile.writelines(
+                'null\n' if math.isnan(value) else json.dumps(value) + '\n'
+                for value in values)
+        os.replace(temp, target)
+        os.unlink(source)
+        return target
+
+    def extend(self, records, logs=None):
+        ''' Append a row for each of :records (dicts, flattened to dotted
+        keys). :logs is an optional list of log strings, one per record.
+        Columns missing from a record are filled with NaN / null, and new
+        columns are backfilled for earlier rows. '''
+        records = [flatten(record) for record in records]
+        logs = [None] * len(records) if logs is None else list(logs)
+        if len(logs) != len(records):
+            raise ValueError("Need one log entry per record.")
+        compressed = [zlib.compress(entry.encode()) if entry else b'' for entry in logs]
+
+        with self._lock(fcntl.LOCK_EX):
+            index = self._index()
+            rows = len(index) // 2
+            blob_end = index[-2] + index[-1] if index else 0
+            if self._pending_file.exists():
+                self._repair(rows, blob_end)
+            self._pending_file.touch()
+
+            files = self._column_files()
+            keys = set(files)
+            for record in records:
+                keys.update(record)
+            for key in sorted(keys):
+                values = [record.get(key) for record in records]
+                file = files.get(key)
+                numeric = all(map(is_numeric, values))
+                if file is not None and file.suffix == '.f64' and not numeric:
+                    file = self._to_jsonl(key, rows)
+                if file is None:
+                    file = self._column_file(key, '.f64' if numeric else '.jsonl')
+                    values = [None] * rows + values
+                if file.suffix == '.f64':
+                    with open(file, 'ab') as outfile:
+                        array.array('d', (
+                            math.nan if value is None else value
+                            for value in values)).tofile(outfile)
+                else:
+                    with open(file, 'a') as outfile:
+                        outfile.writelines(json.dumps(value) + '\n' for value in values)
+
+            new_index = array.array('Q')
+            for entry in compressed:
+                new_index.extend([blob_end, len(entry)])
+                blob_end += len(entry)
+            with open(self._blob_file, 'ab') as outfile:
+                outfile.writelines(compressed)
+            with open(self._index_file, 'ab') as outfile:
+                new_index.tofile(outfile)
+            os.unlink(self._pending_file)
+        return range(rows, rows + len(records))
+
+    def append(self, record, logs=None):
+        ''' Append a single row, returning its row number. '''
+        return self.extend([record], None if logs is None else [logs])[0]
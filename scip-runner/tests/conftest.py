@@ -0,0 +1,21 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+
+@pytest.fixture
+def install_fake_scip(tmp_path, monkeypatch):
+    ''' Install a stand-in scip executable ahead of any real one on the
+    PATH. Call with the python source of the script (it is dedented and
+    given a shebang for this interpreter); returns the script path. The
+    command string passed by the solve functions is sys.argv[2]. '''
+    def install(source):
+        script = tmp_path.joinpath("bin", "scip")
+        script.parent.mkdir(exist_ok=True)
+        script.write_text(f"#!{sys.executable}\n" + textwrap.dedent(source).lstrip("\n"))
+        script.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+        return script
+    return install
@@ -0,0 +1,221 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from scip_runner.distributed import Coordinator, RemoteSolveError, Worker, WorkerLost
+from scip_runner.metrics import RunMetrics
+from scip_runner.pool import ResourceUsage
+from scip_runner.solve import Logs
+
+
+async def fake_solve(model_file, write_solution_file=None, time_limit=None, **kwargs):
+    ''' Stand-in for solve_async: "solves" by reading the model text. '''
+    model = pathlib.Path(model_file).read_text()
+    if model == 'bad':
+        raise ValueError("SCIP waiting for input.")
+    await asyncio.sleep(float(model) if model.replace('.', '').isdigit() else 0.01)
+    if write_solution_file is not None:
+        pathlib.Path(write_solution_file).write_text(f'solution for {model}')
+    return Logs(f'solved {model} with limit {time_limit}', model_file=model_file)
+
+
+@pytest.fixture
+def models(tmp_path):
+    def model(name, text):
+        path = tmp_path.joinpath(name)
+        path.write_text(text)
+        return path
+    return model
+
+
+async def start_workers(coordinator, count, slots=1, solve=fake_solve):
+    host, port = coordinator.address
+    workers = [
+        Worker(host, port, slots=slots, solve=solve, name=f'worker-{i}')
+        for i in range(count)]
+    tasks = [asyncio.ensure_future(worker.run()) for worker in workers]
+    while len(coordinator.workers) < count:
+        await asyncio.sleep(0.01)
+    return tasks
+
+
+def test_distribute_jobs(models):
+    files = [models(f'model-{i}.mps', f'model {i}') for i in range(12)]
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 3, slots=2)
+            results = await asyncio.gather(*(
+                coordinator.solve_async(file, time_limit=5) for file in files))
+        await asyncio.gather(*tasks)
+        return results
+
+    results = asyncio.run(main())
+    assert results == [f'solved model {i} with limit 5' for i in range(12)]
+    assert {logs.worker for logs in results} == {'worker-0', 'worker-1', 'worker-2'}
+    # Shipped files are written under their own names on the worker.
+    assert all(
+        pathlib.Path(logs.model_file).name == f'model-{i}.mps'
+        for i, logs in enumerate(results))
+
+
+def test_solution_file(models, tmp_path):
+    model = models('model.mps', 'x')
+    solution_file = tmp_path.joinpath('out', 'model.sol')
+    solution_file.parent.mkdir()
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 1)
+            await coordinator.solve_async(model, write_solution_file=solution_file)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert solution_file.read_text() == 'solution for x'
+
+
+def test_shared_paths(models):
+    model = models('model.mps', 'x')
+
+    async def main():
+        async with Coordinator(host='127.0.0.1', ship_files=False) as coordinator:
+            tasks = await start_workers(coordinator, 1)
+            logs = await coordinator.solve_async(model)
+        await asyncio.gather(*tasks)
+        return logs
+
+    assert asyncio.run(main()).model_file == str(model.absolute())
+
+
+def test_remote_error(models):
+    model = models('model.mps', 'bad')
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 1)
+            with pytest.raises(RemoteSolveError, match="SCIP waiting for input"):
+                await coordinator.solve_async(model)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+
+def test_reject_non_json_arguments(models):
+    model = models('model.mps', 'x')
+
+    async def main():
+        async with Coordinator() as coordinator:
+            assert coordinator.address[0] == '127.0.0.1'
+            with pytest.raises(TypeError, match="on_progress"):
+                await coordinator.solve_async(model, on_progress=print)
+
+    asyncio.run(main())
+
+
+def test_worker_lost(models):
+    slow = models('slow.mps', '0.5')
+    fast = [models(f'fast-{i}.mps', '0.01') for i in range(4)]
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 2)
+            slow_result = asyncio.ensure_future(coordinator.solve_async(slow))
+            await asyncio.sleep(0.1)
+            # Kill whichever worker took the slow job.
+            busy, = [
+                connection.name for connection in coordinator._connections
+                if connection.in_flight]
+            dict(zip(['worker-0', 'worker-1'], tasks))[busy].cancel()
+            results = await asyncio.gather(
+                slow_result, *(coordinator.solve_async(file) for file in fast))
+            requeued = coordinator.requeued
+        return results, requeued
+
+    results, requeued = asyncio.run(main())
+    assert results[0] == 'solved 0.5 with limit None'
+    assert len({logs.worker for logs in results}) == 1
+    assert requeued == 1
+
+
+def test_max_attempts(models):
+    model = models('slow.mps', '10')
+
+    async def main():
+        async with Coordinator(host='127.0.0.1', max_attempts=2) as coordinator:
+            result = asyncio.ensure_future(coordinator.solve_async(model))
+            for _ in range(2):
+                task, = await start_workers(coordinator, 1)
+                await asyncio.sleep(0.05)
+                task.cancel()
+                while coordinator.workers:
+                    await asyncio.sleep(0.01)
+            with pytest.raises(WorkerLost):
+                await result
+
+    asyncio.run(main())
+
+
+def test_cancel_job(models):
+    model = models('slow.mps', '10')
+    cancelled = []
+
+    async def solve(**kwargs):
+        try:
+            return await fake_solve(**kwargs)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs['model_file'])
+            raise
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 1, solve=solve)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(coordinator.solve_async(model), 0.1)
+            while not cancelled:
+                await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert len(cancelled) == 1
+
+
+def test_run_metrics_returned(models):
+    model = models('model.mps', 'x')
+    usage = ResourceUsage(user_time=1.0, system_time=0.5, max_rss=100, wall_time=2.0)
+    metrics = RunMetrics(
+        started=1.0, queue_wait=0.0, spawn_latency=0.01, wall_time=2.0,
+        returncode=0, usage=usage)
+
+    async def solve(**kwargs):
+        return Logs('solved', usage=usage, metrics=metrics)
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 1, solve=solve)
+            logs = await coordinator.solve_async(model)
+        await asyncio.gather(*tasks)
+        return logs
+
+    logs = asyncio.run(main())
+    assert logs.metrics == metrics and logs.usage == usage
+
+
+def test_plain_result_and_large_output(models):
+    model = models('model.mps', 'x')
+    output = 'line\n' * 500000
+
+    async def plain_solve(model_file, **kwargs):
+        return output
+
+    async def main():
+        async with Coordinator(host='127.0.0.1') as coordinator:
+            tasks = await start_workers(coordinator, 1, slots=2, solve=plain_solve)
+            results = await asyncio.gather(
+                coordinator.solve_async(model), coordinator.solve_async(model))
+        await asyncio.gather(*tasks)
+        return results
+
+    results = asyncio.run(main())
+    assert results == [output, output]
+    assert all(logs.worker == 'worker-0' for logs in results)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import math
+import pathlib
+import random
+
+import pytest
+
+from scip_runner import fidelity
+from scip_runner.fidelity import MultiFidelityEvaluator
+from scip_runner.logs import parse_logs
+
+
+model_easy = pathlib.Path(__file__).parent.joinpath("inst_1897027209.mps")
+stats_log = pathlib.Path(__file__).parent.joinpath("scip_stats.log")
+
+
+@pytest.fixture
+def fake_solve(monkeypatch):
+    ''' solve_async stand-in: the "statistics" of model i at time limit t
+    give a score of i + t / 100. '''
+    calls = []
+
+    async def solve_async(model_file, *, time_limit, **kwargs):
+        calls.append((model_file, time_limit, kwargs))
+        await asyncio.sleep(0)
+        return json.dumps(dict(score=model_file + time_limit / 100))
+
+    monkeypatch.setattr(fidelity, 'solve_async', solve_async)
+    monkeypatch.setattr(fidelity, 'parse_logs', json.loads)
+    return calls
+
+
+def score(statistics):
+    return statistics['score']
+
+
+def test_multi_fidelity_sequential(fake_solve):
+    evaluate = MultiFidelityEvaluator(
+        score, time_limits=[1, 10, 100], eta=2, settings_file='x.set')
+    order = [3, 1, 4, 0, 5, 9, 2, 6]
+    fitness = [asyncio.run(evaluate(i)) for i in order]
+    # Promoted when strictly fewer than n // eta of the n results so far at
+    # the rung are better: 4 (1 of 3), 5 (2 of 5), 9 (3 of 6), 6 (4 of 8);
+    # then 5 (1 of 2), 9 (1 of 3), 6 (2 of 4).
+    assert sorted(evaluate.rungs[0].results) == sorted(str(i) for i in order)
+    assert sorted(evaluate.rungs[1].results) == ['4', '5', '6', '9']
+    assert sorted(evaluate.rungs[2].results) == ['5', '6', '9']
+    assert fitness == pytest.approx([3.01, 1.01, 4.1, 0.01, 6.0, 10.0, 2.01, 7.0])
+    assert all(kwargs == dict(settings_file='x.set') for _, _, kwargs in fake_solve)
+    stats = evaluate.stats()
+    assert stats['evaluations'] == [8, 4, 3] and stats['promoted'] == [4, 3, 0]
+    assert stats['budget_fraction'] == (8 * 1 + 4 * 10 + 3 * 100) / (8 * 100)
+
+
+def test_multi_fidelity_fitness_and_model_file(fake_solve):
+    evaluate = MultiFidelityEvaluator(
+        score, time_limits=[1, 10], eta=2, fitness=lambda scores: (len(scores), scores[-1]),
+        model_file=lambda candidate: candidate['index'])
+
+    async def main():
+        return [await evaluate(dict(index=i)) for i in [0, 1]]
+
+    assert asyncio.run(main()) == [(1, 0.01), (2, 1.1)]
+
+
+def test_multi_fidelity_concurrent(fake_solve):
+    evaluate = MultiFidelityEvaluator(score, time_limits=[1, 10, 100], eta=3)
+    candidates = list(range(30))
+    random.Random(0).shuffle(candidates)
+
+    async def main():
+        return await asyncio.gather(*(evaluate(i) for i in candidates))
+
+    fitness = asyncio.run(main())
+    assert len(fitness) == 30 and evaluate.candidates == 30
+    stats = evaluate.stats()
+    assert stats['evaluations'][0] == 30
+    assert stats['evaluations'][1] < 15 and stats['evaluations'][2] < 8
+    assert stats['budget_fraction'] < 0.5
+    # The best candidate always reaches the longest limit.
+    assert fitness[candidates.index(29)] == 30.0
+
+
+def test_multi_fidelity_failed_solve(fake_solve, monkeypatch):
+    def parse_logs(logs):
+        # Candidate 2's log has no statistics, as for a killed solve.
+        statistics = json.loads(logs)
+        if statistics['score'] == 2.01:
+            raise KeyError('SCIP Status')
+        return statistics
+
+    monkeypatch.setattr(fidelity, 'parse_logs', parse_logs)
+    evaluate = MultiFidelityEvaluator(score, time_limits=[1, 10], eta=2)
+
+    async def main():
+        return [await evaluate(i) for i in [0, 1, 2, 3]]
+
+    fitness = asyncio.run(main())
+    assert fitness[2] == -math.inf
+    assert evaluate.stats()['failed'] == [1, 0]
+    assert '2' not in evaluate.rungs[1].results
+
+
+def test_multi_fidelity_validation():
+    with pytest.raises(ValueError):
+        MultiFidelityEvaluator(score, time_limits=[10, 1])
+    with pytest.raises(ValueError):
+        MultiFidelityEvaluator(score, time_limits=[1, 10], eta=1)
+
+
+def test_multi_fidelity_scip(install_fake_scip):
+    ''' Against a stand-in scip executable printing the fixture log. '''
+    install_fake_scip(f'''
+        print(open({str(stats_log)!r}).read())
+        ''')
+    evaluate = MultiFidelityEvaluator(
+        lambda statistics: statistics['timing']['total'], time_limits=[1, 5])
+    expected = parse_logs(stats_log.read_text())['timing']['total']
+    assert asyncio.run(evaluate(model_easy)) == expected
+    assert evaluate.rungs[0].solver_time > 0
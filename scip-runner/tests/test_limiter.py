@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from scip_runner import performance
+from scip_runner.solve import ConcurrencyLimiter
+
+
+def test_limiter_caps_concurrency():
+    limiter = ConcurrencyLimiter(2)
+    running = []
+    peak = []
+
+    async def task():
+        async with limiter:
+            running.append(None)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+    async def main():
+        await asyncio.gather(*(task() for _ in range(6)))
+
+    # Shared across event loops run one after another.
+    asyncio.run(main())
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert len(peak) == 12
+
+
+def test_limiter_positive():
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(0)
+
+
+def test_compare_cancels_on_failure(monkeypatch):
+    cancelled = []
+
+    async def solve_async(model_file, settings_file=None, **kwargs):
+        if settings_file == 'bad.set':
+            raise RuntimeError("solve failed")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(settings_file)
+            raise
+
+    monkeypatch.setattr(performance, 'solve_async', solve_async)
+    configs = {'slow': 'slow.set', 'bad': 'bad.set', 'other': 'other.set'}
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await performance.compare_heuristics(
+                'model.mps', configs, limiter=ConcurrencyLimiter(3))
+        # Cancelled before the error reached the caller.
+        return sorted(cancelled)
+
+    assert asyncio.run(main()) == ['other.set', 'slow.set']
+
+
+def test_compare_heuristics_parse_failure_not_written(tmp_path, monkeypatch):
+    async def solve_async(model_file, settings_file=None, **kwargs):
+        return "not a SCIP log"
+
+    monkeypatch.setattr(performance, 'solve_async', solve_async)
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(Exception):
+        asyncio.run(performance.compare_heuristics(
+            'model.mps', {'a': 'a.set'}, limiter=ConcurrencyLimiter(1)))
+    assert not (tmp_path / "log-failures").exists()
@@ -0,0 +1,53 @@
+import json
+import pathlib
+
+import pytest
+
+from scip_runner.logs import LazyStatistics, convert_simple, parse_logs, parse_logs_lazy
+from scip_runner.performance import summarise_logs, summary
+
+
+stats_log = pathlib.Path(__file__).parent.joinpath("scip_stats.log")
+stats_json = pathlib.Path(__file__).parent.joinpath("scip_stats.json")
+
+
+@pytest.fixture
+def log_data():
+    return stats_log.read_text()
+
+
+def test_parse_logs(log_data):
+    ''' Snapshot of the original line-by-line parser output. '''
+    parsed = parse_logs(log_data)
+    expected = json.loads(stats_json.read_text())
+    assert json.loads(json.dumps(parsed)) == expected
+    assert list(parsed) == list(expected)
+
+
+def test_parse_logs_lazy(log_data):
+    statistics = parse_logs_lazy(log_data)
+    assert isinstance(statistics, LazyStatistics)
+    assert statistics['timing'] is statistics['timing']
+    assert dict(statistics) == parse_logs(log_data)
+
+
+def test_summarise_logs(log_data):
+    assert summarise_logs(log_data) == summary(parse_logs(log_data))
+
+
+def test_missing_sections(log_data):
+    truncated = log_data[:log_data.index('\nB&B Tree')]
+    statistics = parse_logs_lazy(truncated)
+    assert statistics['solve_status'] == parse_logs(log_data)['solve_status']
+    with pytest.raises(KeyError):
+        statistics['tree']
+    with pytest.raises(KeyError):
+        parse_logs("SCIP version x.y.z\n")
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("12", 12), ("  -3 ", -3), ("0.50", 0.5), ("1e+20", 1e20),
+    ("  - ", None), ("abc", "abc"), ("1.2.3", "1.2.3")])
+def test_convert_simple(value, expected):
+    result = convert_simple(value)
+    assert result == expected and type(result) is type(expected)
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import pathlib
+import time
+
+import pytest
+
+from scip_runner.logs import parse_logs
+from scip_runner.metrics import RunMetrics, aggregate_metrics
+from scip_runner.pool import ResourceUsage, SolverPool
+from scip_runner.solve import solve, solve_async, solve_batch
+
+
+model_easy = pathlib.Path(__file__).parent.joinpath("inst_1897027209.mps")
+model_hard = pathlib.Path(__file__).parent.joinpath("inst_2083253852.mps")
+stats_log = pathlib.Path(__file__).parent.joinpath("scip_stats.log")
+
+
+@pytest.fixture
+def fake_scip(tmp_path, install_fake_scip):
+    ''' Stand-in scip executable: writes its pid, sleeps for the time in
+    FAKE_SCIP_SLEEP and prints the fixture log (which includes reading the
+    problem and statistics) for each model, as read from that model. '''
+    pid = tmp_path.joinpath("pid")
+    install_fake_scip(f'''
+        import os, sys, time
+        with open({str(pid)!r}, "w") as outfile:
+            outfile.write(str(os.getpid()))
+        time.sleep(float(os.environ.get("FAKE_SCIP_SLEEP", "0")))
+        for word in sys.argv[2].split():
+            if word.endswith(".mps"):
+                log = open({str(stats_log)!r}).read()
+                print(log.replace("tests/inst_1897027209.mps", word))
+        ''')
+    return pid
+
+
+def test_solve_metrics(fake_scip):
+    logs = solve(model_easy)
+    metrics = logs.metrics
+    assert metrics.returncode == 0 and not metrics.timed_out
+    assert metrics.queue_wait == 0
+    assert 0 < metrics.spawn_latency < metrics.wall_time
+    assert metrics.usage is logs.usage and metrics.usage.cpu_time > 0
+    assert metrics.scip_time == parse_logs(stats_log.read_text())['timing']['total']
+    assert metrics.overhead == metrics.wall_time - metrics.scip_time
+    assert abs(metrics.started - time.time()) < 5
+
+
+def test_solve_async_timeout_metrics(fake_scip, monkeypatch):
+    monkeypatch.setenv("FAKE_SCIP_SLEEP", "5")
+    logs = asyncio.run(solve_async(model_hard, proc_timeout=0.2))
+    assert logs.timed_out and logs.metrics.timed_out
+    assert logs.metrics.exit_signal == 9
+    assert logs.metrics.scip_time is None
+    assert logs.metrics.wall_time < 2
+
+
+def test_solve_async_cancel_kills(fake_scip, monkeypatch):
+    monkeypatch.setenv("FAKE_SCIP_SLEEP", "5")
+
+    async def main():
+        task = asyncio.ensure_future(solve_async(model_hard))
+        while not fake_scip.exists() or not fake_scip.read_text():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    pid = int(fake_scip.read_text())
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.01)
+    else:
+        pytest.fail("SCIP process still running after cancel.")
+
+
+def test_pool_queue_wait(fake_scip, monkeypatch):
+    monkeypatch.setenv("FAKE_SCIP_SLEEP", "0.2")
+    cores = sorted(os.sched_getaffinity(0))[:1]
+
+    async def main():
+        with SolverPool(cores=cores) as pool:
+            return await asyncio.gather(*(
+                solve_async(model_easy, pool=pool) for _ in range(2)))
+
+    waits = sorted(logs.metrics.queue_wait for logs in asyncio.run(main()))
+    assert waits[0] < 0.1 and waits[1] >= 0.15
+
+
+def test_batch_metrics(fake_scip):
+    job_logs = solve_batch([dict(model_file=model_easy), dict(model_file=model_hard)])
+    assert job_logs[0].metrics is job_logs[1].metrics
+    assert job_logs[0].metrics.jobs == 2
+    assert job_logs[0].metrics.scip_time == 2 * parse_logs(
+        stats_log.read_text())['timing']['total']
+    assert aggregate_metrics(job_logs)['runs'] == 1
+
+
+def test_aggregate_metrics():
+    usage = ResourceUsage(user_time=1.5, system_time=0.5, max_rss=1000, wall_time=4.0)
+    records = [
+        RunMetrics(started=100.0, queue_wait=1.0, spawn_latency=0.01, wall_time=4.0,
+                   returncode=0, usage=usage, scip_time=3.0),
+        RunMetrics(started=101.0, queue_wait=0.0, spawn_latency=0.03, wall_time=9.0,
+                   returncode=-9, timed_out=True, scip_time=None, jobs=3),
+    ]
+    summary = aggregate_metrics(records)
+    assert summary['runs'] == 2 and summary['jobs'] == 4
+    assert summary['elapsed'] == 10.0
+    assert summary['throughput'] == 0.4
+    assert summary['wall_time'] == 13.0
+    assert summary['scip_time'] == 3.0
+    assert summary['overhead'] == 1.0
+    assert summary['overhead_fraction'] == 0.25
+    assert summary['cpu_time'] == 2.0
+    assert summary['cpu_utilisation'] == 0.5
+    assert summary['max_rss'] == 1000
+    assert summary['mean_queue_wait'] == 0.5 and summary['max_queue_wait'] == 1.0
+    assert summary['mean_spawn_latency'] == pytest.approx(0.02)
+    assert summary['timeouts'] == 1 and summary['failures'] == 1
+    assert aggregate_metrics([]) == dict(runs=0, jobs=0)
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from scip_runner.pool import SolverPool, run_process, run_process_async
+
+
+def test_run_process():
+    result = run_process([sys.executable, '-c', 'print("hello")'])
+    assert result.stdout == b'hello\n'
+    assert result.returncode == 0
+    assert not result.timed_out
+    assert result.usage.cpu_time > 0
+    assert result.usage.max_rss > 0
+
+
+def test_run_process_exit_code():
+    result = run_process([sys.executable, '-c', 'import sys; sys.exit(3)'])
+    assert result.returncode == 3 and not result.timed_out
+
+
+def test_run_process_timeout():
+    start = time.monotonic()
+    result = run_process(
+        [sys.executable, '-c', 'import time; time.sleep(5)'], timeout=0.2)
+    assert result.timed_out
+    assert result.returncode < 0
+    assert time.monotonic() - start < 2
+
+
+def test_pool_pins_cores():
+    cores = sorted(os.sched_getaffinity(0))[:1]
+    with SolverPool(cores=cores) as pool:
+        result = pool.run(
+            'exec {} -c "import os; print(sorted(os.sched_getaffinity(0)))"'.format(
+                sys.executable))
+    assert result.cores == tuple(cores)
+    assert result.stdout.decode().strip() == str(cores)
+
+
+def test_pool_limits_applied_before_exec():
+    with SolverPool(cores_per_run=1, cpu_limit=30) as pool:
+        result = pool.run([
+            sys.executable, '-c',
+            'import resource; print(resource.getrlimit(resource.RLIMIT_CPU))'])
+    assert result.stdout.decode().strip() == '(30, 31)'
+
+
+def test_pool_limits_shell_command():
+    with SolverPool(cores_per_run=1, cpu_limit=30) as pool:
+        result = pool.run('exec {} -c "{}"'.format(
+            sys.executable,
+            'import resource; print(resource.getrlimit(resource.RLIMIT_CPU))'))
+    assert result.stdout.decode().strip() == '(30, 31)'
+
+
+def test_run_process_affinity_restored():
+    cores = sorted(os.sched_getaffinity(0))
+    result = run_process(
+        [sys.executable, '-c', 'import os; print(sorted(os.sched_getaffinity(0)))'],
+        affinity=cores[:1])
+    assert result.stdout.decode().strip() == str(cores[:1])
+    assert sorted(os.sched_getaffinity(0)) == cores
+
+
+def test_pool_memory_limit():
+    with SolverPool(cores_per_run=1, memory_limit=2 ** 30) as pool:
+        result = pool.run([sys.executable, '-c', 'x = bytearray(2 ** 31)'])
+    assert result.returncode != 0
+
+
+def test_pool_run_async_concurrency():
+    with SolverPool() as pool:
+        async def run_all():
+            return await asyncio.gather(*(
+                pool.run_async([sys.executable, '-c', 'pass'])
+                for _ in range(pool.concurrency + 2)))
+        results = asyncio.run(run_all())
+    assert all(result.returncode == 0 for result in results)
+
+
+def test_pool_requires_cores():
+    with pytest.raises(ValueError):
+        SolverPool(cores=[0], cores_per_run=2)
+
+
+def test_run_process_async_not_queued():
+    async def run_all():
+        return await asyncio.gather(*(
+            run_process_async([
+                sys.executable, '-c', f'import time; time.sleep(0.5); print({i})'])
+            for i in range(8)))
+
+    start = time.monotonic()
+    results = asyncio.run(run_all())
+    # All runs wait at once, however many cores there are.
+    assert time.monotonic() - start < 2
+    assert [result.stdout for result in results] == [f'{i}\n'.encode() for i in range(8)]
@@ -0,0 +1,80 @@
+import asyncio
+import math
+import random
+
+import pytest
+
+from scip_runner.racing import block_ranks, chi2_sf, friedman_test, race
+
+
+@pytest.mark.parametrize("x,df,expected", [
+    (3.2, 1, 0.07363827012030258), (3.2, 2, 0.2018965179946554),
+    (7.5, 3, 0.0575584519726364), (7.5, 4, 0.11170929281604328),
+    (12.0, 5, 0.03478778050624185), (0.5, 6, 0.9978385033102375),
+    (30.0, 9, 0.00043872177097947936), (0.0, 3, 1.0)])
+def test_chi2_sf(x, df, expected):
+    ''' Reference values from scipy.stats.chi2.sf. '''
+    assert chi2_sf(x, df) == pytest.approx(expected, rel=1e-12)
+
+
+def test_block_ranks():
+    assert block_ranks([3, 1, 2]) == [3, 1, 2]
+    assert block_ranks([1, 2, 2, 0]) == [2, 3.5, 3.5, 1]
+
+
+def test_friedman_test():
+    ''' Reference values from scipy.stats.friedmanchisquare (with ties). '''
+    result = friedman_test([[1, 2, 3, 4], [2, 1, 3, 4], [1, 3, 2, 4], [1, 2, 4, 3], [1, 2, 3, 3]])
+    assert result.statistic == pytest.approx(11.448979591836734)
+    assert result.p_value == pytest.approx(0.009530064890297474)
+    assert result.rank_sums == [6, 10, 15.5, 18.5]
+    assert friedman_test([[1, 1], [2, 2], [3, 3]]).p_value == 1.0
+
+
+def fake_compare(scale, calls):
+    ''' Comparison stand-in with configuration costs scale[name] * noise. '''
+    rng = random.Random(0)
+
+    async def compare(model_file, configs, time_limit=None, limiter=None):
+        calls.append((model_file, sorted(configs)))
+        await asyncio.sleep(0)
+        compare = {
+            name: {'primal_dual_integral': scale[name] * rng.uniform(0.8, 1.2)}
+            for name in configs}
+        return compare, {}
+
+    return compare
+
+
+def test_race_eliminates():
+    calls = []
+    scale = {'good': 1.0, 'same': 1.0, 'bad': 3.0, 'worse': 5.0}
+    result = asyncio.run(race(
+        range(20), dict.fromkeys(scale), min_rounds=5,
+        compare=fake_compare(scale, calls)))
+    assert set(result.survivors) <= {'good', 'same'}
+    assert set(result.eliminated) >= {'bad', 'worse'}
+    assert all(rounds >= 5 for rounds in result.eliminated.values())
+    assert result.runs == sum(len(names) for _, names in calls) < result.full_runs == 80
+    assert len(result.costs['bad']) == result.eliminated['bad']
+
+
+def test_race_no_difference():
+    calls = []
+    scale = {'a': 1.0, 'b': 1.0}
+    result = asyncio.run(race(
+        range(8), dict.fromkeys(scale), min_rounds=3, models_per_round=2,
+        compare=fake_compare(scale, calls), alpha=1e-6))
+    assert result.survivors == ['a', 'b']
+    assert result.runs == result.full_runs == 16
+    assert len(result.results) == 8
+
+
+def test_race_invalid_cost():
+    calls = []
+    scale = {'a': 1.0, 'b': math.nan}
+    result = asyncio.run(race(
+        range(10), dict.fromkeys(scale), min_rounds=3,
+        compare=fake_compare(scale, calls)))
+    assert result.survivors == ['a']
+    assert result.costs['b'] == [math.inf] * result.eliminated['b']
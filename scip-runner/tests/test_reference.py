@@ -0,0 +1,87 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from scip_runner.performance import compare_branching
+from scip_runner.reference import ReferenceCache, model_digest
+
+
+stats_log = pathlib.Path(__file__).parent.joinpath("scip_stats.log")
+
+
+@pytest.fixture
+def fake_scip(tmp_path, install_fake_scip):
+    ''' Stand-in scip executable: prints the fixture statistics log, writes
+    a solution file if asked and records each model solved with one. '''
+    calls = tmp_path.joinpath("calls")
+    install_fake_scip(f'''
+        import sys, time
+        words = sys.argv[2].split()
+        time.sleep(0.2)
+        if "write" in words:
+            with open({str(calls)!r}, "a") as outfile:
+                outfile.write(words[1] + "\\n")
+            with open(words[words.index("write") + 2], "w") as outfile:
+                outfile.write("objective value: 1\\n")
+        print(open({str(stats_log)!r}).read())
+        ''')
+    return calls
+
+
+@pytest.fixture
+def models(tmp_path):
+    # Identical content under different names, and a different model.
+    files = [tmp_path.joinpath(name) for name in ("a.mps", "b.mps", "c.mps")]
+    files[0].write_text("NAME a\n")
+    files[1].write_text("NAME a\n")
+    files[2].write_text("NAME c\n")
+    return files
+
+
+def test_model_digest(models):
+    assert model_digest(models[0]) == model_digest(models[1])
+    assert model_digest(models[0]) != model_digest(models[2])
+    assert model_digest(models[0], time_limit=10) != model_digest(models[0])
+
+
+def test_reference_cache(tmp_path, fake_scip, models):
+    cache = ReferenceCache(tmp_path.joinpath("cache"))
+
+    async def main():
+        return await asyncio.gather(*(cache.get(model) for model in models + models))
+
+    references = asyncio.run(main())
+    # One of the identical models a.mps, b.mps is solved, and c.mps.
+    calls = fake_scip.read_text().split()
+    assert len(calls) == 2 and str(models[2]) in calls
+    assert (cache.solves, cache.joins, cache.hits) == (2, 4, 0)
+    assert references[0] is references[1]
+    assert references[0].solution_file.exists()
+    assert references[0].statistics['solve_status'] == 'problem is solved [optimal solution found]'
+
+    # Reused from disk by a new cache (e.g. a later run).
+    cache = ReferenceCache(tmp_path.joinpath("cache"))
+    reference = asyncio.run(cache.get(models[1]))
+    assert (cache.solves, cache.hits) == (0, 1)
+    assert reference.logs == references[0].logs
+    assert len(fake_scip.read_text().split()) == 2
+    assert not list(tmp_path.joinpath("cache").glob("*.tmp"))
+
+
+def test_compare_branching_cached(tmp_path, fake_scip, models):
+    cache = ReferenceCache(tmp_path.joinpath("cache"))
+    configs = {'pscost': None}
+
+    async def main():
+        return await asyncio.gather(*(
+            compare_branching(models[0], configs, reference_cache=cache)
+            for _ in range(3)))
+
+    results = asyncio.run(main())
+    asyncio.run(compare_branching(models[0], configs, reference_cache=cache))
+    assert fake_scip.read_text().split() == [str(models[0])]
+    assert (cache.solves, cache.joins, cache.hits) == (1, 2, 1)
+    for compare, data in results:
+        assert set(compare) == {'pscost'}
+        assert data['default_logs'] == data['pscost_logs']
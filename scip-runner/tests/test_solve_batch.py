@@ -0,0 +1,95 @@
+import asyncio
+import pathlib
+import shlex
+
+import pytest
+
+from scip_runner.solve import _batch_command, _command, solve_batch, solve_batch_async
+
+
+model_easy = pathlib.Path(__file__).parent.joinpath("inst_1897027209.mps")
+model_hard = pathlib.Path(__file__).parent.joinpath("inst_2083253852.mps")
+
+
+@pytest.fixture
+def fake_scip(install_fake_scip):
+    ''' Stand-in scip executable: reports reading each file (solution files
+    as problems too, as SCIP does), and prints a status line for each
+    optimize command. Files named bad.mps fail to read, after which the
+    remaining commands are dropped. '''
+    install_fake_scip('''
+        import sys
+        print("SCIP version x.y.z")
+        words = sys.argv[2].split()
+        for i, word in enumerate(words):
+            if word == "read":
+                print()
+                if words[i + 1].endswith("bad.mps"):
+                    print("error reading file <" + words[i + 1] + ">")
+                    break
+                print("read problem <" + words[i + 1] + ">")
+                print("============")
+            if word == "optimize":
+                print("SCIP Status        : problem is solved [optimal solution found]")
+        ''')
+
+
+def test_batch_command():
+    command = _batch_command([
+        dict(model_file=model_easy, time_limit=10),
+        dict(model_file=model_hard)])
+    assert command.count("set default") == 2
+    assert command.count("optimize") == 2
+    assert command.count("set limits time 10") == 1
+    assert command.endswith(" quit'")
+
+
+def test_command_quoting(tmp_path):
+    model = tmp_path.joinpath("it's.mps")
+    model.write_text("NAME x\n")
+    words = shlex.split(_command(model, time_limit="1'; touch injected; '"))
+    assert words[:2] == ["scip", "-c"] and len(words) == 3
+    # Each value is one word of the SCIP script.
+    script = shlex.split(words[2])
+    assert script[:2] == ["read", str(model)]
+    assert script[2:6] == ["set", "limits", "time", "1'; touch injected; '"]
+    assert script[6] == "set"
+
+
+def test_solve_batch(fake_scip):
+    jobs = [dict(model_file=model_easy), dict(model_file=model_hard), dict(model_file=model_easy)]
+    logs = solve_batch(jobs)
+    assert len(logs) == 3
+    assert logs[0].startswith("SCIP version")
+    for job, job_logs in zip(jobs, logs):
+        assert f"read problem <{job['model_file']}>" in job_logs
+        assert job_logs.count("SCIP Status") == 1
+
+
+def test_solve_batch_solution_file(fake_scip, tmp_path):
+    solution = tmp_path.joinpath("start.sol")
+    solution.write_text("objective value: 1\n")
+    jobs = [
+        dict(model_file=model_easy, read_solution_file=solution),
+        dict(model_file=model_hard)]
+    logs = solve_batch(jobs)
+    assert f"read problem <{model_easy}>" in logs[0]
+    assert f"read problem <{solution}>" in logs[0]
+    assert logs[1].startswith(f"read problem <{model_hard}>")
+    assert [job_logs.count("SCIP Status") for job_logs in logs] == [1, 1]
+
+
+def test_solve_batch_failed_read(fake_scip, tmp_path):
+    bad = tmp_path.joinpath("bad.mps")
+    bad.write_text("NAME bad\n")
+    jobs = [dict(model_file=model_easy), dict(model_file=bad), dict(model_file=model_hard)]
+    logs = solve_batch(jobs)
+    assert logs[0].count("SCIP Status") == 1 and str(bad) not in logs[0]
+    assert logs[1].startswith(f"error reading file <{bad}>")
+    assert logs[2] == ""
+
+
+def test_solve_batch_async(fake_scip):
+    jobs = [dict(model_file=model_easy), dict(model_file=model_hard)]
+    logs = asyncio.run(solve_batch_async(jobs))
+    assert [job_logs.count("SCIP Status") for job_logs in logs] == [1, 1]
@@ -0,0 +1,68 @@
+import asyncio
+import pathlib
+import time
+
+import pytest
+
+from scip_runner.logs import ProgressParser
+from scip_runner.solve import solve_async
+
+
+model_easy = pathlib.Path(__file__).parent.joinpath("inst_1897027209.mps")
+
+HEADER = (
+    " time | node  | left  |LP iter|LP it/n|mem/heur|mdpt |vars |cons |rows |cuts "
+    "|sepa|confs|strbr|  dualbound   | primalbound  |  gap   | compl. ")
+ROW = (
+    " {time:.1f}s|{nodes:6} |     0 |   123 |   4.5 |  1234k |   4 |  50 | 100 | 100 "
+    "|   0 |  0 |   0 |   0 | 1.000000e+02 | 9.000000e+01 |  11.11%| unknown")
+
+
+@pytest.fixture
+def fake_scip(install_fake_scip):
+    ''' Stand-in scip executable: prints a display row every 10ms and reports
+    statistics when interrupted (as SCIP does on SIGINT). '''
+    install_fake_scip(f'''
+        import signal, sys, time
+        def interrupt(*args):
+            print("SCIP Status        : solving was interrupted [user interrupt]", flush=True)
+            sys.exit(0)
+        signal.signal(signal.SIGINT, interrupt)
+        print({HEADER!r}, flush=True)
+        for nodes in range(1, 1000):
+            print({ROW!r}.format(time=nodes / 100, nodes=nodes), flush=True)
+            time.sleep(0.01)
+        ''')
+
+
+def test_progress_parser():
+    parser = ProgressParser()
+    assert not parser.feed(HEADER)
+    assert parser.feed(ROW.format(time=1.5, nodes=10))
+    assert parser.progress.nodes == 10
+    assert parser.progress.time == 1.5
+    assert parser.progress.dual_bound == 100
+    assert parser.progress.primal_bound == 90
+    assert parser.progress.gap == 11.11
+    assert not parser.feed("SCIP Status        : problem is solved [optimal solution found]")
+
+
+def test_solve_async_early_stop(fake_scip):
+    updates = []
+    logs = asyncio.run(solve_async(
+        model_easy, on_progress=updates.append,
+        early_stop=lambda progress: progress.nodes >= 5))
+    assert logs.stopped
+    assert not logs.timed_out
+    assert logs.progress.nodes == 5
+    assert "user interrupt" in logs
+    assert [progress.nodes for progress in updates] == [1, 2, 3, 4, 5]
+
+
+def test_solve_async_stream_timeout(fake_scip):
+    start = time.monotonic()
+    logs = asyncio.run(solve_async(model_easy, stream=True, proc_timeout=0.2))
+    assert time.monotonic() - start < 1
+    assert logs.timed_out
+    assert logs.progress.nodes > 0
+    assert "user interrupt" in logs
@@ -0,0 +1,112 @@
+import math
+import multiprocessing
+import pathlib
+
+import pytest
+
+from scip_runner.logs import parse_logs
+from scip_runner.performance import store_comparison
+from scip_runner.store import ResultStore, flatten
+
+
+stats_log = pathlib.Path(__file__).parent.joinpath("scip_stats.log")
+
+
+def test_flatten():
+    assert flatten({'a': 1, 'b': {'c': 2, 'd': {'e': 'x'}}}) == {
+        'a': 1, 'b.c': 2, 'b.d.e': 'x'}
+
+
+def test_round_trip(tmp_path):
+    logs = stats_log.read_text()
+    parsed = parse_logs(logs)
+    store = ResultStore(tmp_path)
+    assert store.append(dict(model='a.mps', **parsed), logs) == 0
+    assert store.append(dict(model='b.mps', **parsed)) == 1
+    assert len(store) == 2
+    flat = flatten(parsed)
+    assert set(store.columns()) == set(flat) | {'model'}
+    columns = store.load('timing.solving', 'tree.nodes', 'solve_status', 'model')
+    assert list(columns['timing.solving']) == [flat['timing.solving']] * 2
+    assert list(columns['tree.nodes']) == [flat['tree.nodes']] * 2
+    assert columns['solve_status'] == [flat['solve_status']] * 2
+    assert columns['model'] == ['a.mps', 'b.mps']
+    assert store.logs(0) == logs
+    assert store.logs(-1) is None
+    with pytest.raises(IndexError):
+        store.logs(2)
+    with pytest.raises(KeyError):
+        store.column('missing')
+
+
+def test_missing_and_new_columns(tmp_path):
+    store = ResultStore(tmp_path)
+    store.extend([{'x': 1}, {'x': 2, 'y': 'a'}])
+    store.append({'y': 'b', 'z': 3.5})
+    assert list(store.column('x'))[:2] == [1, 2]
+    assert math.isnan(store.column('x')[2])
+    assert store.column('y') == [None, 'a', 'b']
+    assert math.isnan(store.column('z')[0])
+    assert store.column('z')[2] == 3.5
+
+
+def test_column_type_change(tmp_path):
+    store = ResultStore(tmp_path)
+    store.extend([{'x': 1}, {}])
+    store.append({'x': 'text'})
+    assert store.column('x') == [1.0, None, 'text']
+    assert [file.suffix for file in tmp_path.joinpath('columns').iterdir()] == ['.jsonl']
+
+
+def test_interrupted_append(tmp_path):
+    store = ResultStore(tmp_path)
+    store.extend([{'x': 1, 'y': 'a'}], logs=['log'])
+    # Partial writes from a writer which died before committing the index.
+    tmp_path.joinpath('pending').touch()
+    with open(tmp_path.joinpath('columns', 'x.f64'), 'ab') as outfile:
+        outfile.write(b'\0' * 12)
+    with open(tmp_path.joinpath('columns', 'y.jsonl'), 'a') as outfile:
+        outfile.write('"b"\n"c')
+    with open(tmp_path.joinpath('logs.blob'), 'ab') as outfile:
+        outfile.write(b'garbage')
+    assert len(store) == 1
+    assert store.column('y') == ['a']
+    store.append({'x': 2, 'y': 'd'}, 'more')
+    assert list(store.column('x')) == [1, 2]
+    assert store.column('y') == ['a', 'd']
+    assert [store.logs(0), store.logs(1)] == ['log', 'more']
+
+
+def append_rows(path, worker, count):
+    store = ResultStore(path)
+    for i in range(count):
+        store.append({'worker': worker, 'i': i, 'name': f'{worker}-{i}'}, f'log {worker}-{i}')
+
+
+def test_concurrent_append(tmp_path):
+    processes = [
+        multiprocessing.Process(target=append_rows, args=(tmp_path, worker, 20))
+        for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    store = ResultStore(tmp_path)
+    assert len(store) == 80
+    columns = store.load('worker', 'i', 'name')
+    rows = list(zip(columns['worker'], columns['i'], columns['name']))
+    assert sorted(rows) == sorted(
+        (worker, i, f'{worker}-{i}') for worker in range(4) for i in range(20))
+    assert all(
+        store.logs(row) == f'log {name}' for row, name in enumerate(columns['name']))
+
+
+def test_store_comparison(tmp_path):
+    logs = stats_log.read_text()
+    parsed = parse_logs(logs)
+    data = {'default_logs': logs, 'default': parsed, 'pscost_logs': logs, 'pscost': parsed}
+    store = ResultStore(tmp_path)
+    assert list(store_comparison(store, data, model='a.mps')) == [0, 1]
+    assert store.load('model', 'config') == {
+        'model': ['a.mps', 'a.mps'], 'config': ['default', 'pscost']}
+    assert store.logs(1) == logs
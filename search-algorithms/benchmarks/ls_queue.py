@@ -0,0 +1,45 @@
+''' LS queue size and push/pop cost over a long run of hybrid GA style
+traffic (each evaluation pushes a task, about half pop one), for a plain
+heap against LSQueue with merging and a capacity.
+
+    python benchmarks/ls_queue.py [operations]
+'''
+
+import heapq
+import random
+import sys
+import time
+
+from search_algorithms.hybrid_ga import LSQueue, LSTask
+
+
+def traffic(operations, seed=0):
+    rng = random.Random(seed)
+    bases = [tuple(rng.randint(0, 1) for _ in range(16)) for _ in range(50000)]
+    return [
+        (LSTask(priority=-sum(base), base=base, base_fitness=sum(base),
+                solution=None), rng.random() < 0.5)
+        for base in rng.choices(bases, k=operations)]
+
+
+def main(operations=1000000):
+    operations = traffic(operations)
+    heap = []
+    start = time.perf_counter()
+    for task, pop in operations:
+        heapq.heappush(heap, task)
+        if pop:
+            heapq.heappop(heap)
+    print(f"heap:    {time.perf_counter() - start:6.2f}s  size {len(heap)}")
+    queue = LSQueue(capacity=1000)
+    start = time.perf_counter()
+    for task, pop in operations:
+        queue.push(task)
+        if pop and len(queue):
+            queue.pop()
+    print(f"LSQueue: {time.perf_counter() - start:6.2f}s  size {len(queue)}  "
+          f"merged {queue.merged}  evicted {queue.evicted}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,49 @@
+''' Time dispatch overhead of map_async_workers with a trivial evaluation,
+against the original list-scanning worker (O(N) per dispatch).
+
+    python benchmarks/map_async_workers.py [max_tasks]
+'''
+
+import asyncio
+import sys
+import time
+
+from search_algorithms.utils import map_async_workers
+
+
+async def scan_map(evaluate, instances, *, workers):
+    queue = [{'file_name': item, 'result': None} for item in instances]
+
+    async def worker():
+        while True:
+            try:
+                item = next(item for item in queue if item['result'] is None)
+            except StopIteration:
+                return
+            item['result'] = 'pending'
+            item['result'] = await evaluate(item['file_name'])
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return [item['result'] for item in queue]
+
+
+async def evaluate(instance):
+    await asyncio.sleep(0)
+    return instance
+
+
+def main(max_tasks=20000):
+    for tasks in (1000, 5000, 20000):
+        if tasks > max_tasks:
+            break
+        line = f"{tasks:>6} tasks:"
+        for name, function in [('queue', map_async_workers), ('scan', scan_map)]:
+            start = time.perf_counter()
+            results = asyncio.run(function(evaluate, range(tasks), workers=32))
+            assert results == list(range(tasks))
+            line += f" {name} {time.perf_counter() - start:7.3f}s"
+        print(line)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
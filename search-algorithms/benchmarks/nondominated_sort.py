@@ -0,0 +1,51 @@
+''' Time non-dominated sorting for random populations of increasing size,
+against the original peel-off sort (split_dominated) for small sizes.
+
+    python benchmarks/nondominated_sort.py [max_size]
+'''
+
+import sys
+import time
+
+import numpy as np
+
+from search_algorithms.nsga2 import nondominated_sort, split_dominated
+
+
+def peel_sort(population, key):
+    ranks = []
+    remaining = list(population)
+    while remaining:
+        remaining, nondominated = split_dominated(remaining, key)
+        ranks.append(nondominated)
+    return ranks
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(max_size=10000):
+    rng = np.random.default_rng(0)
+    for dimensions in (2, 3):
+        for size in (100, 300, 1000, 3000, 10000):
+            if size > max_size:
+                break
+            population = [
+                {'objective': tuple(vector)}
+                for vector in rng.integers(0, 100, size=(size, dimensions))]
+            fronts, elapsed = timed(nondominated_sort, population, 'objective')
+            line = (
+                f"M={dimensions} N={size:>5}: {elapsed:8.4f}s "
+                f"({len(fronts)} fronts)")
+            if size <= 1000:
+                reference, reference_elapsed = timed(peel_sort, population, 'objective')
+                assert reference == fronts
+                line += f", peel-off {reference_elapsed:8.3f}s"
+            print(line)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,37 @@
+''' Time NSGA-II elite selection (non-dominated ranking, crowding distance
+and truncation) on random populations of dict individuals.
+
+    python benchmarks/nsga2_elites.py [max_size]
+'''
+
+import sys
+import time
+
+import numpy as np
+
+from search_algorithms.nsga2 import nsga2_elites, nsga2_selection
+
+
+def main(max_size=10000):
+    rng = np.random.default_rng(0)
+    for dimensions in (2, 3):
+        for size in (100, 1000, 10000):
+            if size > max_size:
+                break
+            objectives = rng.random((2 * size, dimensions))
+            population = [
+                {'instance': None, 'objective': tuple(vector)}
+                for vector in objectives]
+            start = time.perf_counter()
+            nsga2_elites(population, size, 'objective')
+            dicts = time.perf_counter() - start
+            start = time.perf_counter()
+            nsga2_selection(objectives, size)
+            arrays = time.perf_counter() - start
+            print(
+                f"M={dimensions} 2N={2 * size:>5}: dicts {dicts:8.4f}s, "
+                f"arrays {arrays:8.4f}s")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,53 @@
+''' Compare ProcessPoolEvaluator against one pool submit per evaluation for
+many small evaluations, and against pickling for large array instances.
+
+    python benchmarks/process_pool_evaluator.py
+'''
+
+import asyncio
+import concurrent.futures
+import time
+
+import numpy as np
+
+from search_algorithms.evaluators import ProcessPoolEvaluator
+from search_algorithms.utils import map_async_workers
+
+
+def small(x):
+    return sum(x)
+
+
+def large(A):
+    return float(A[::1000].sum())
+
+
+def timed(function, instances, **kwargs):
+    with ProcessPoolEvaluator(function, processes=4, **kwargs) as evaluate:
+        asyncio.run(map_async_workers(evaluate, instances[:8], workers=8))
+        start = time.perf_counter()
+        asyncio.run(map_async_workers(evaluate, instances, workers=64))
+        return time.perf_counter() - start
+
+
+def timed_submit(function, instances):
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        async def evaluate(instance):
+            return await asyncio.wrap_future(executor.submit(function, instance))
+        asyncio.run(map_async_workers(evaluate, instances[:8], workers=8))
+        start = time.perf_counter()
+        asyncio.run(map_async_workers(evaluate, instances, workers=64))
+        return time.perf_counter() - start
+
+
+def main():
+    instances = [list(range(10))] * 20000
+    print(f"20000 small: submit {timed_submit(small, instances):.3f}s "
+          f"batched {timed(small, instances):.3f}s")
+    instances = [np.random.random(2_000_000) for _ in range(32)]
+    print(f"32 x 16MB:   submit {timed_submit(large, instances):.3f}s "
+          f"shared {timed(large, instances):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
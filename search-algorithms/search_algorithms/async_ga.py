@@ -5,10 +5,14 @@ currently available results. No local search is implemented.
 '''
 
 import asyncio
+import contextlib
 import dataclasses
+import functools
 import time
 import typing
 
+from .common import merge_immigrants, population_job
+
 
 @dataclasses.dataclass
 class Queue:
@@ -17,6 +21,14 @@ class Queue:
     best_solution: typing.Any
     tasks_issued: int
     total_evals: int
+    cache: typing.Any = None
+    # Evaluated solutions received from other islands, merged into the
+    # results when the next population is built.
+    immigrants: typing.List = dataclasses.field(default_factory=list)
+    # Next population being computed in an executor, if any.
+    next_population: typing.Any = None
+    # Set when a result is added (for workers with nothing to do).
+    result_added: typing.Any = dataclasses.field(default_factory=asyncio.Event)
 
     def print_state(self, elapsed):
         print(
@@ -25,15 +37,50 @@ class Queue:
             f"Fittest: {self.best_solution[1]}  "
             f"Issued: {self.tasks_issued}  "
             f"Pending: {len(self.ga_queue)}  "
-            f"Completed: {len(self.ga_results)}")
+            f"Completed: {len(self.ga_results)}"
+            + (f"  {self.cache.describe()}" if self.cache is not None else ""))
+
+
+def start_next_population(queue, next_population, executor, rstate=None):
+    ''' Compute the next population from the results so far in :executor
+    (default: the loop's thread pool), so that crossover and selection do not
+    block the event loop. When done, the new solutions are queued behind any
+    remaining ones. See common.population_job for the use of :rstate. '''
+    results, queue.ga_results = queue.ga_results, []
+    results, queue.immigrants = merge_immigrants(results, queue.immigrants), []
+    future = asyncio.get_running_loop().run_in_executor(
+        executor, population_job(next_population, results, rstate))
+    future.add_done_callback(functools.partial(install_population, queue))
+    queue.next_population = future
 
 
-async def worker(queue, *, evaluate, next_population, task_limit):
+def install_population(queue, future):
+    ''' Queue the population computed by :future, once. '''
+    if queue.next_population is future and future.done():
+        if future.cancelled() or future.exception() is not None:
+            return
+        queue.ga_queue[:0] = future.result()
+        queue.next_population = None
+
+
+async def worker(queue, *, evaluate, next_population, task_limit, executor=None,
+                 prefetch=0, rstate=None):
     while queue.tasks_issued < task_limit:
-        # Get task to do. Asynchronously update population first if necessary.
+        # Get task to do. Start computing the next population when at most
+        # :prefetch solutions remain, and wait for it if none remain.
+        if (queue.next_population is None and queue.ga_results
+                and len(queue.ga_queue) <= prefetch):
+            start_next_population(queue, next_population, executor, rstate)
         if len(queue.ga_queue) == 0:
-            queue.ga_queue = next_population(queue.ga_results)
-            queue.ga_results = []
+            if queue.next_population is not None:
+                future = queue.next_population
+                await future
+                install_population(queue, future)
+            else:
+                # Everything is being evaluated: wait for a result.
+                queue.result_added.clear()
+                await queue.result_added.wait()
+            continue
         solution = queue.ga_queue.pop()
         # Evaluate fitness on worker.
         fitness = await evaluate(solution)
@@ -42,6 +89,7 @@ async def worker(queue, *, evaluate, next_population, task_limit):
         if queue.best_solution is None or fitness > queue.best_solution[1]:
             queue.best_solution = solution, fitness
         queue.ga_results.append(dict(solution=solution, fitness=fitness))
+        queue.result_added.set()
         queue.tasks_issued += 1
 
 
@@ -51,14 +99,38 @@ async def monitor(queue, start, log_seconds):
         queue.print_state(time.monotonic() - start)
 
 
-async def run(*, population, workers, log_seconds, **kwargs):
+async def run(*, population, workers, log_seconds, cache=None, background=None,
+              prefetch=0, **kwargs):
+    ''' Run the asynchronous GA with :workers concurrent evaluations. If a
+    :cache (cache.FitnessCache) is given, repeated solutions are not
+    re-evaluated and its statistics are included in the reports. An optional
+    :background coroutine function is called with the Queue and run
+    alongside the workers until they finish (e.g. islands.migrate).
+
+    next_population is run in an executor (keyword argument executor,
+    default: the loop's thread pool). It is started when :prefetch solutions
+    (default: none) remain queued, using the results available
+    then, so the queue does not run dry while it is computed (as with the
+    original GA, populations are sized by the results available, so a large
+    :prefetch makes them smaller). Given a seeded random.Random as keyword
+    argument rstate, a next_population accepting keyword rstate is passed
+    its own generator seeded from it, as the executor must not share a
+    generator with the event loop for runs to be reproducible. '''
     queue = Queue(
         ga_queue=population, ga_results=[],
-        best_solution=None, tasks_issued=0, total_evals=0)
+        best_solution=None, tasks_issued=0, total_evals=0, cache=cache)
+    if cache is not None:
+        kwargs['evaluate'] = cache.wrap(kwargs['evaluate'])
     start = time.monotonic()
     asyncio.ensure_future(monitor(queue, start, log_seconds))
+    if background is not None:
+        background = asyncio.ensure_future(background(queue))
     await asyncio.gather(*(
-        worker(queue, **kwargs)
+        worker(queue, prefetch=prefetch, **kwargs)
         for _ in range(workers)))
+    if background is not None:
+        background.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await background
     queue.print_state(time.monotonic() - start)
     return queue
@@ -0,0 +1,195 @@
+''' Fitness memoisation for the GA drivers. Solutions which come back
+through elitism, crossover or local search (common for binary encodings) and
+instances with identical contents are evaluated once. '''
+
+import asyncio
+import collections
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+import time
+import weakref
+
+import numpy as np
+
+
+# Digests of recently hashed files: absolute path -> (stat signature,
+# digest, time hashed). A digest taken within RACY_NS of the file's
+# modification time is not trusted (as for git's racily clean entries): the
+# file may have been changed again within the filesystem's timestamp
+# granularity without its signature changing.
+DIGEST_MEMO_SIZE = 4096
+RACY_NS = 10 ** 9
+_digests = collections.OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _memoised_digest(path, signature):
+    with _digests_lock:
+        entry = _digests.get(path)
+        if entry is None or entry[0] != signature or entry[2] - signature[0] < RACY_NS:
+            return None
+        _digests.move_to_end(path)
+        return entry[1]
+
+
+def file_digest(path):
+    ''' sha256 of the contents of the file at :path. Digests are memoised by
+    path, modification time and size, so a file is only read again once it
+    has changed. '''
+    path = os.path.abspath(path)
+    signature = _signature(path)
+    digest = _memoised_digest(path, signature)
+    if digest is not None:
+        return digest
+    hashed = time.time_ns()
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(functools.partial(infile.read, 1 << 20), b''):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    with _digests_lock:
+        _digests[path] = signature, digest, hashed
+        _digests.move_to_end(path)
+        if len(_digests) > DIGEST_MEMO_SIZE:
+            _digests.popitem(last=False)
+    return digest
+
+
+def _file_path(solution):
+    ''' :solution as a path if it is one (a str only if it names an existing
+    file), otherwise None. '''
+    if isinstance(solution, os.PathLike):
+        return solution
+    if isinstance(solution, str) and os.path.isfile(solution):
+        return solution
+    return None
+
+
+def solution_key(solution):
+    ''' Default cache key. Hashable solutions (e.g. tuples of bits) are their
+    own key; paths (including str paths of existing files) are keyed by file
+    contents, arrays by dtype, shape and contents, and anything else by the
+    hash of its pickle. '''
+    path = _file_path(solution)
+    if path is not None:
+        return ('file', file_digest(path))
+    if isinstance(solution, np.ndarray):
+        return ('array', solution.dtype.str, solution.shape,
+                _digest(np.ascontiguousarray(solution).tobytes()))
+    try:
+        hash(solution)
+    except TypeError:
+        return ('pickle', _digest(pickle.dumps(solution, protocol=5)))
+    return solution
+
+
+async def solution_key_async(solution):
+    ''' solution_key for use on the event loop: files which have not been
+    hashed since they last changed are hashed in an executor thread. '''
+    path = _file_path(solution)
+    if path is not None:
+        absolute = os.path.abspath(path)
+        if _memoised_digest(absolute, _signature(absolute)) is None:
+            loop = asyncio.get_running_loop()
+            return ('file', await loop.run_in_executor(None, file_digest, absolute))
+    return solution_key(solution)
+
+
+class FitnessCache(object):
+    ''' Fitness values keyed by :key(solution) (a function or coroutine
+    function; default solution_key_async), keeping at most :maxsize entries (least recently used are dropped;
+    default unbounded).
+
+    Concurrent requests for the same solution (in one event loop) share a
+    single evaluation: the first starts it and the rest wait on its result.
+    The evaluation is cancelled if all of its waiters are cancelled. Failed
+    evaluations are not cached. Counters: hits (found in the cache),
+    joins (waited on an evaluation in progress), misses (evaluations
+    started). '''
+
+    def __init__(self, key=solution_key_async, maxsize=None):
+        self.key = key
+        self.maxsize = maxsize
+        self.hits = 0
+        self.joins = 0
+        self.misses = 0
+        self._values = collections.OrderedDict()
+        # Futures belong to one event loop; keep in-flight evaluations per loop.
+        self._in_flight = weakref.WeakKeyDictionary()
+
+    def __len__(self):
+        return len(self._values)
+
+    def _store(self, key, value):
+        self._values[key] = value
+        if self.maxsize is not None and len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+    async def get(self, evaluate, solution):
+        ''' Return the fitness of :solution, awaiting :evaluate(solution) if
+        it is neither cached nor being evaluated. '''
+        loop = asyncio.get_running_loop()
+        key = self.key(solution)
+        if inspect.isawaitable(key):
+            key = await key
+        if key in self._values:
+            self.hits += 1
+            self._values.move_to_end(key)
+            return self._values[key]
+        in_flight = self._in_flight.setdefault(loop, {})
+        if key in in_flight:
+            self.joins += 1
+        else:
+            self.misses += 1
+            task = loop.create_task(evaluate(solution))
+            in_flight[key] = [task, 0]
+
+            def done(task):
+                del in_flight[key]
+                if not task.cancelled() and task.exception() is None:
+                    self._store(key, task.result())
+
+            task.add_done_callback(done)
+        entry = in_flight[key]
+        entry[1] += 1
+        # Shielded: a cancelled waiter does not cancel the evaluation for
+        # others, but it is cancelled once nobody is waiting for it.
+        try:
+            return await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            entry[1] -= 1
+            if entry[1] == 0:
+                entry[0].cancel()
+            raise
+
+    def wrap(self, evaluate):
+        ''' Cached version of the :evaluate coroutine function. '''
+        return functools.partial(self.get, evaluate)
+
+    def stats(self):
+        requests = self.hits + self.joins + self.misses
+        return dict(
+            requests=requests, hits=self.hits, joins=self.joins,
+            misses=self.misses, saved=self.hits + self.joins,
+            hit_rate=(self.hits + self.joins) / requests if requests else None,
+            size=len(self._values))
+
+    def describe(self):
+        stats = self.stats()
+        return (
+            f"Cache hits: {stats['hits']}  "
+            f"Cache joins: {stats['joins']}  "
+            f"Evaluated: {stats['misses']}")
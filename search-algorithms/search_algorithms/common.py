@@ -1,8 +1,11 @@
 ''' Library of crossover, neighbourhood, selection and generation progression
 operators for binary encoded problems. '''
 
+import functools
+import inspect
 import itertools
 import operator
+import random
 
 
 def create_neighbour(solution, rstate):
@@ -43,10 +46,14 @@ def uniform_crossover(a, b, rstate):
     return tuple(c1), tuple(c2)
 
 
-def new_population(results, *, select, crossover, create_random):
+def new_population(results, *, select, crossover, create_random, rstate=None):
     ''' Create a new population given :results, a list of dicts with
     'solution' and 'fitness' keys. Uses 10% elitism + 10% random +
-    80% random crossover. '''
+    80% random crossover. If :rstate is given, it is passed as keyword
+    argument rstate to :select, :crossover and :create_random (overriding
+    any bound with functools.partial), as the GA drivers do to give each
+    population its own random generator. '''
+    kwargs = {} if rstate is None else dict(rstate=rstate)
     n_elite = int(round(len(results) * 0.2))
     n_random = int(round(len(results) * 0.2))
     population = [
@@ -54,12 +61,43 @@ def new_population(results, *, select, crossover, create_random):
         for entry in itertools.islice(
             reversed(sorted(results, key=operator.itemgetter('fitness'))),
             n_elite)]
-    population.extend([create_random() for _ in range(n_random)])
+    population.extend([create_random(**kwargs) for _ in range(n_random)])
     while len(population) < len(results):
-        a, b = crossover(select(results), select(results))
+        a, b = crossover(select(results, **kwargs), select(results, **kwargs), **kwargs)
         population.extend([a, b])
     return population
 
 
+def merge_immigrants(results, immigrants):
+    ''' :results (dicts as for new_population) with :immigrants competing for
+    their places: the len(results) fittest of both are kept, so populations
+    built from them keep their size. '''
+    if not immigrants:
+        return results
+    merged = sorted(results + immigrants, key=operator.itemgetter('fitness'), reverse=True)
+    return merged[:len(results)]
+
+
+def population_job(next_population, results, rstate=None):
+    ''' Call of :next_population on :results for the GA drivers to run in an
+    executor. If :rstate is given and :next_population accepts a keyword
+    argument rstate (e.g. new_population), it is passed a new generator
+    seeded from :rstate, so that the job does not share :rstate with the
+    event loop; other functions are called with :results only. '''
+    job = functools.partial(next_population, results)
+    if rstate is None:
+        return job
+    try:
+        parameters = inspect.signature(next_population).parameters.values()
+    except (TypeError, ValueError):
+        return job
+    if any((parameter.name == 'rstate'
+            and parameter.kind != parameter.POSITIONAL_ONLY)
+           or parameter.kind == parameter.VAR_KEYWORD
+           for parameter in parameters):
+        job = functools.partial(job, rstate=random.Random(rstate.getrandbits(64)))
+    return job
+
+
 def random_solution(rstate, n, p=0.5):
     return tuple(int(rstate.uniform(0, 1) < p) for _ in range(n))
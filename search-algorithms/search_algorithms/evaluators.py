@@ -0,0 +1,168 @@
+''' Adapters turning plain (CPU bound) fitness functions into the evaluate
+coroutines expected by the GA drivers, so that evaluations run in parallel
+instead of on the event loop thread. '''
+
+import asyncio
+import concurrent.futures
+import functools
+import math
+import os
+import pickle
+from multiprocessing import shared_memory
+
+
+_function = None
+
+
+def _init_worker(function):
+    global _function
+    _function = function
+
+
+def _encode(solution, threshold):
+    ''' Pickle :solution with out-of-band buffers (e.g. contiguous numpy
+    arrays). If the buffers total at least :threshold bytes they are copied
+    into a shared memory segment rather than sent through the pool's pipe.
+    Returns the payload to send and the segment (or None). '''
+    buffers = []
+    data = pickle.dumps(solution, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    size = sum(raw.nbytes for raw in raws)
+    if size < threshold or size == 0:
+        return (data, None, [bytearray(raw) for raw in raws]), None
+    segment = shared_memory.SharedMemory(create=True, size=size)
+    offsets = []
+    position = 0
+    for raw in raws:
+        segment.buf[position:position + raw.nbytes] = raw
+        offsets.append((position, raw.nbytes))
+        position += raw.nbytes
+    return (data, segment.name, offsets), segment
+
+
+def _evaluate(payload):
+    data, name, buffers = payload
+    if name is None:
+        return _function(pickle.loads(data, buffers=buffers))
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        views = [segment.buf[start:start + size] for start, size in buffers]
+        solution = pickle.loads(data, buffers=views)
+        del views
+        return _function(solution)
+    finally:
+        solution = None
+        try:
+            segment.close()
+        except BufferError:
+            # The function kept a reference into the segment; it is freed
+            # when that is released (the parent unlinks the name).
+            pass
+
+
+def _evaluate_batch(payloads):
+    ''' Evaluate a batch in a pool process, returning (ok, value) pairs so
+    that one failure does not lose the other results. '''
+    results = []
+    for payload in payloads:
+        try:
+            results.append((True, _evaluate(payload)))
+        except Exception as error:
+            results.append((False, error))
+    return results
+
+
+class ProcessPoolEvaluator(object):
+    ''' Awaitable wrapper around a picklable fitness :function, evaluated in
+    a pool of :processes worker processes (default: one per cpu):
+
+        with ProcessPoolEvaluator(fitness) as evaluate:
+            result = await hybrid_ga.run(evaluate=evaluate, ...)
+
+    Calls made in the same event loop iteration (e.g. by concurrent GA
+    workers) are grouped into batches, one per process up to :batch_size
+    solutions each, so small evaluations do not pay one round trip each.
+    Solutions holding at least :shared_memory_threshold bytes of array data
+    pass that data through shared memory instead of the pool's pipes.
+    Errors raised by the function are raised to the caller.
+
+    Counters: evaluations, batches, shared (solutions sent through shared
+    memory). '''
+
+    def __init__(self, function, processes=None, batch_size=32,
+                 shared_memory_threshold=2 ** 20, mp_context=None):
+        self.processes = processes or os.cpu_count()
+        self.batch_size = batch_size
+        self.shared_memory_threshold = shared_memory_threshold
+        self.evaluations = 0
+        self.batches = 0
+        self.shared = 0
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=mp_context,
+            initializer=_init_worker, initargs=(function,))
+        self._pending = []
+        self._flush_scheduled = False
+
+    async def __call__(self, solution):
+        loop = asyncio.get_running_loop()
+        payload, segment = _encode(solution, self.shared_memory_threshold)
+        future = loop.create_future()
+        self._pending.append((payload, segment, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        self._flush_scheduled = False
+        pending = []
+        for item in self._pending:
+            if item[2].done():
+                _release(item[1])   # Cancelled before it was sent.
+            else:
+                pending.append(item)
+        self._pending = []
+        if not pending:
+            return
+        size = min(self.batch_size, math.ceil(len(pending) / self.processes))
+        for start in range(0, len(pending), size):
+            batch = pending[start:start + size]
+            self.batches += 1
+            self.evaluations += len(batch)
+            self.shared += sum(segment is not None for _, segment, _ in batch)
+            future = asyncio.wrap_future(self._executor.submit(
+                _evaluate_batch, [payload for payload, _, _ in batch]))
+            future.add_done_callback(functools.partial(_resolve, batch))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _release(segment):
+    if segment is not None:
+        segment.close()
+        segment.unlink()
+
+
+def _resolve(batch, future):
+    for _, segment, _ in batch:
+        _release(segment)
+    if future.cancelled():
+        results = [(False, asyncio.CancelledError())] * len(batch)
+    elif future.exception() is not None:
+        results = [(False, future.exception())] * len(batch)
+    else:
+        results = future.result()
+    for (_, _, caller), (ok, value) in zip(batch, results):
+        if caller.done():
+            continue
+        if ok:
+            caller.set_result(value)
+        else:
+            caller.set_exception(value)
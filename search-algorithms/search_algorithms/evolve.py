@@ -1,12 +1,14 @@
 
-import functools
+import asyncio
+import collections
 import itertools
 import random
 
 import numpy as np
 
+from .cache import solution_key
 from .nsga2 import nsga2_elites, nsga2_order_key
-from .utils import map_async_workers
+from .utils import map_async_workers, map_with_deadlines
 
 
 def sample(random_state, population, size):
@@ -40,29 +42,85 @@ def select_combine_tournament_elite(
     return elites, children
 
 
-async def attach_attributes(evaluate, population, workers):
-    # Evaluate instances and attach fitness.
-    data = await map_async_workers(evaluate, population, workers=workers)
+async def attach_attributes(evaluate, population, workers, cache=None,
+                            stragglers=None):
+    # Evaluate instances and attach fitness. Backup copies of stragglers
+    # bypass the cache, which would only join the evaluation in progress.
+    backup = evaluate
+    if cache is not None:
+        evaluate = cache.wrap(evaluate)
+    if stragglers is not None:
+        data = await map_with_deadlines(
+            evaluate, population, workers=workers, policy=stragglers,
+            backup=backup)
+    else:
+        data = await map_async_workers(evaluate, population, workers=workers)
     return [
         {'instance': inst, 'attr': fit}
         for inst, fit in zip(population, data)]
 
 
+def _carry_candidates(population, elites, fitness):
+    ''' Non-elite members of :population, fittest (by :fitness of their
+    attributes) first, leaving out any whose solution is already among the
+    elites or the members before it. '''
+    seen = {solution_key(individual['instance']) for individual in elites}
+    candidates = []
+    for individual in sorted(
+            population, key=lambda individual: fitness(individual['attr']),
+            reverse=True):
+        key = solution_key(individual['instance'])
+        if key not in seen:
+            seen.add(key)
+            candidates.append(individual)
+    return candidates
+
+
 async def parallel_synchronous_ga(population, evaluate, progression, *,
-                                  generations, workers, generation_callback=None):
+                                  generations, workers, generation_callback=None,
+                                  cache=None, surrogate=None, stragglers=None):
     ''' Run synchronous GA starting from the given :population for the given
     number of :generations. Evaluates computationally intenstive instance
     attributes in parallel using the :evaluate coroutine, then produces
     the next generation using the given :progression algorithm. Returns the
-    final generation with attributes attached. '''
-    _attach_attrs = functools.partial(attach_attributes, evaluate, workers=workers)
+    final generation with attributes attached. With a :cache
+    (cache.FitnessCache), elites and repeated children are not re-evaluated;
+    its statistics are available from the cache (e.g. in the callback).
+    With a :surrogate (surrogate.SurrogateScreen, whose target maps
+    attributes to fitness), only the children with the best predicted
+    fitness are evaluated; the places of the rest are taken by the fittest
+    non-elite members of the current population, whose attributes are
+    already known. A solution is carried at most once and never alongside
+    an equal elite (by cache.solution_key), so screening does not fill the
+    population with copies; if too few distinct members are left, more
+    children are evaluated. The surrogate learns from the evaluations made.
+    With :stragglers
+    (utils.StragglerPolicy), evaluations running far beyond the median of
+    their generation are cancelled and given the policy's penalty, so that a
+    generation does not wait on its slowest evaluation; a report per
+    generation is kept in the policy. '''
+
+    if surrogate is not None:
+        evaluate = surrogate.wrap(evaluate)
+
+    async def _attach_attrs(instances):
+        return await attach_attributes(
+            evaluate, instances, workers=workers, cache=cache,
+            stragglers=stragglers)
+
     population = await _attach_attrs(population)
     if generation_callback:
         generation_callback(0, population)
     for i in range(generations):
         elites, children = progression(population)
         assert len(elites) + len(children) == len(population)
-        population = elites + await _attach_attrs(children)
+        carried = []
+        if surrogate is not None:
+            carried = _carry_candidates(population, elites, surrogate.fitness)
+            children, rejected = surrogate.split(
+                children, keep=len(children) - len(carried))
+            carried = carried[:len(rejected)]
+        population = elites + carried + await _attach_attrs(children)
         if generation_callback:
             generation_callback(i+1, population)
     return population
@@ -77,12 +135,14 @@ def nsga2_select(random_state, population, size=2, count=2):
 
 
 async def parallel_nsga2(population, evaluate, *, random_state, objective_vector,
-                         crossover, generations, workers, generation_callback=None):
+                         crossover, generations, workers, generation_callback=None,
+                         cache=None):
 
     async def _attach_attrs(indivs):
         ''' Asynchronously evaluate attributes, then calculate the MO vector
         for each instance. '''
-        indivs = await attach_attributes(evaluate, indivs, workers=workers)
+        indivs = await attach_attributes(
+            evaluate, indivs, workers=workers, cache=cache)
         for individual in indivs:
             individual['objective'] = objective_vector(individual['attr'])
         return indivs
@@ -102,3 +162,126 @@ async def parallel_nsga2(population, evaluate, *, random_state, objective_vector
         if generation_callback:
             generation_callback(i+1, population)
     return population
+
+
+async def _pipeline(population, evaluate_children, breed, replace, *,
+                    generations, workers, overlap, generation_callback):
+    ''' Steady-state core of the pipelined GAs. :population is evaluated.
+    breed(population) returns new instances for a generation; these are
+    evaluated by evaluate_children(instances) (returning individuals) one
+    at a time on up to :workers concurrent tasks, and merged as they arrive
+    by replace(population, individuals). The next generation is bred once
+    an :overlap fraction of the newest generation's results are in.
+    generation_callback is called, in order, as each generation completes.
+    A ValueError is raised if breed returns no instances. '''
+    if not 0 < overlap <= 1:
+        raise ValueError("overlap must be in (0, 1].")
+    waiting = collections.deque()   # (generation, instance) not yet started
+    remaining = {}      # generation -> evaluations not yet merged
+    sizes = {}
+    running = {}        # task -> generation
+    bred = reported = 0
+
+    def breed_next():
+        nonlocal bred
+        bred += 1
+        children = breed(population)
+        if not children:
+            raise ValueError(f"breed returned no instances for generation {bred}.")
+        sizes[bred] = remaining[bred] = len(children)
+        waiting.extend((bred, child) for child in children)
+
+    async def evaluate_one(instance):
+        individual, = await evaluate_children([instance])
+        return individual
+
+    breed_next()
+    try:
+        while reported < generations:
+            while waiting and len(running) < workers:
+                generation, instance = waiting.popleft()
+                running[asyncio.ensure_future(evaluate_one(instance))] = generation
+            done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            arrivals = []
+            for task in done:
+                generation = running.pop(task)
+                arrivals.append(task.result())
+                remaining[generation] -= 1
+            population = replace(population, arrivals)
+            while reported < bred and remaining[reported + 1] == 0:
+                reported += 1
+                if generation_callback:
+                    generation_callback(reported, population)
+            if bred < generations and (
+                    sizes[bred] - remaining[bred] >= overlap * sizes[bred]):
+                breed_next()
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+    return population
+
+
+def truncation_replacement(fitness_func):
+    ''' Steady-state replacement keeping the fittest individuals (highest
+    :fitness_func of their attributes), for pipelined_ga. '''
+
+    def replace(population, arrivals):
+        return sorted(
+            population + arrivals, key=lambda ind: fitness_func(ind['attr']),
+            reverse=True)[:len(population)]
+
+    return replace
+
+
+async def pipelined_ga(population, evaluate, progression, *, fitness_func,
+                       generations, workers, overlap=0.5,
+                       generation_callback=None, cache=None):
+    ''' Overlapped variant of parallel_synchronous_ga without a barrier
+    between generations. Children of the next generation are bred by
+    :progression (its elites are not used) from the current population as
+    soon as an :overlap fraction of the current generation's children are
+    evaluated, so workers stay busy. Evaluated children replace the least
+    fit members of the population (by :fitness_func of their attributes) as
+    they arrive. generation_callback(i, population) is called as each
+    generation's evaluations are all merged. '''
+    population = await attach_attributes(evaluate, population, workers, cache=cache)
+    if generation_callback:
+        generation_callback(0, population)
+    return await _pipeline(
+        population,
+        lambda instances: attach_attributes(evaluate, instances, 1, cache=cache),
+        lambda population: progression(population)[1],
+        truncation_replacement(fitness_func),
+        generations=generations, workers=workers, overlap=overlap,
+        generation_callback=generation_callback)
+
+
+async def pipelined_nsga2(population, evaluate, *, random_state, objective_vector,
+                          crossover, generations, workers, overlap=0.5,
+                          generation_callback=None, cache=None):
+    ''' Overlapped variant of parallel_nsga2 (see pipelined_ga). The
+    population is re-ranked with NSGA-II as evaluated children arrive. '''
+
+    async def _attach_attrs(indivs):
+        indivs = await attach_attributes(evaluate, indivs, workers=workers, cache=cache)
+        for individual in indivs:
+            individual['objective'] = objective_vector(individual['attr'])
+        return indivs
+
+    def breed(population):
+        return list(itertools.chain(*(
+            crossover(*nsga2_select(random_state, population))
+            for _ in range(len(population) // 2))))
+
+    def replace(population, arrivals):
+        return nsga2_elites(population + arrivals, size=len(population), key='objective')
+
+    population = await _attach_attrs(population)
+    population = nsga2_elites(population, size=len(population), key='objective')
+    if generation_callback:
+        generation_callback(0, population)
+    return await _pipeline(
+        population, _attach_attrs, breed, replace,
+        generations=generations, workers=workers, overlap=overlap,
+        generation_callback=generation_callback)
@@ -18,11 +18,17 @@ Describing the algorithm as (p, n, w, l):
 '''
 
 import asyncio
+import contextlib
 import dataclasses
+import functools
 import heapq
+import itertools
 import time
 import typing
 
+from .cache import solution_key
+from .common import merge_immigrants, population_job
+
 
 @dataclasses.dataclass(order=True)
 class LSTask:
@@ -42,11 +48,81 @@ class GATask:
     solution: typing.Any=dataclasses.field(compare=False)
 
 
+class LSQueue(object):
+    ''' Priority queue of LSTasks (lowest numeric :priority first, ties in
+    order of submission) which holds at most one task per base solution and at most
+    :capacity tasks (default unbounded).
+
+    Bases are identified by :key (default cache.solution_key). A task whose
+    base is already queued is merged: the better priority is kept. Over
+    capacity, the lowest priority task is evicted. Counters: merged,
+    evicted. '''
+
+    def __init__(self, capacity=None, key=solution_key):
+        if capacity is not None and capacity < 1:
+            raise ValueError("LSQueue capacity must be at least 1.")
+        self.capacity = capacity
+        self.key = key
+        self.merged = 0
+        self.evicted = 0
+        # Entries are [priority, order, key, task]; task is None once removed.
+        # Removed entries are skipped lazily and compacted away in bulk.
+        self._best = []
+        self._worst = []
+        self._entries = {}
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, entry):
+        del self._entries[entry[2]]
+        task, entry[3] = entry[3], None
+        return task
+
+    def _compact(self):
+        if len(self._best) + len(self._worst) > 4 * len(self._entries) + 64:
+            self._best = [entry for entry in self._best if entry[3] is not None]
+            heapq.heapify(self._best)
+            self._worst = [item for item in self._worst if item[2][3] is not None]
+            heapq.heapify(self._worst)
+
+    def push(self, task):
+        key = self.key(task.base)
+        existing = self._entries.get(key)
+        if existing is not None:
+            self.merged += 1
+            if not task.priority < existing[0]:
+                return
+            self._remove(existing)
+        entry = [task.priority, next(self._order), key, task]
+        self._entries[key] = entry
+        heapq.heappush(self._best, entry)
+        heapq.heappush(self._worst, (-entry[0], -entry[1], entry))
+        if self.capacity is not None and len(self._entries) > self.capacity:
+            while True:
+                _, _, worst = heapq.heappop(self._worst)
+                if worst[3] is not None:
+                    break
+            self._remove(worst)
+            self.evicted += 1
+        self._compact()
+
+    def pop(self):
+        while self._best:
+            entry = heapq.heappop(self._best)
+            if entry[3] is not None:
+                task = self._remove(entry)
+                self._compact()
+                return task
+        raise IndexError("pop from an empty LSQueue")
+
+
 @dataclasses.dataclass
 class Queue:
     ''' Manage both queues and record statistics. '''
     ga_queue: typing.List
-    ls_queue: typing.List
+    ls_queue: LSQueue
     ga_results: typing.List
     best_solution: typing.Any
     ga_tasks_issued: int
@@ -54,6 +130,17 @@ class Queue:
     generations: int
     total_evals: int
     record: typing.List
+    cache: typing.Any = None
+    surrogate: typing.Any = None
+    # Evaluated solutions received from other islands, merged into the GA
+    # results when the next population is built.
+    immigrants: typing.List = dataclasses.field(default_factory=list)
+    # Results the last population was built from.
+    previous_results: typing.List = dataclasses.field(default_factory=list)
+    # Next population being computed in an executor, if any.
+    next_population: typing.Any = None
+    # Set when tasks are queued (for workers with nothing to do).
+    task_added: typing.Any = dataclasses.field(default_factory=asyncio.Event)
 
     def print_state(self, elapsed):
         print(
@@ -64,22 +151,88 @@ class Queue:
             f"GA Issued: {self.ga_tasks_issued}  "
             f"LS Issued: {self.ls_tasks_issued}  "
             f"Pending: {len(self.ga_queue) + len(self.ls_queue)}  "
-            f"Completed: {len(self.ga_results)}")
+            f"LS Merged: {self.ls_queue.merged}  "
+            f"LS Evicted: {self.ls_queue.evicted}  "
+            f"Completed: {len(self.ga_results)}"
+            + (f"  {self.cache.describe()}" if self.cache is not None else "")
+            + (f"  {self.surrogate.describe()}" if self.surrogate is not None else ""))
+
+
+def start_next_population(queue, next_population, executor, rstate, size):
+    ''' Compute the next GA population of :size from the current results in
+    :executor (default: the loop's thread pool), so that crossover and
+    selection do not block the event loop; workers carry on with LS tasks
+    meanwhile. If fewer than :size results are in, the places of those
+    still outstanding are taken by the fittest results the last population
+    was built from (the outstanding results count towards the next one).
+    See common.population_job for the use of :rstate. '''
+    results, queue.ga_results = queue.ga_results, []
+    results = results + sorted(
+        queue.previous_results, key=lambda entry: entry['fitness'],
+        reverse=True)[:max(0, size - len(results))]
+    results, queue.immigrants = merge_immigrants(results, queue.immigrants), []
+    queue.previous_results = results
+    future = asyncio.get_running_loop().run_in_executor(
+        executor, population_job(next_population, results, rstate))
+    future.add_done_callback(functools.partial(install_population, queue, results))
+    queue.next_population = future
+
+
+def install_population(queue, results, future):
+    ''' Replace the GA queue with the population computed by :future from
+    :results, once. With a surrogate, the population is screened (on the
+    loop, where the surrogate is updated): only the best predicted are
+    queued for evaluation, and the places of the rest are filled by the
+    fittest of :results, which count towards the next generation's results
+    without being evaluated again. '''
+    if queue.next_population is not future or not future.done():
+        return
+    if future.cancelled() or future.exception() is not None:
+        return
+    population = future.result()
+    if queue.surrogate is not None:
+        population, rejected = queue.surrogate.split(population)
+        queue.ga_results.extend(sorted(
+            results, key=lambda entry: entry['fitness'], reverse=True)[:len(rejected)])
+    queue.ga_queue = [GATask(ind) for ind in population]
+    queue.generations += 1
+    queue.next_population = None
+    queue.task_added.set()
+
+
+def propose_neighbour(queue, neighbour, base):
+    ''' Neighbour of :base; with a surrogate, the best predicted of several
+    (still one evaluation). '''
+    if queue.surrogate is None or not queue.surrogate.ready:
+        return neighbour(base)
+    return queue.surrogate.best(
+        [neighbour(base) for _ in range(queue.surrogate.oversample)])
 
 
 async def worker(queue, *, rstate, evaluate, neighbour, next_population,
-                 task_limit, ga_priority, population_size):
+                 task_limit, ga_priority, population_size, prefetch,
+                 executor=None):
     ''' Worker coroutine. Carries out atomic queue update operations GetTask,
     LSResult, GAResult as outlined in the paper. Asynchronously evaluates
     solutions. '''
     while queue.ls_tasks_issued + queue.ga_tasks_issued < task_limit:
+        # Nothing queued: wait for the next population or another result.
+        if len(queue.ls_queue) == 0 and len(queue.ga_queue) == 0:
+            if queue.next_population is not None:
+                # install_population runs as a done callback, before this
+                # worker resumes.
+                await queue.next_population
+            else:
+                queue.task_added.clear()
+                await queue.task_added.wait()
+            continue
         # Get task from queue according to the priority rules.
         if (len(queue.ls_queue) == 0) or (len(queue.ga_queue) > 0 and queue.ga_tasks_issued <= ga_priority * (queue.ls_tasks_issued + queue.ga_tasks_issued)):
             queue.ga_tasks_issued += 1
             task = queue.ga_queue.pop()
         else:
             queue.ls_tasks_issued += 1
-            task = heapq.heappop(queue.ls_queue)
+            task = queue.ls_queue.pop()
         # Evaluate fitness asynchronously.
         fitness = await evaluate(task.solution)
         queue.total_evals += 1
@@ -100,27 +253,29 @@ async def worker(queue, *, rstate, evaluate, neighbour, next_population,
         if type(task) is GATask:
             # Update GA results and create a new population if required.
             queue.ga_results.append(dict(solution=task.solution, fitness=fitness))
-            if len(queue.ga_results) >= population_size:
-                queue.ga_queue = [
-                    GATask(ind)
-                    for ind in next_population(queue.ga_results)]
-                queue.ga_results = []
-                queue.generations += 1
+            # Start the next population once all but :prefetch results of
+            # this one are in (all of them for the initial population).
+            threshold = population_size - (prefetch if queue.previous_results else 0)
+            if (len(queue.ga_results) >= threshold
+                    and queue.next_population is None):
+                start_next_population(
+                    queue, next_population, executor, rstate, population_size)
             # Submit a local search task for a neighbour of this solution.
-            heapq.heappush(queue.ls_queue, LSTask(
-                priority=-fitness, solution=neighbour(task.solution),
+            queue.ls_queue.push(LSTask(
+                priority=-fitness, solution=propose_neighbour(queue, neighbour, task.solution),
                 base=task.solution, base_fitness=fitness))
         else:
             # Submit a neighbour if this solution is better, otherwise backtrack
             # (i.e. submit a neighbour of the previous solution instead).
             if fitness > task.base_fitness:
-                heapq.heappush(queue.ls_queue, LSTask(
-                    priority=-fitness, solution=neighbour(task.solution),
+                queue.ls_queue.push(LSTask(
+                    priority=-fitness, solution=propose_neighbour(queue, neighbour, task.solution),
                     base=task.solution, base_fitness=fitness))
             else:
-                heapq.heappush(queue.ls_queue, LSTask(
-                    priority=-task.base_fitness, solution=neighbour(task.base),
+                queue.ls_queue.push(LSTask(
+                    priority=-task.base_fitness, solution=propose_neighbour(queue, neighbour, task.base),
                     base=task.base, base_fitness=task.base_fitness))
+        queue.task_added.set()
 
 
 async def monitor(queue, start, log_seconds):
@@ -129,7 +284,8 @@ async def monitor(queue, start, log_seconds):
         queue.print_state(time.monotonic() - start)
 
 
-async def run(*, population, workers, log_seconds, **kwargs):
+async def run(*, population, workers, log_seconds, cache=None, ls_capacity=None,
+              background=None, surrogate=None, prefetch=0, **kwargs):
     '''
     Main function to run the parallelised hybrid strategy.
     See onemax.py for an example of use.
@@ -140,26 +296,65 @@ async def run(*, population, workers, log_seconds, **kwargs):
 
         population:         List of initial candidate solutions.
         rstate:             Seeded random.Random object.
-        evaluate:           Coroutine to asynchronously evaluation fitness.
+        evaluate:           Coroutine to asynchronously evaluation fitness
+                            (wrap plain functions in
+                            evaluators.ProcessPoolEvaluator).
         neighbour:          Function to generate a local neighbour from a solution.
         next_population:    Function to generate a new population given an
                             existing population with evaluated fitnesses.
+                            If it accepts keyword argument rstate (e.g.
+                            common.new_population), it is passed a
+                            random.Random seeded from :rstate to use
+                            instead, as :rstate is not safe to share with
+                            the executor it runs in.
         workers:            Number of parallel workers.
         ga_priority:        Fraction of evaluations put towards evaluating GA solutions
                             vs LS solutions.
         task_limit:         Maximum fitness evaluations before termination.
+        cache:              Optional cache.FitnessCache; repeated solutions
+                            (e.g. LS revisits, surviving elites) are then
+                            not re-evaluated, but still count as tasks.
+        ls_capacity:        Maximum queued LS tasks, at least 1 (see
+                            LSQueue; default unbounded). Tasks sharing a base are merged
+                            regardless.
+        background:         Optional coroutine function, called with the
+                            Queue and run alongside the workers until they
+                            finish (e.g. islands.migrate).
+        surrogate:          Optional surrogate.SurrogateScreen trained on the
+                            evaluations made; only the best predicted of
+                            each new population are evaluated (the rest are
+                            replaced by the fittest previous results), and
+                            each LS neighbour is the best predicted of
+                            several.
+        executor:           Executor to run next_population in (default:
+                            the loop's thread pool).
+        prefetch:           Start computing the next population when this
+                            many results of the current one are outstanding
+                            (default: 0, once all are in), so that GA tasks
+                            are ready when they are due. The places of the
+                            outstanding results are taken by the fittest
+                            results of the previous generation.
 
     '''
-    loop = asyncio.get_event_loop()
     queue = Queue(
         ga_queue=[GATask(ind) for ind in population],
-        ls_queue=[], ga_results=[], best_solution=None,
+        ls_queue=LSQueue(capacity=ls_capacity), ga_results=[], best_solution=None,
         ga_tasks_issued=0, ls_tasks_issued=0, generations=0,
-        record=[], total_evals=0)
+        record=[], total_evals=0, cache=cache, surrogate=surrogate)
+    if surrogate is not None:
+        kwargs['evaluate'] = surrogate.wrap(kwargs['evaluate'])
+    if cache is not None:
+        kwargs['evaluate'] = cache.wrap(kwargs['evaluate'])
     start = time.monotonic()
     asyncio.ensure_future(monitor(queue, start, log_seconds))
+    if background is not None:
+        background = asyncio.ensure_future(background(queue))
     await asyncio.gather(*(
-        worker(queue, population_size=len(population), **kwargs)
+        worker(queue, population_size=len(population), prefetch=prefetch, **kwargs)
         for _ in range(workers)))
+    if background is not None:
+        background.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await background
     queue.print_state(time.monotonic() - start)
     return queue
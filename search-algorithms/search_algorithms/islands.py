@@ -0,0 +1,167 @@
+''' Island model: several populations evolved in separate processes (each
+running one of the asynchronous GA drivers in its own event loop), with the
+best solutions of each island periodically migrating to the next island in
+a ring. Scales a search across the cores of one machine while keeping the
+islands' populations diverse. '''
+
+import asyncio
+import dataclasses
+import functools
+import multiprocessing
+import queue as queue_module
+import typing
+
+from . import hybrid_ga
+
+
+@dataclasses.dataclass
+class IslandResult:
+    index: int
+    best_solution: typing.Any
+    best_fitness: typing.Any
+    total_evals: int
+    emigrants: int
+    immigrants: int
+
+
+@dataclasses.dataclass
+class IslandsResult:
+    islands: typing.List[IslandResult]
+
+    @property
+    def best(self):
+        ''' Global incumbent: the island result with the best fitness (None
+        if no island has one). '''
+        islands = [island for island in self.islands if island.best_fitness is not None]
+        return max(islands, key=lambda island: island.best_fitness, default=None)
+
+    @property
+    def total_evals(self):
+        return sum(island.total_evals for island in self.islands)
+
+    def print_state(self):
+        for island in self.islands:
+            print(
+                f"Island: {island.index}  "
+                f"Evals: {island.total_evals}  "
+                f"Fittest: {island.best_fitness}  "
+                f"Emigrants: {island.emigrants}  "
+                f"Immigrants: {island.immigrants}")
+        best = self.best
+        print(
+            f"Evals: {self.total_evals}  "
+            + (f"Fittest: {best.best_fitness} (island {best.index})"
+               if best is not None else "Fittest: None"))
+
+
+@dataclasses.dataclass
+class _Counts:
+    emigrants: int = 0
+    immigrants: int = 0
+
+
+def _receive(queue, inbox, counts):
+    ''' Add immigrants (solution, fitness) pairs waiting in :inbox to the
+    immigrants of :queue (merged into its GA results when its next
+    population is built), and update its incumbent. '''
+    while True:
+        try:
+            migrants = inbox.get_nowait()
+        except queue_module.Empty:
+            return
+        for solution, fitness in migrants:
+            counts.immigrants += 1
+            queue.immigrants.append(dict(solution=solution, fitness=fitness))
+            if queue.best_solution is None or fitness > queue.best_solution[1]:
+                queue.best_solution = solution, fitness
+
+
+async def migrate(queue, *, inbox, outbox, migrants, interval, counts):
+    ''' Background coroutine for hybrid_ga.run or async_ga.run. Every
+    :interval seconds sends the best :migrants evaluated solutions of the
+    island (its current GA results and incumbent) to :outbox and takes in
+    any received from :inbox. '''
+    while True:
+        await asyncio.sleep(interval)
+        candidates = {}
+        for entry in queue.ga_results:
+            candidates.setdefault(repr(entry['solution']), (entry['solution'], entry['fitness']))
+        if queue.best_solution is not None:
+            candidates.setdefault(repr(queue.best_solution[0]), queue.best_solution)
+        best = sorted(candidates.values(), key=lambda item: item[1], reverse=True)[:migrants]
+        if best:
+            outbox.put(best)
+            counts.emigrants += len(best)
+        _receive(queue, inbox, counts)
+
+
+def _island_main(index, setup, driver, inboxes, results, migrants, interval):
+    inbox = inboxes[index]
+    outbox = inboxes[(index + 1) % len(inboxes)]
+    counts = _Counts()
+    kwargs = setup(index)
+    if len(inboxes) > 1:
+        kwargs['background'] = functools.partial(
+            migrate, inbox=inbox, outbox=outbox, migrants=migrants,
+            interval=interval, counts=counts)
+    queue = asyncio.run(driver(**kwargs))
+    # No incumbent if the island made no evaluations and received no migrants.
+    best_solution, best_fitness = queue.best_solution or (None, None)
+    results.put(IslandResult(
+        index=index, best_solution=best_solution, best_fitness=best_fitness,
+        total_evals=queue.total_evals, emigrants=counts.emigrants,
+        immigrants=counts.immigrants))
+    # Migrants sent to islands which have already finished are dropped
+    # rather than blocking exit.
+    for mp_queue in inboxes:
+        mp_queue.cancel_join_thread()
+
+
+def run_islands(setup, islands, *, driver=hybrid_ga.run, migrants=2,
+                interval=1.0, mp_context=None):
+    ''' Run :islands GA instances in separate processes and return an
+    IslandsResult with per-island and global incumbents.
+
+        setup:      Picklable function of the island index (0 to islands - 1)
+                    returning the keyword arguments for :driver, e.g.
+                    population, rstate (seeded per island), evaluate, etc.
+        driver:     hybrid_ga.run (default) or async_ga.run.
+        migrants:   Number of solutions each island sends per migration.
+        interval:   Seconds between migrations.
+        mp_context: multiprocessing context (default: the platform default).
+
+    Migration follows a ring: island i sends to island (i + 1) % islands.
+    Immigrants compete with an island's GA results for places in the results
+    its next population is created from.
+    Raises RuntimeError if an island process fails. '''
+    context = mp_context or multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(islands)]
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_island_main,
+            args=(index, setup, driver, inboxes, results, migrants, interval))
+        for index in range(islands)]
+    for process in processes:
+        process.start()
+    collected = {}
+    try:
+        while len(collected) < islands:
+            try:
+                result = results.get(timeout=0.1)
+            except queue_module.Empty:
+                failed = [
+                    index for index, process in enumerate(processes)
+                    if index not in collected and process.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError(f"Island process {failed[0]} failed.")
+                continue
+            collected[result.index] = result
+    finally:
+        for process in processes:
+            if len(collected) < islands:
+                process.terminate()
+            process.join()
+    result = IslandsResult(islands=[collected[index] for index in range(islands)])
+    result.print_state()
+    return result
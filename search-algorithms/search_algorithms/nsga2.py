@@ -1,6 +1,4 @@
 
-import itertools
-
 import numpy as np
 
 
@@ -29,51 +27,153 @@ def split_dominated(population, key):
     return dominated, nondominated
 
 
-def nondominated_sort(population, key):
-    ''' Return the population as a list of nondominated frontiers.
-    Inefficient O(MN^3) algorithm sorts into ranks by splitting out the
-    nondominated points iteratively. '''
-    ranks = []
-    remaining = list(population)
-    while remaining:
-        remaining, nondominated = split_dominated(remaining, key)
-        ranks.append(nondominated)
+def objective_matrix(population, key):
+    ''' Stack the vectors at :key of each individual into an (N, M) float
+    array. '''
+    if not population:
+        return np.zeros((0, 0))
+    return np.array([individual[key] for individual in population], dtype=float)
+
+
+def _ranks_two_objectives(objectives):
+    ''' O(N log N) sweep for two objectives. In lexicographic order every
+    dominator of a point comes before it, and it is dominated by some member
+    of front k iff that front holds a distinct point with f2 <= its f2. This
+    holds for a prefix of the fronts found so far, so the point's front is
+    found by binary search. Each front keeps its minimum f2 and the f1 of the
+    first point attaining it (the smallest such f1). '''
+    order = np.lexsort((objectives[:, 1], objectives[:, 0]))
+    ranks = np.empty(len(objectives), dtype=int)
+    front_f2 = []
+    front_f1 = []
+    for index in order:
+        f1, f2 = objectives[index]
+        low, high = 0, len(front_f2)
+        while low < high:
+            mid = (low + high) // 2
+            if front_f2[mid] < f2 or (front_f2[mid] == f2 and front_f1[mid] < f1):
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(front_f2):
+            front_f2.append(f2)
+            front_f1.append(f1)
+        elif f2 < front_f2[low]:
+            front_f2[low] = f2
+            front_f1[low] = f1
+        ranks[index] = low
+    return ranks
+
+
+def _dominance_block(objectives, rows):
+    ''' Boolean matrix [i, j]: individual rows[i] dominates individual j,
+    i.e. rows[i] <= j in all objectives and not j <= rows[i]. Built one
+    objective at a time to avoid an (rows, N, M) temporary. '''
+    block = objectives[rows]
+    less_equal = np.ones((len(rows), len(objectives)), dtype=bool)
+    greater_equal = np.ones_like(less_equal)
+    for dim in range(objectives.shape[1]):
+        left, right = block[:, dim, None], objectives[None, :, dim]
+        less_equal &= left <= right
+        greater_equal &= left >= right
+    return less_equal & ~greater_equal
+
+
+def _ranks_deb(objectives, block_size):
+    ''' Deb's fast non-dominated sort, O(MN^2): count the dominators of
+    each individual, then peel off fronts by discounting the individuals
+    dominated by the current front. Dominance rows are computed in blocks
+    (and recomputed when peeling) instead of storing the N x N matrix. '''
+    size = len(objectives)
+    counts = np.zeros(size, dtype=int)
+    for start in range(0, size, block_size):
+        counts += _dominance_block(
+            objectives, np.arange(start, min(start + block_size, size))).sum(axis=0)
+    ranks = np.full(size, -1)
+    front = np.flatnonzero(counts == 0)
+    rank = 0
+    while front.size:
+        ranks[front] = rank
+        for start in range(0, front.size, block_size):
+            counts -= _dominance_block(
+                objectives, front[start:start + block_size]).sum(axis=0)
+        front = np.flatnonzero((counts == 0) & (ranks < 0))
+        rank += 1
     return ranks
 
 
+def nondominated_ranks(objectives, block_size=256):
+    ''' Pareto rank (0 = nondominated) of each row of the (N, M) array
+    :objectives, minimising all objectives. Uses a sweep for two objectives
+    and Deb's fast non-dominated sort otherwise. '''
+    objectives = np.asarray(objectives, dtype=float)
+    if len(objectives) == 0:
+        return np.zeros(0, dtype=int)
+    if objectives.shape[1] == 2:
+        return _ranks_two_objectives(objectives)
+    return _ranks_deb(objectives, block_size)
+
+
+def nondominated_sort(population, key):
+    ''' Return the population as a list of nondominated frontiers. Within
+    each frontier individuals keep their order in the population. '''
+    population = list(population)
+    ranks = nondominated_ranks(objective_matrix(population, key))
+    order = np.argsort(ranks, kind='stable')
+    fronts = [[] for _ in range(ranks.max() + 1 if len(ranks) else 0)]
+    for index in order:
+        fronts[ranks[index]].append(population[index])
+    return fronts
+
+
 def assign_nondominated_rank(population, key):
     ''' Input dicts with vector at given key. Output dicts with updated
     :pareto_rank key. Sort into ranks, unroll to single list with rank
     indices assigned (population is reordered). '''
-    ranks = nondominated_sort(population, key=key)
-    return list(itertools.chain(*(
-        [dict(individual, pareto_rank=i) for individual in rank]
-        for i, rank in enumerate(ranks))))
-
-
-def assign_crowding_distance(population, key):
-    ''' Input dicts with vector at given key. Output dicts with updated
-    :crowding_distance key.
-    Return NSGA-II crowding distance estimates along the given dimension
-    for all individuals in the population. Calculated as the distance between
-    left and right neighbours (in sorted order) of each individual, scaled
-    by the range of the objective. '''
-    population = [dict(ind, crowding_distance=0) for ind in population]
-    dimensions = len(population[0][key])
-    for dim in range(dimensions):
+    population = list(population)
+    ranks = nondominated_ranks(objective_matrix(population, key))
+    return [
+        dict(population[index], pareto_rank=int(ranks[index]))
+        for index in np.argsort(ranks, kind='stable')]
+
+
+def crowding_distances(objectives, order=None):
+    ''' NSGA-II crowding distance of each row of the (N, M) array
+    :objectives: the sum over objectives of the distance between the left
+    and right neighbours in sorted order, scaled by the range of the
+    objective; boundary points are infinite. For each objective the order
+    is re-sorted (stably) by the objective, breaking ties by the whole
+    vector, starting from :order (default: row order).
+
+    Returns (distances, order), order being the final sorted permutation. '''
+    objectives = np.asarray(objectives, dtype=float)
+    order = np.arange(len(objectives)) if order is None else np.asarray(order)
+    distances = np.zeros(len(objectives))
+    if len(objectives) == 0:
+        return distances, order
+    for dim in range(objectives.shape[1]):
         # Break ties by minimising other objectives, to ensure infinite
         # crowding value is assigned to the pareto dominant individual.
-        population.sort(key=lambda ind: (ind[key][dim], ind[key]))
-        vrange = population[-1][key][dim] - population[0][key][dim]
+        current = objectives[order]
+        order = order[np.lexsort(tuple(current[:, ::-1].T) + (current[:, dim],))]
+        values = objectives[order, dim]
+        vrange = values[-1] - values[0]
         if vrange == 0:
             continue
-        population[0]['crowding_distance'] = np.inf
-        population[-1]['crowding_distance'] = np.inf
-        for a, b, c in zip(population, population[1:], population[2:]):
-            b['crowding_distance'] = (
-                b['crowding_distance'] +
-                (c[key][dim] - a[key][dim]) / vrange)
-    return population
+        distances[order[[0, -1]]] = np.inf
+        distances[order[1:-1]] += (values[2:] - values[:-2]) / vrange
+    return distances, order
+
+
+def assign_crowding_distance(population, key):
+    ''' Input dicts with vector at given key. Output dicts with updated
+    :crowding_distance key, ordered by the last objective (see
+    crowding_distances). '''
+    population = list(population)
+    distances, order = crowding_distances(objective_matrix(population, key))
+    return [
+        dict(population[index], crowding_distance=float(distances[index]))
+        for index in order]
 
 
 def nsga2_order_key(ind):
@@ -81,9 +181,27 @@ def nsga2_order_key(ind):
     return ind['pareto_rank'], -ind['crowding_distance']
 
 
+def nsga2_selection(objectives, size):
+    ''' NSGA-II truncation of the (N, M) array :objectives. Returns the
+    indices of the :size elites in order of (rank, -crowding distance), and
+    the ranks and crowding distances of all rows. Ties keep the order of the
+    crowding distance sort started from the rank order, as in the dict
+    based functions. '''
+    ranks = nondominated_ranks(objectives)
+    distances, order = crowding_distances(
+        objectives, np.argsort(ranks, kind='stable'))
+    order = order[np.lexsort((-distances[order], ranks[order]))]
+    return order[:size], ranks, distances
+
+
 def nsga2_elites(population, size, key):
     ''' Calculate NSGA-II ranking and return the :size set of elite
     candidates. '''
-    population = assign_nondominated_rank(population, key=key)
-    population = assign_crowding_distance(population, key=key)
-    return sorted(population, key=nsga2_order_key)[:size]
+    population = list(population)
+    elites, ranks, distances = nsga2_selection(
+        objective_matrix(population, key), size)
+    return [
+        dict(
+            population[index], pareto_rank=int(ranks[index]),
+            crowding_distance=float(distances[index]))
+        for index in elites]
@@ -0,0 +1,190 @@
+''' Surrogate-assisted pre-screening. A cheap online regression model of
+fitness, trained on the features of every evaluated solution, ranks newly
+created candidates so that only the most promising are given to the
+expensive evaluate coroutine (e.g. a SCIP run). '''
+
+import collections
+import math
+
+import numpy as np
+
+
+def default_features(solution):
+    ''' Features of a solution encoded as a sequence of numbers (e.g. a
+    binary tuple): the encoding itself. '''
+    return np.asarray(solution, dtype=float)
+
+
+def _ranks(values):
+    return np.argsort(np.argsort(values, kind='stable'), kind='stable').astype(float)
+
+
+class RidgeRegression(object):
+    ''' Online ridge regression with an unpenalised intercept. Keeps running
+    sums (X'X, X'y) so each update is O(d^2) and a refit is one d x d solve,
+    regardless of the number of samples. The penalty :alpha is relative to
+    each feature's variance, so features on different scales (e.g. counts
+    and ratios from coeff_features) are treated alike. '''
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.samples = 0
+        self._xx = self._xy = self._x = None
+        self._y = 0.0
+        self._coef = None
+
+    def update(self, features, target):
+        features = np.asarray(features, dtype=float).ravel()
+        if self._xx is None:
+            size = features.shape[0]
+            self._xx = np.zeros((size, size))
+            self._xy = np.zeros(size)
+            self._x = np.zeros(size)
+        self._xx += np.outer(features, features)
+        self._xy += features * target
+        self._x += features
+        self._y += target
+        self.samples += 1
+        self._coef = None
+
+    def _fit(self):
+        mean_x = self._x / self.samples
+        mean_y = self._y / self.samples
+        sxx = self._xx - self.samples * np.outer(mean_x, mean_x)
+        sxy = self._xy - self.samples * mean_x * mean_y
+        penalty = self.alpha * np.diag(sxx) + 1e-9
+        weights = np.linalg.solve(sxx + np.diag(penalty), sxy)
+        self._coef = weights, mean_y - mean_x @ weights
+
+    def predict(self, features):
+        ''' Predictions for a matrix of :features (one row per sample). '''
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+        if self.samples == 0:
+            return np.zeros(features.shape[0])
+        if self._coef is None:
+            self._fit()
+        weights, intercept = self._coef
+        return features @ weights + intercept
+
+
+class SurrogateScreen(object):
+    ''' Screen candidate solutions with a RidgeRegression of fitness on
+    :features(solution) (default: the solution as a numeric vector; for
+    instances e.g. the values of lp_generators.features.coeff_features).
+    Higher fitness is better; :target maps an evaluation result to the
+    fitness to model (default: the result itself).
+
+    split() keeps the :fraction of candidates with the best predicted
+    fitness for evaluation; the GA drivers fill the places of the rest from
+    already evaluated solutions, so each rejected candidate is an evaluation
+    saved. Until :min_samples solutions have been observed, all candidates
+    are kept. best() picks the best predicted of several alternatives (e.g.
+    LS neighbours of one base) without counting the others as saved.
+
+    The model learns from evaluations made through wrap(evaluate), so cache
+    hits and results substituted for cancelled evaluations are not used.
+    Accuracy is measured test-then-train: each observed solution is
+    predicted before the model learns from it, and the rank correlation and
+    mean absolute error are reported over the last :window observations.
+    Counters: observed, screened (candidates ranked by split), rejected
+    (candidates dropped without evaluation). '''
+
+    def __init__(self, features=default_features, target=None, fraction=0.5,
+                 alpha=1.0, min_samples=20, window=200):
+        if not 0 < fraction <= 1:
+            raise ValueError("fraction must be in (0, 1].")
+        self.features = features
+        self.target = target
+        self.fraction = fraction
+        self.min_samples = min_samples
+        self.model = RidgeRegression(alpha=alpha)
+        self.observed = 0
+        self.screened = 0
+        self.rejected = 0
+        self._history = collections.deque(maxlen=window)
+
+    @property
+    def ready(self):
+        return self.model.samples >= self.min_samples
+
+    @property
+    def oversample(self):
+        ''' Number of alternatives for best() to choose from. '''
+        return math.ceil(1 / self.fraction)
+
+    def fitness(self, result):
+        ''' Fitness modelled for an evaluation :result. '''
+        return result if self.target is None else self.target(result)
+
+    def predict(self, solutions):
+        return self.model.predict([self.features(solution) for solution in solutions])
+
+    def split(self, candidates, keep=0):
+        ''' Split :candidates into (kept, rejected) lists, keeping the
+        ceil(fraction * len(candidates)), or at least :keep, with the highest
+        predicted fitness (all while the model is not ready), each in
+        candidate order. '''
+        candidates = list(candidates)
+        count = max(keep, math.ceil(self.fraction * len(candidates)))
+        if count >= len(candidates) or not self.ready:
+            return candidates, []
+        predicted = self.predict(candidates)
+        keep = np.zeros(len(candidates), dtype=bool)
+        keep[np.argsort(-predicted, kind='stable')[:count]] = True
+        self.screened += len(candidates)
+        self.rejected += len(candidates) - count
+        return (
+            [candidate for candidate, kept in zip(candidates, keep) if kept],
+            [candidate for candidate, kept in zip(candidates, keep) if not kept])
+
+    def best(self, candidates):
+        ''' The candidate with the highest predicted fitness (the first while
+        the model is not ready). '''
+        candidates = list(candidates)
+        if len(candidates) == 1 or not self.ready:
+            return candidates[0]
+        return candidates[int(np.argmax(self.predict(candidates)))]
+
+    def observe(self, solution, result):
+        ''' Record the evaluation :result of :solution. '''
+        fitness = self.fitness(result)
+        features = self.features(solution)
+        if self.ready:
+            self._history.append((float(self.model.predict(features)[0]), fitness))
+        self.model.update(features, fitness)
+        self.observed += 1
+
+    def wrap(self, evaluate):
+        ''' Version of the :evaluate coroutine function which observes each
+        result it returns. '''
+        async def observed(solution):
+            result = await evaluate(solution)
+            self.observe(solution, result)
+            return result
+        return observed
+
+    def accuracy(self):
+        ''' (rank correlation, mean absolute error) of test-then-train
+        predictions over the recent window, or Nones if too few. '''
+        if len(self._history) < 3:
+            return None, None
+        predicted, actual = np.array(self._history).T
+        error = float(np.abs(predicted - actual).mean())
+        if predicted.std() == 0 or actual.std() == 0:
+            return None, error
+        correlation = float(np.corrcoef(_ranks(predicted), _ranks(actual))[0, 1])
+        return correlation, error
+
+    def stats(self):
+        correlation, error = self.accuracy()
+        return dict(
+            observed=self.observed, screened=self.screened,
+            rejected=self.rejected, rank_correlation=correlation,
+            mean_absolute_error=error)
+
+    def describe(self):
+        correlation, _ = self.accuracy()
+        correlation = 'n/a' if correlation is None else f'{correlation:.3f}'
+        return (
+            f"Surrogate rejected: {self.rejected}  "
+            f"Surrogate rank corr: {correlation}")
@@ -1,35 +1,267 @@
-
 import asyncio
+import collections
 import contextlib
+import dataclasses
 import pathlib
+import statistics
 import tempfile
+import time
+import typing
 
 import tqdm
 
 
-async def worker(evaluate, queue, *, monitor=None):
-    while True:
-        try:
-            instance = next(
-                instance for instance in queue
-                if instance['result'] is None)
-            instance['result'] = 'pending'
-            if monitor:
-                next(monitor)
-            instance['result'] = await evaluate(instance['file_name'])
-        except StopIteration:
-            return
-
-
-async def map_async_workers(evaluate, instances, *, workers):
-    queue = [
-        {'file_name': file_name, 'result': None}
-        for file_name in instances]
-    # monitor = iter(tqdm.tqdm([None for _ in queue]))
-    monitor = None
-    errors = await asyncio.gather(*(
-        worker(evaluate, queue, monitor=monitor)
-        for _ in range(workers)))
-    assert all(err is None for err in errors)
-    # list(monitor)
-    return [item['result'] for item in queue]
+@dataclasses.dataclass
+class TaskProgress:
+    ''' Passed to the progress hook of map_async_workers as each task
+    finishes: the task index, its evaluation time, the error raised (if
+    any), and counts of finished and total tasks. '''
+    index: int
+    elapsed: float
+    error: typing.Optional[BaseException]
+    done: int
+    total: int
+
+
+class TqdmProgress(object):
+    ''' Progress hook for map_async_workers showing a tqdm progress bar
+    (keyword arguments are passed to tqdm). '''
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.bar = None
+
+    def __call__(self, update):
+        if self.bar is None:
+            self.bar = tqdm.tqdm(total=update.total, **self.kwargs)
+        self.bar.update(1)
+        if update.done == update.total:
+            self.bar.close()
+
+
+async def map_async_workers(evaluate, instances, *, workers, progress=None,
+                            return_exceptions=False):
+    ''' Evaluate all :instances using the :evaluate coroutine, running at
+    most :workers evaluations at once. Returns results in the order of
+    :instances. If an evaluation raises, the remaining evaluations are
+    cancelled and the error is raised; with :return_exceptions the error is
+    returned in place of the result instead. :progress is called with a
+    TaskProgress as each evaluation finishes (e.g. TqdmProgress()). '''
+    if workers < 1:
+        raise ValueError("Need at least one worker.")
+    queue = asyncio.Queue()
+    for index, instance in enumerate(instances):
+        queue.put_nowait((index, instance))
+    total = queue.qsize()
+    results = [None] * total
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while True:
+            try:
+                index, instance = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.monotonic()
+            error = None
+            try:
+                results[index] = await evaluate(instance)
+            except Exception as exc:
+                if not return_exceptions:
+                    raise
+                results[index] = error = exc
+            done += 1
+            if progress is not None:
+                progress(TaskProgress(
+                    index=index, elapsed=time.monotonic() - start, error=error,
+                    done=done, total=total))
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(min(workers, total))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+
+@dataclasses.dataclass
+class GenerationReport:
+    ''' Outcome of one map_with_deadlines call. Times are in seconds.
+
+        wall_time:      Time until every instance had a result.
+        busy_time:      Evaluation time summed over all copies run.
+        idle_time:      Worker time not spent evaluating (workers *
+                        wall_time - busy_time).
+        median:         Median duration of completed evaluations.
+        cancelled:      Evaluations cut off and given the penalty.
+        cancelled_time: Time spent on evaluations which were cut off.
+        speculated:     Backup copies started.
+        backup_wins:    Evaluations where the backup finished first.
+        recovered:      Upper bound on wall time saved by cutting off
+                        evaluations (None without StragglerPolicy.limit).
+    '''
+    wall_time: float
+    busy_time: float
+    idle_time: float
+    median: typing.Optional[float]
+    cancelled: int
+    cancelled_time: float
+    speculated: int
+    backup_wins: int
+    recovered: typing.Optional[float]
+
+
+@dataclasses.dataclass
+class StragglerPolicy:
+    ''' Deadlines for map_with_deadlines, as multiples of the median duration
+    of the evaluations completed so far in the same call. Deadlines apply
+    once a :quorum fraction of the instances are done, and are never
+    shorter than :min_seconds.
+
+        penalty:            Result given to evaluations that are cut off.
+        cancel_after:       Evaluations running this many medians are
+                            cancelled (killing solver subprocesses if the
+                            evaluate coroutine does so on cancellation).
+        speculate_after:    If set, evaluations running this many medians
+                            get a backup copy, when a worker is idle; the
+                            first copy to finish is used.
+        limit:              Known maximum duration of an evaluation (e.g.
+                            the solver's process timeout), used to bound the
+                            time recovered in reports.
+
+    A GenerationReport for each call is appended to :reports. '''
+    penalty: typing.Any
+    cancel_after: float = 4.0
+    speculate_after: typing.Optional[float] = None
+    quorum: float = 0.5
+    min_seconds: float = 0.0
+    limit: typing.Optional[float] = None
+    reports: typing.List[GenerationReport] = dataclasses.field(default_factory=list)
+
+
+async def map_with_deadlines(evaluate, instances, *, workers, policy,
+                             backup=None):
+    ''' Evaluate all :instances with the :evaluate coroutine, running at most
+    :workers evaluations (including backup copies) at once, and cutting off
+    stragglers according to :policy (a StragglerPolicy). Returns results in
+    the order of :instances, with policy.penalty for those cut off. Errors
+    (or cancellation from within an evaluation) are raised as in
+    map_async_workers, unless another copy of the same evaluation is still
+    running.
+
+    Backup copies are run with the :backup coroutine function (default:
+    :evaluate). If :evaluate shares evaluations in progress (e.g. a
+    cache.FitnessCache wrapper), pass the unshared function as :backup, or
+    the backup only waits on the straggler. '''
+    if workers < 1:
+        raise ValueError("Need at least one worker.")
+    instances = list(instances)
+    results = [None] * len(instances)
+    pending = collections.deque(range(len(instances)))
+    running = {}        # index -> {task: start time}
+    owner = {}          # task -> index
+    durations = []
+    abandoned = []
+    start = time.monotonic()
+    busy = cancelled_time = 0.0
+    cancelled = speculated = backup_wins = 0
+    recovered = []
+
+    def launch(index, function=evaluate):
+        task = asyncio.ensure_future(function(instances[index]))
+        running.setdefault(index, {})[task] = time.monotonic()
+        owner[task] = index
+
+    def stop(index):
+        nonlocal busy
+        now = time.monotonic()
+        for task, started in running.pop(index).items():
+            del owner[task]
+            if not task.done():
+                task.cancel()
+                abandoned.append(task)
+            busy += now - started
+
+    def thresholds():
+        ''' (speculate, cancel) deadlines, or None before the quorum. '''
+        if not durations or len(durations) < policy.quorum * len(instances):
+            return None
+        median = statistics.median(durations)
+        return tuple(
+            None if multiple is None else max(policy.min_seconds, multiple * median)
+            for multiple in (policy.speculate_after, policy.cancel_after))
+
+    try:
+        while pending or running:
+            while pending and len(owner) < workers:
+                launch(pending.popleft())
+            # Wake at the next deadline of a running evaluation, if any.
+            timeout = None
+            deadlines = thresholds()
+            if deadlines is not None:
+                now = time.monotonic()
+                upcoming = [
+                    min(tasks.values()) + deadline - now
+                    for tasks in running.values() for deadline in deadlines
+                    if deadline is not None and min(tasks.values()) + deadline > now]
+                timeout = min(upcoming, default=None)
+            done, _ = await asyncio.wait(
+                list(owner), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = owner.get(task)
+                if index is None:
+                    continue    # Another copy finished first.
+                started = running[index][task]
+                if task.cancelled() or task.exception() is not None:
+                    if len(running[index]) > 1:
+                        # Another copy may still succeed.
+                        del running[index][task]
+                        del owner[task]
+                        busy += time.monotonic() - started
+                        continue
+                    if task.cancelled():
+                        raise asyncio.CancelledError()
+                    raise task.exception()
+                results[index] = task.result()
+                durations.append(time.monotonic() - started)
+                if started != min(running[index].values()):
+                    backup_wins += 1
+                stop(index)
+            deadlines = thresholds()
+            if deadlines is None:
+                continue
+            speculate, cancel = deadlines
+            now = time.monotonic()
+            for index in list(running):
+                first = min(running[index].values())
+                if now - first >= cancel:
+                    results[index] = policy.penalty
+                    cancelled += 1
+                    cancelled_time += sum(now - s for s in running[index].values())
+                    if policy.limit is not None:
+                        recovered.append(first + policy.limit)
+                    stop(index)
+                elif (speculate is not None and now - first >= speculate
+                        and not pending and len(running[index]) == 1
+                        and len(owner) < workers):
+                    speculated += 1
+                    launch(index, evaluate if backup is None else backup)
+    finally:
+        for index in list(running):
+            stop(index)
+        if abandoned:
+            await asyncio.gather(*abandoned, return_exceptions=True)
+    wall_time = time.monotonic() - start
+    policy.reports.append(GenerationReport(
+        wall_time=wall_time, busy_time=busy,
+        idle_time=max(0.0, workers * wall_time - busy),
+        median=statistics.median(durations) if durations else None,
+        cancelled=cancelled, cancelled_time=cancelled_time,
+        speculated=speculated, backup_wins=backup_wins,
+        recovered=(
+            max(0.0, max(recovered) - (start + wall_time))
+            if recovered else (0.0 if policy.limit is not None else None))))
+    return results
@@ -0,0 +1,46 @@
+import asyncio
+import concurrent.futures
+import functools
+import random
+import threading
+import time
+
+from search_algorithms import async_ga, common
+
+
+def slow_progression(state, create_random, results, rstate):
+    ''' next_population which takes a while and records whether it ran on
+    the event loop thread and how many evaluations started meanwhile. '''
+    state['threads'].add(threading.get_ident())
+    started = state['started']
+    time.sleep(0.02)
+    state['overlapped'] += state['started'] - started
+    return common.new_population(
+        results,
+        select=functools.partial(common.select_tournament, tournament_size=2),
+        crossover=common.uniform_crossover, create_random=create_random,
+        rstate=rstate)
+
+
+def test_async_ga_next_population_off_loop():
+    rstate = random.Random(0)
+    create_random = lambda rstate=rstate: common.random_solution(rstate, 20)
+    state = dict(threads=set(), started=0, overlapped=0)
+
+    async def evaluate(solution):
+        state['started'] += 1
+        await asyncio.sleep(0.002)
+        return sum(solution)
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        queue = asyncio.run(async_ga.run(
+            population=[create_random() for _ in range(20)], workers=4,
+            log_seconds=60, rstate=rstate, evaluate=evaluate, task_limit=200,
+            prefetch=4,
+            executor=executor,
+            next_population=functools.partial(
+                slow_progression, state, create_random)))
+    assert queue.total_evals >= 200
+    assert threading.get_ident() not in state['threads']
+    # Evaluations kept starting while populations were computed.
+    assert state['overlapped'] > 0
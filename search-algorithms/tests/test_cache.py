@@ -0,0 +1,217 @@
+import asyncio
+import functools
+import os
+import random
+
+import numpy as np
+import pytest
+
+from search_algorithms import async_ga, common, evolve, hybrid_ga
+from search_algorithms import cache as cache_module
+from search_algorithms.cache import FitnessCache, solution_key
+
+
+def test_solution_key(tmp_path):
+    assert solution_key((0, 1, 1)) == (0, 1, 1)
+    a, b = tmp_path.joinpath("a.mps"), tmp_path.joinpath("b.mps")
+    a.write_text("model")
+    b.write_text("model")
+    assert solution_key(a) == solution_key(b)
+    b.write_text("other")
+    assert solution_key(a) != solution_key(b)
+    assert solution_key(np.arange(4)) == solution_key(np.arange(4))
+    assert solution_key(np.arange(4)) != solution_key(np.arange(4).reshape(2, 2))
+    assert solution_key([1, {'x': 2}]) == solution_key([1, {'x': 2}])
+
+
+def test_solution_key_files(tmp_path, monkeypatch):
+    path = tmp_path.joinpath("a.mps")
+    path.write_text("model")
+    # str paths of existing files are keyed by contents, as for Paths.
+    assert solution_key(str(path)) == solution_key(path)
+    assert solution_key("not a file") == "not a file"
+    # Memoised once the file is older than the timestamp granularity.
+    os.utime(path, ns=(0, 0))
+    solution_key(path)
+    opened = []
+    monkeypatch.setattr(cache_module, 'open', lambda *args: opened.append(args), raising=False)
+    assert solution_key(path) == solution_key(str(path))
+    assert not opened
+    monkeypatch.undo()
+    # A file rewritten under the same name gets a new key.
+    key = solution_key(path)
+    path.write_text("other")
+    assert solution_key(path) != key
+
+
+def test_fitness_cache_files(tmp_path):
+    paths = [tmp_path.joinpath(name) for name in ("a.mps", "b.mps")]
+    for path in paths:
+        path.write_text("model")
+
+    async def evaluate(solution):
+        await asyncio.sleep(0)
+        return str(solution)
+
+    cache = FitnessCache()
+
+    async def main():
+        return await asyncio.gather(*(cache.get(evaluate, path) for path in paths))
+
+    results = asyncio.run(main())
+    assert results[0] == results[1] and cache.misses == 1
+
+
+def test_fitness_cache_in_flight():
+    calls = []
+
+    async def evaluate(solution):
+        calls.append(solution)
+        await asyncio.sleep(0.01)
+        return sum(solution)
+
+    cache = FitnessCache()
+
+    async def main():
+        first = await asyncio.gather(*(
+            cache.get(evaluate, s) for s in [(1, 0), (1, 1), (1, 0), (1, 0)]))
+        second = await cache.get(evaluate, (1, 1))
+        return first, second
+
+    assert asyncio.run(main()) == ([1, 2, 1, 1], 2)
+    assert sorted(calls) == [(1, 0), (1, 1)]
+    assert cache.stats() == dict(
+        requests=5, hits=1, joins=2, misses=2, saved=3, hit_rate=0.6, size=2)
+
+
+def test_fitness_cache_errors_and_cancel():
+    attempts = []
+
+    async def evaluate(solution):
+        attempts.append(solution)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ValueError()
+        return 1.0
+
+    cache = FitnessCache()
+
+    async def main():
+        results = await asyncio.gather(
+            cache.get(evaluate, (0,)), cache.get(evaluate, (0,)),
+            return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        # Not cached: evaluated again. A cancelled waiter does not cancel
+        # the evaluation shared with the other.
+        first = asyncio.ensure_future(cache.get(evaluate, (0,)))
+        second = asyncio.ensure_future(cache.get(evaluate, (0,)))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 1.0
+    assert len(attempts) == 2 and len(cache) == 1
+
+
+def test_fitness_cache_maxsize():
+    async def evaluate(solution):
+        return solution
+
+    cache = FitnessCache(maxsize=2)
+
+    async def main():
+        for solution in [1, 2, 1, 3, 1, 2]:
+            await cache.get(evaluate, solution)
+
+    asyncio.run(main())
+    # 2 was least recently used when 3 was added.
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def onemax_kwargs(rstate, evaluate, bits=8):
+    create_random = lambda rstate=rstate: tuple(rstate.randint(0, 1) for _ in range(bits))
+    return dict(
+        population=[create_random() for _ in range(10)],
+        evaluate=evaluate,
+        next_population=functools.partial(
+            common.new_population,
+            select=functools.partial(
+                common.select_tournament, tournament_size=2, rstate=rstate),
+            crossover=functools.partial(common.uniform_crossover, rstate=rstate),
+            create_random=create_random),
+        workers=4, log_seconds=60, task_limit=200)
+
+
+@pytest.mark.parametrize("driver", ["hybrid", "async"])
+def test_ga_drivers_cache(driver, capsys):
+    evaluated = []
+
+    async def evaluate(solution):
+        evaluated.append(solution)
+        await asyncio.sleep(0)
+        return sum(solution)
+
+    rstate = random.Random(1)
+    kwargs = onemax_kwargs(rstate, evaluate)
+    cache = FitnessCache()
+    if driver == "hybrid":
+        queue = asyncio.run(hybrid_ga.run(
+            rstate=rstate, ga_priority=0.5,
+            neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+            cache=cache, **kwargs))
+    else:
+        queue = asyncio.run(async_ga.run(cache=cache, **kwargs))
+    # 256 distinct solutions: 200 tasks must repeat some.
+    assert queue.total_evals >= 200
+    assert len(evaluated) == len(set(evaluated)) == cache.misses < 200
+    assert cache.hits + cache.joins + cache.misses == queue.total_evals
+    assert "Cache hits" in capsys.readouterr().out
+
+
+def test_synchronous_ga_cache():
+    evaluated = []
+
+    async def evaluate(instance):
+        evaluated.append(instance)
+        return sum(instance)
+
+    def progression(population):
+        ranked = sorted(population, key=lambda ind: ind['attr'], reverse=True)
+        elites = [ind for ind in ranked[:2]]
+        children = [ind['instance'] for ind in ranked[:8]]
+        return elites, children
+
+    cache = FitnessCache()
+    population = [tuple(random.Random(i).choices([0, 1], k=6)) for i in range(10)]
+    final = asyncio.run(evolve.parallel_synchronous_ga(
+        population, evaluate, progression, generations=3, workers=4, cache=cache))
+    assert len(final) == 10
+    assert len(evaluated) == len(set(evaluated)) == cache.misses
+    assert cache.hits == 3 * 8
+
+
+def test_fitness_cache_cancels_unwaited():
+    cancelled = []
+
+    async def evaluate(solution):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(solution)
+            raise
+
+    cache = FitnessCache()
+
+    async def main():
+        tasks = [asyncio.ensure_future(cache.get(evaluate, (0,))) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        tasks[0].cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled == []
+        tasks[1].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert cancelled == [(0,)] and len(cache) == 0
+
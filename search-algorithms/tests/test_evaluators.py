@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+import numpy as np
+
+from search_algorithms.evaluators import ProcessPoolEvaluator
+from search_algorithms.utils import map_async_workers
+
+
+def square(x):
+    return x * x
+
+
+def pid(x):
+    return os.getpid()
+
+
+def fails_on_odd(x):
+    if x % 2:
+        raise ValueError(x)
+    return x
+
+
+def summarise(instance):
+    return (
+        float(instance['A'].sum()), instance['A'].flags.writeable,
+        instance['A'].dtype.str, instance['name'])
+
+
+def test_process_pool_evaluator_batches():
+    with ProcessPoolEvaluator(square, processes=2, batch_size=10) as evaluate:
+        results = asyncio.run(map_async_workers(evaluate, range(100), workers=100))
+        assert results == [x * x for x in range(100)]
+        assert evaluate.evaluations == 100
+        assert evaluate.batches == 10
+        assert evaluate.shared == 0
+
+
+def test_process_pool_evaluator_spreads_over_processes():
+    with ProcessPoolEvaluator(pid, processes=2) as evaluate:
+        results = asyncio.run(map_async_workers(evaluate, range(2), workers=2))
+        # Two concurrent calls are sent as separate batches, not one.
+        assert evaluate.batches == 2
+        assert all(result != os.getpid() for result in results)
+
+
+def test_process_pool_evaluator_errors():
+    with ProcessPoolEvaluator(fails_on_odd, processes=2) as evaluate:
+        results = asyncio.run(map_async_workers(
+            evaluate, range(6), workers=6, return_exceptions=True))
+    assert results[0::2] == [0, 2, 4]
+    assert all(isinstance(error, ValueError) for error in results[1::2])
+
+
+def test_process_pool_evaluator_shared_memory():
+    segments = set(os.listdir('/dev/shm'))
+    instances = [
+        dict(A=np.full((200, 100), i, dtype=np.float32), name=f"inst{i}")
+        for i in range(4)]
+    with ProcessPoolEvaluator(
+            summarise, processes=2, shared_memory_threshold=10000) as evaluate:
+        results = asyncio.run(map_async_workers(evaluate, instances, workers=4))
+        assert evaluate.shared == 4
+        small = asyncio.run(evaluate(dict(A=np.ones(10), name="small")))
+        assert evaluate.shared == 4
+    assert [r[0] for r in results] == [20000.0 * i for i in range(4)]
+    assert [r[3] for r in results] == [f"inst{i}" for i in range(4)]
+    assert all(r[1:3] == (True, '<f4') for r in results)
+    assert small == (10.0, True, '<f8', "small")
+    assert set(os.listdir('/dev/shm')) <= segments
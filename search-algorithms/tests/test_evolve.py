@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import random
+
+import numpy as np
+import pytest
+
+from search_algorithms import common, evolve
+from search_algorithms.utils import StragglerPolicy
+
+
+def test_synchronous_ga_stragglers():
+    async def evaluate(solution):
+        await asyncio.sleep(5 if solution == (1, 1, 1) else 0.01)
+        return sum(solution)
+
+    def progression(population):
+        ranked = sorted(population, key=lambda ind: ind['attr'], reverse=True)
+        return ranked[:2], [(1, 1, 1)] + [ind['instance'] for ind in ranked[2:9]]
+
+    policy = StragglerPolicy(penalty=-100, cancel_after=5)
+    population = [(i % 2, 0, 0) for i in range(10)]
+    final = asyncio.run(evolve.parallel_synchronous_ga(
+        population, evaluate, progression, generations=2, workers=4,
+        stragglers=policy))
+    assert len(policy.reports) == 3
+    assert [r.cancelled for r in policy.reports] == [0, 1, 1]
+    assert {'instance': (1, 1, 1), 'attr': -100} in final
+
+
+def onemax_progression(rstate, population):
+    results = [dict(solution=ind['instance'], fitness=ind['attr']) for ind in population]
+    children = []
+    while len(children) < len(population):
+        children.extend(common.uniform_crossover(
+            common.select_tournament(results, 2, rstate),
+            common.select_tournament(results, 2, rstate), rstate))
+    return [], [common.create_neighbour(child, rstate) for child in children]
+
+
+def test_pipelined_ga():
+    rstate = random.Random(0)
+    events = []
+    running = []
+
+    async def evaluate(solution):
+        events.append('start')
+        running.append(solution)
+        events.append(len(running))
+        # The last evaluation of generation 1 is slow.
+        await asyncio.sleep(0.05 if events.count('start') == 40 else rstate.uniform(0, 0.002))
+        running.remove(solution)
+        return sum(solution)
+
+    def callback(generation, population):
+        assert len(population) == 20
+        events.append(('generation', generation, max(ind['attr'] for ind in population)))
+
+    population = [common.random_solution(rstate, 30, p=0.2) for _ in range(20)]
+    final = asyncio.run(evolve.pipelined_ga(
+        population, evaluate, functools.partial(onemax_progression, rstate),
+        fitness_func=lambda attr: attr, generations=8, workers=4, overlap=0.5,
+        generation_callback=callback))
+    generations = [event for event in events if isinstance(event, tuple)]
+    assert [g[1] for g in generations] == list(range(9))
+    # Steady-state replacement never loses the best.
+    best = [g[2] for g in generations]
+    assert best == sorted(best) and best[-1] > best[0]
+    assert events.count('start') == 20 + 8 * 20
+    assert max(e for e in events if isinstance(e, int)) == 4
+    # Generation 2 kept the workers busy while generation 1 finished.
+    first_gen = events.index(('generation', 1, best[1]))
+    assert events[:first_gen].count('start') > 20 + 20 + 3
+    assert [ind['attr'] for ind in final] == sorted(
+        (ind['attr'] for ind in final), reverse=True)
+
+
+def test_pipelined_ga_barrier():
+    rstate = random.Random(1)
+    starts = []
+    callbacks = []
+
+    async def evaluate(solution):
+        starts.append(len(callbacks))
+        await asyncio.sleep(0)
+        return sum(solution)
+
+    population = [common.random_solution(rstate, 10) for _ in range(10)]
+    asyncio.run(evolve.pipelined_ga(
+        population, evaluate, functools.partial(onemax_progression, rstate),
+        fitness_func=lambda attr: attr, generations=3, workers=3, overlap=1.0,
+        generation_callback=lambda i, p: callbacks.append(i)))
+    # With overlap=1, generation g is only evaluated after g - 1 completed.
+    assert starts == sorted(starts) and starts.count(2) == 10
+
+
+def test_pipelined_ga_no_children():
+    async def evaluate(solution):
+        return sum(solution)
+
+    population = [(0, 1), (1, 1)]
+    with pytest.raises(ValueError, match="no instances"):
+        asyncio.run(evolve.pipelined_ga(
+            population, evaluate, lambda population: (population, []),
+            fitness_func=lambda attr: attr, generations=2, workers=2))
+
+
+def test_pipelined_nsga2():
+    rstate = np.random.RandomState(0)
+
+    async def evaluate(solution):
+        await asyncio.sleep(0)
+        return dict(ones=sum(solution), prefix=sum(solution[:5]))
+
+    def crossover(a, b):
+        return common.one_point_crossover(a, b, random.Random(len(a)))
+
+    population = [tuple(rstate.randint(0, 2, size=12).tolist()) for _ in range(10)]
+    final = asyncio.run(evolve.pipelined_nsga2(
+        population, evaluate, random_state=rstate,
+        objective_vector=lambda attr: (-attr['ones'], attr['prefix']),
+        crossover=crossover, generations=4, workers=3))
+    assert len(final) == 10
+    assert all('pareto_rank' in ind and 'objective' in ind for ind in final)
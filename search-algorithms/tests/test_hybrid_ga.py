@@ -0,0 +1,228 @@
+import asyncio
+import concurrent.futures
+import functools
+import random
+import threading
+import time
+
+import pytest
+
+from search_algorithms import common, hybrid_ga
+from search_algorithms.hybrid_ga import LSQueue, LSTask
+
+
+def slow_progression(state, create_random, results, rstate):
+    ''' next_population which takes a while and records the threads it ran
+    on and how many evaluations started meanwhile. '''
+    state['threads'].add(threading.get_ident())
+    started = state['started']
+    time.sleep(0.02)
+    state['overlapped'] += state['started'] - started
+    return common.new_population(
+        results,
+        select=functools.partial(common.select_tournament, tournament_size=2),
+        crossover=common.uniform_crossover, create_random=create_random,
+        rstate=rstate)
+
+
+def task(base, priority, solution=None):
+    return LSTask(priority=priority, base=base, base_fitness=-priority, solution=solution)
+
+
+def test_ls_queue_order():
+    rng = random.Random(0)
+    queue = LSQueue()
+    tasks = [task((i,), rng.randint(0, 20), solution=i) for i in range(500)]
+    for t in tasks:
+        queue.push(t)
+    popped = [queue.pop().solution for _ in range(len(tasks))]
+    # Lowest priority first, ties in order of submission.
+    assert popped == [t.solution for t in sorted(tasks, key=lambda t: t.priority)]
+    with pytest.raises(IndexError):
+        queue.pop()
+
+
+def test_ls_queue_merge():
+    queue = LSQueue()
+    queue.push(task((0, 1), -3, solution='a'))
+    queue.push(task((0, 1), -3, solution='b'))
+    queue.push(task((1, 1), -5, solution='c'))
+    queue.push(task((0, 1), -4, solution='d'))
+    assert len(queue) == 2 and queue.merged == 2
+    assert [queue.pop().solution for _ in range(2)] == ['c', 'd']
+
+
+def test_ls_queue_capacity():
+    rng = random.Random(1)
+    queue = LSQueue(capacity=50)
+    tasks = [task((i,), rng.random(), solution=i) for i in range(20000)]
+    for i, t in enumerate(tasks):
+        queue.push(t)
+        if i % 3 == 0:
+            queue.pop()
+        assert len(queue) <= 50
+        # Lazily removed entries are compacted away.
+        assert len(queue._best) + len(queue._worst) <= 4 * 50 + 64 + 2
+    assert queue.evicted > 0
+    remaining = [queue.pop().priority for _ in range(len(queue))]
+    assert remaining == sorted(remaining)
+
+
+def test_hybrid_ga_ls_capacity():
+    rstate = random.Random(2)
+    create_random = lambda rstate=rstate: tuple(rstate.randint(0, 1) for _ in range(30))
+
+    async def evaluate(solution):
+        await asyncio.sleep(0)
+        return sum(solution)
+
+    queue = asyncio.run(hybrid_ga.run(
+        population=[create_random() for _ in range(20)], workers=4,
+        log_seconds=60, rstate=rstate, evaluate=evaluate,
+        neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+        next_population=functools.partial(
+            common.new_population,
+            select=functools.partial(
+                common.select_tournament, tournament_size=2, rstate=rstate),
+            crossover=functools.partial(common.uniform_crossover, rstate=rstate),
+            create_random=create_random),
+        task_limit=2000, ga_priority=0.5, ls_capacity=25))
+    assert queue.total_evals == 2000
+    assert len(queue.ls_queue) <= 25 and queue.ls_queue.evicted > 0
+
+
+def test_hybrid_ga_next_population_off_loop():
+    rstate = random.Random(4)
+    create_random = lambda rstate=rstate: common.random_solution(rstate, 20)
+    state = dict(threads=set(), started=0, overlapped=0)
+
+    async def evaluate(solution):
+        state['started'] += 1
+        await asyncio.sleep(0.002)
+        return sum(solution)
+
+    queue = asyncio.run(hybrid_ga.run(
+        population=[create_random() for _ in range(10)], workers=4,
+        log_seconds=60, rstate=rstate, evaluate=evaluate,
+        neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+        next_population=functools.partial(
+            slow_progression, state, create_random),
+        task_limit=300, ga_priority=0.5))
+    assert queue.total_evals == 300 and queue.generations > 2
+    assert threading.get_ident() not in state['threads']
+    # LS evaluations kept starting while populations were computed.
+    assert state['overlapped'] > 0
+
+
+def test_ls_queue_capacity_at_least_one():
+    with pytest.raises(ValueError):
+        LSQueue(capacity=0)
+
+
+class InlineExecutor(concurrent.futures.Executor):
+    ''' Runs jobs on submission, so that a run's order of events does not
+    depend on thread timing. '''
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def seeded_run(seed, generators):
+    rstate = random.Random(seed)
+    create_random = lambda rstate=rstate: common.random_solution(rstate, 20)
+
+    def next_population(results, rstate):
+        generators.append(rstate)
+        return common.new_population(
+            results, select=functools.partial(common.select_tournament, tournament_size=2),
+            crossover=common.uniform_crossover, create_random=create_random,
+            rstate=rstate)
+
+    async def evaluate(solution):
+        await asyncio.sleep(0)
+        return sum(solution)
+
+    queue = asyncio.run(hybrid_ga.run(
+        population=[create_random() for _ in range(10)], workers=4,
+        log_seconds=60, rstate=rstate, evaluate=evaluate,
+        neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+        next_population=next_population, executor=InlineExecutor(),
+        task_limit=300, ga_priority=0.5))
+    assert all(generator is not rstate for generator in generators)
+    return queue.record, queue.best_solution
+
+
+def test_hybrid_ga_seeded_runs_reproducible():
+    generators = []
+    assert seeded_run(5, generators) == seeded_run(5, [])
+    assert len(generators) > 2 and len(set(map(id, generators))) == len(generators)
+
+
+def test_hybrid_ga_starts_next_population_early(monkeypatch):
+    rstate = random.Random(6)
+    create_random = lambda rstate=rstate: common.random_solution(rstate, 20)
+    started, sizes = [], []
+    original = hybrid_ga.start_next_population
+
+    def start_next_population(queue, *args):
+        started.append(len(queue.ga_results))
+        original(queue, *args)
+        sizes.append(len(queue.previous_results))
+
+    monkeypatch.setattr(hybrid_ga, 'start_next_population', start_next_population)
+
+    async def evaluate(solution):
+        await asyncio.sleep(0.001)
+        return sum(solution)
+
+    asyncio.run(hybrid_ga.run(
+        population=[create_random() for _ in range(20)], workers=4,
+        log_seconds=60, rstate=rstate, evaluate=evaluate,
+        neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+        next_population=functools.partial(
+            common.new_population,
+            select=functools.partial(common.select_tournament, tournament_size=2),
+            crossover=common.uniform_crossover, create_random=create_random),
+        task_limit=400, ga_priority=0.5, prefetch=6))
+    # The initial population waits for all results, later ones for all but
+    # :prefetch; populations keep their size.
+    assert len(started) > 2
+    assert started[0] == 20 and set(started[1:]) == {14}
+    assert set(sizes) == {20}
+
+
+def test_population_job_rstate_optional():
+    rstate = random.Random(7)
+    assert common.population_job(lambda results: results, [1], rstate)() == [1]
+    job = common.population_job(
+        lambda results, rstate: (results, rstate), [1], rstate)
+    results, generator = job()
+    assert results == [1]
+    assert isinstance(generator, random.Random) and generator is not rstate
+    assert common.population_job(lambda results, **kwargs: kwargs, [], rstate)()
+    assert common.population_job(lambda results, **kwargs: kwargs, [], None)() == {}
+
+
+def test_hybrid_ga_next_population_without_rstate():
+    rstate = random.Random(8)
+    create_random = lambda: common.random_solution(rstate, 20)
+    calls = []
+
+    def next_population(results):
+        calls.append(len(results))
+        return [create_random() for _ in results]
+
+    async def evaluate(solution):
+        await asyncio.sleep(0)
+        return sum(solution)
+
+    queue = asyncio.run(hybrid_ga.run(
+        population=[create_random() for _ in range(10)], workers=4,
+        log_seconds=60, rstate=rstate, evaluate=evaluate,
+        neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+        next_population=next_population, task_limit=200, ga_priority=0.5))
+    assert queue.total_evals == 200
+    # By default each population is built from all results of the last.
+    assert calls and set(calls) == {10}
@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import multiprocessing
+import random
+
+import pytest
+
+from search_algorithms import async_ga, common, hybrid_ga
+from search_algorithms.islands import (
+    IslandResult, IslandsResult, _Counts, _receive, run_islands)
+
+
+BITS = 40
+
+
+async def onemax(solution):
+    await asyncio.sleep(0.0005)
+    return sum(solution)
+
+
+def setup(index, *, hybrid=True):
+    rstate = random.Random(index)
+    create_random = lambda rstate=rstate: tuple(rstate.randint(0, 1) for _ in range(BITS))
+    kwargs = dict(
+        population=[create_random() for _ in range(10)],
+        evaluate=onemax,
+        next_population=functools.partial(
+            common.new_population,
+            select=functools.partial(
+                common.select_tournament, tournament_size=2, rstate=rstate),
+            crossover=functools.partial(common.uniform_crossover, rstate=rstate),
+            create_random=create_random),
+        workers=4, log_seconds=60, task_limit=400)
+    if hybrid:
+        kwargs.update(
+            rstate=rstate, ga_priority=0.5,
+            neighbour=functools.partial(common.create_neighbour, rstate=rstate))
+    return kwargs
+
+
+def failing_setup(index):
+    if index == 1:
+        raise ValueError()
+    return setup(index)
+
+
+@pytest.mark.parametrize("driver", [hybrid_ga.run, async_ga.run])
+def test_run_islands(driver):
+    result = run_islands(
+        functools.partial(setup, hybrid=driver is hybrid_ga.run), 3,
+        driver=driver, migrants=2, interval=0.02)
+    assert [island.index for island in result.islands] == [0, 1, 2]
+    for island in result.islands:
+        assert island.total_evals >= 400
+        assert island.best_fitness == sum(island.best_solution)
+        assert island.emigrants > 0 and island.immigrants > 0
+    assert result.best.best_fitness == max(i.best_fitness for i in result.islands)
+    assert sum(i.emigrants for i in result.islands) >= sum(
+        i.immigrants for i in result.islands)
+
+
+def test_run_islands_single():
+    result = run_islands(setup, 1, interval=0.02)
+    assert result.islands[0].emigrants == result.islands[0].immigrants == 0
+
+
+def test_run_islands_failure():
+    with pytest.raises(RuntimeError, match="Island process 1 failed"):
+        run_islands(failing_setup, 3, interval=0.02)
+
+
+def test_immigrants_kept_apart():
+    inbox = multiprocessing.get_context().Queue()
+    inbox.put([((1, 1), 2), ((0, 0), 0)])
+    queue = hybrid_ga.Queue(
+        ga_queue=[], ls_queue=hybrid_ga.LSQueue(),
+        ga_results=[dict(solution=(1, 0), fitness=1)], best_solution=None,
+        ga_tasks_issued=0, ls_tasks_issued=0, generations=0, total_evals=0, record=[])
+    counts = _Counts()
+    while counts.immigrants < 2:
+        _receive(queue, inbox, counts)
+    assert len(queue.ga_results) == 1 and len(queue.immigrants) == 2
+    assert queue.best_solution == ((1, 1), 2)
+    # The fittest compete for the results' places.
+    assert common.merge_immigrants(queue.ga_results, queue.immigrants) == [
+        dict(solution=(1, 1), fitness=2)]
+
+
+def test_islands_result_without_incumbent():
+    result = IslandsResult(islands=[IslandResult(
+        index=0, best_solution=None, best_fitness=None, total_evals=0,
+        emigrants=0, immigrants=0)])
+    assert result.best is None
+    result.print_state()
@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+import pytest
+
+from search_algorithms.nsga2 import (
+    assign_crowding_distance, assign_nondominated_rank, crowding_distances,
+    nondominated_ranks, nondominated_sort, nsga2_elites, nsga2_order_key,
+    split_dominated)
+
+
+def peel_sort(population, key):
+    ''' Reference O(MN^3) sort: repeatedly split off the nondominated set. '''
+    ranks = []
+    remaining = list(population)
+    while remaining:
+        remaining, nondominated = split_dominated(remaining, key)
+        ranks.append(nondominated)
+    return ranks
+
+
+def loop_crowding_distance(population, key):
+    ''' Reference implementation: per-individual loop over sorted lists. '''
+    population = [dict(ind, crowding_distance=0) for ind in population]
+    for dim in range(len(population[0][key])):
+        population.sort(key=lambda ind: (ind[key][dim], ind[key]))
+        vrange = population[-1][key][dim] - population[0][key][dim]
+        if vrange == 0:
+            continue
+        population[0]['crowding_distance'] = np.inf
+        population[-1]['crowding_distance'] = np.inf
+        for a, b, c in zip(population, population[1:], population[2:]):
+            b['crowding_distance'] = (
+                b['crowding_distance'] + (c[key][dim] - a[key][dim]) / vrange)
+    return population
+
+
+def loop_elites(population, size, key):
+    population = [
+        dict(individual, pareto_rank=i)
+        for i, rank in enumerate(peel_sort(population, key))
+        for individual in rank]
+    population = loop_crowding_distance(population, key)
+    return sorted(population, key=nsga2_order_key)[:size]
+
+
+def random_population(rng, size, dimensions, values, scale=1):
+    return [
+        {'id': i, 'objective': tuple(
+            rng.randint(0, values) / scale for _ in range(dimensions))}
+        for i in range(size)]
+
+
+@pytest.mark.parametrize("dimensions", [1, 2, 3, 4])
+@pytest.mark.parametrize("values", [2, 10, 1000])
+def test_nondominated_sort_matches_peel(dimensions, values):
+    ''' Small value ranges give many duplicate and tied objective values. '''
+    rng = random.Random(dimensions * 1000 + values)
+    for _ in range(20):
+        population = random_population(rng, rng.randint(1, 80), dimensions, values)
+        assert nondominated_sort(population, 'objective') == peel_sort(population, 'objective')
+
+
+def test_nondominated_ranks():
+    objectives = np.array([[1, 3], [2, 2], [3, 1], [2, 3], [3, 3], [1, 3]])
+    assert list(nondominated_ranks(objectives)) == [0, 0, 0, 1, 2, 0]
+    assert list(nondominated_ranks(np.hstack([objectives, objectives]))) == [0, 0, 0, 1, 2, 0]
+    assert list(nondominated_ranks(np.zeros((0, 2)))) == []
+
+
+def test_assign_nondominated_rank():
+    population = [{'objective': (2, 2)}, {'objective': (1, 1)}, {'objective': (1, 3)}]
+    assert assign_nondominated_rank(population, 'objective') == [
+        {'objective': (1, 1), 'pareto_rank': 0},
+        {'objective': (2, 2), 'pareto_rank': 1},
+        {'objective': (1, 3), 'pareto_rank': 1}]
+    assert nondominated_sort([], 'objective') == []
+
+
+@pytest.mark.parametrize("dimensions", [1, 2, 3])
+@pytest.mark.parametrize("values,scale", [(2, 1), (10, 7), (1000, 1)])
+def test_crowding_and_elites_match_loops(dimensions, values, scale):
+    rng = random.Random(dimensions * 1000 + values)
+    for _ in range(20):
+        population = random_population(
+            rng, rng.randint(1, 60), dimensions, values, scale)
+        assert assign_crowding_distance(population, 'objective') == \
+            loop_crowding_distance(population, 'objective')
+        size = rng.randint(1, len(population))
+        elites = nsga2_elites(population, size, 'objective')
+        assert elites == loop_elites(population, size, 'objective')
+        # Next generation: individuals already carry rank and distance.
+        assert nsga2_elites(elites + population, size, 'objective') == \
+            loop_elites(elites + population, size, 'objective')
+
+
+def test_crowding_distances():
+    distances, order = crowding_distances(np.array([[0, 4], [1, 3], [3, 1], [4, 0], [2, 2]]))
+    assert list(order) == [3, 2, 4, 1, 0]
+    assert list(distances) == [np.inf, 1.0, 1.0, np.inf, 1.0]
+    distances, order = crowding_distances(np.ones((3, 2)))
+    assert list(distances) == [0, 0, 0] and list(order) == [0, 1, 2]
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import random
+
+import numpy as np
+import pytest
+
+from search_algorithms import common, evolve, hybrid_ga
+from search_algorithms.surrogate import RidgeRegression, SurrogateScreen
+
+
+def test_ridge_regression_matches_batch_fit():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4)) * [1, 10, 100, 0.1] + 5
+    y = X @ [1.0, -0.2, 0.03, 4.0] + 2 + rng.normal(scale=0.01, size=200)
+    model = RidgeRegression(alpha=1e-6)
+    for row, target in zip(X, y):
+        model.update(row, target)
+    assert model.predict(X) == pytest.approx(y, abs=0.1)
+    # Reference: ridge on centred data, penalty scaled by feature variance.
+    Xc, yc = X - X.mean(axis=0), y - y.mean()
+    alpha = 1.0
+    model.alpha = alpha
+    model._coef = None
+    weights = np.linalg.solve(
+        Xc.T @ Xc + alpha * np.diag(np.diag(Xc.T @ Xc)), Xc.T @ yc)
+    assert model.predict(X[:5]) == pytest.approx(
+        Xc[:5] @ weights + y.mean(), rel=1e-6)
+
+
+def test_surrogate_screen_split():
+    screen = SurrogateScreen(fraction=0.25, min_samples=5, alpha=1e-9)
+    assert screen.oversample == 4
+    candidates = [(i, 0) for i in range(8)]
+    # Not ready: no screening.
+    assert screen.split(candidates) == (candidates, [])
+    assert screen.best(candidates) == candidates[0]
+    for i in range(10):
+        screen.observe((i, i % 2), float(i))
+    assert screen.split(candidates) == ([(6, 0), (7, 0)], candidates[:6])
+    assert (screen.screened, screen.rejected) == (8, 6)
+    assert screen.best(candidates) == (7, 0)
+    assert (screen.screened, screen.rejected) == (8, 6)
+    assert screen.split(candidates, keep=3) == ([(5, 0), (6, 0), (7, 0)], candidates[:5])
+    correlation, error = screen.accuracy()
+    assert correlation == pytest.approx(1.0) and error < 1e-3
+    with pytest.raises(ValueError):
+        SurrogateScreen(fraction=0)
+
+
+def onemax_progression(rstate, population):
+    results = [dict(solution=ind['instance'], fitness=ind['attr']) for ind in population]
+    elites = sorted(population, key=lambda ind: ind['attr'], reverse=True)[:2]
+    children = []
+    while len(children) < len(population) - 2:
+        a, b = common.uniform_crossover(
+            common.select_tournament(results, 2, rstate),
+            common.select_tournament(results, 2, rstate), rstate)
+        children.extend([common.create_neighbour(a, rstate), b])
+    return elites, children[:len(population) - 2]
+
+
+def test_synchronous_ga_surrogate():
+    evaluated = []
+
+    async def evaluate(solution):
+        evaluated.append(solution)
+        return sum(solution)
+
+    def mean_fitness(screen, seed):
+        rstate = random.Random(seed)
+        evaluated.clear()
+        population = [common.random_solution(rstate, 30, p=0.3) for _ in range(20)]
+        final = asyncio.run(evolve.parallel_synchronous_ga(
+            population, evaluate, functools.partial(onemax_progression, rstate),
+            generations=10, workers=4, surrogate=screen))
+        assert len(final) == 20
+        return np.mean([ind['attr'] for ind in final])
+
+    unscreened = mean_fitness(None, 0)
+    assert len(evaluated) == 20 + 10 * 18
+    # Ready after the initial population: 5 of each 18 children evaluated.
+    screen = SurrogateScreen(fraction=0.25, min_samples=20)
+    assert mean_fitness(screen, 0) > unscreened
+    assert len(evaluated) == screen.observed == 20 + 10 * 5
+    assert screen.rejected == 10 * 13
+    assert screen.stats()['rank_correlation'] > 0.5
+
+
+def test_synchronous_ga_surrogate_carries_distinct():
+    rstate = random.Random(1)
+
+    async def evaluate(solution):
+        return sum(solution)
+
+    def progression(population):
+        # Elites are copies of members, not the members themselves.
+        ranked = sorted(population, key=lambda ind: ind['attr'], reverse=True)
+        elites = [dict(ind) for ind in ranked[:2]]
+        return elites, [common.random_solution(rstate, 30, p=0.3) for _ in range(18)]
+
+    sizes = []
+
+    def callback(generation, population):
+        instances = [ind['instance'] for ind in population]
+        sizes.append((len(instances), len(set(instances))))
+
+    screen = SurrogateScreen(fraction=0.25, min_samples=20)
+    population = [common.random_solution(rstate, 30, p=0.3) for _ in range(20)]
+    asyncio.run(evolve.parallel_synchronous_ga(
+        population, evaluate, progression, generations=10, workers=4,
+        surrogate=screen, generation_callback=callback))
+    # No copies of elites or carried members, and the size is kept.
+    assert sizes == [(20, 20)] * 11
+    assert screen.rejected > 0
+
+
+def test_hybrid_ga_surrogate(capsys):
+    rstate = random.Random(3)
+    create_random = lambda rstate=rstate: common.random_solution(rstate, 30, p=0.3)
+
+    async def evaluate(solution):
+        await asyncio.sleep(0)
+        return sum(solution)
+
+    screen = SurrogateScreen(fraction=0.5, min_samples=20)
+    queue = asyncio.run(hybrid_ga.run(
+        population=[create_random() for _ in range(20)], workers=4,
+        log_seconds=60, rstate=rstate, evaluate=evaluate,
+        neighbour=functools.partial(common.create_neighbour, rstate=rstate),
+        next_population=functools.partial(
+            common.new_population,
+            select=functools.partial(
+                common.select_tournament, tournament_size=2, rstate=rstate),
+            crossover=functools.partial(common.uniform_crossover, rstate=rstate),
+            create_random=create_random),
+        task_limit=500, ga_priority=0.5, surrogate=screen))
+    assert screen.observed == queue.total_evals == 500
+    assert screen.rejected > 0
+    assert "Surrogate rejected" in capsys.readouterr().out
@@ -0,0 +1,173 @@
+import asyncio
+import collections
+import random
+import time
+
+import pytest
+
+from search_algorithms.cache import FitnessCache
+from search_algorithms.utils import (
+    StragglerPolicy, TqdmProgress, map_async_workers, map_with_deadlines)
+
+
+def test_map_async_workers_ordered():
+    rng = random.Random(0)
+    delays = [rng.uniform(0, 0.01) for _ in range(50)]
+    running = []
+    peak = []
+
+    async def evaluate(i):
+        running.append(i)
+        peak.append(len(running))
+        await asyncio.sleep(delays[i])
+        running.remove(i)
+        return i * 2
+
+    results = asyncio.run(map_async_workers(evaluate, range(50), workers=4))
+    assert results == [i * 2 for i in range(50)]
+    assert max(peak) == 4
+
+
+def test_map_async_workers_error():
+    started = []
+    cancelled = []
+
+    async def evaluate(i):
+        started.append(i)
+        if i == 3:
+            raise KeyError(i)
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+
+    with pytest.raises(KeyError):
+        asyncio.run(map_async_workers(evaluate, range(20), workers=4))
+    assert sorted(started) == [0, 1, 2, 3]
+    assert sorted(cancelled) == [0, 1, 2]
+
+
+def test_map_async_workers_return_exceptions():
+    async def evaluate(i):
+        if i % 2:
+            raise ValueError(i)
+        return i
+
+    results = asyncio.run(map_async_workers(
+        evaluate, range(6), workers=2, return_exceptions=True))
+    assert results[::2] == [0, 2, 4]
+    assert all(isinstance(error, ValueError) for error in results[1::2])
+
+
+def test_map_async_workers_progress():
+    updates = []
+
+    async def evaluate(i):
+        await asyncio.sleep(0)
+        return i
+
+    asyncio.run(map_async_workers(evaluate, 'abc', workers=2, progress=updates.append))
+    assert sorted(update.index for update in updates) == [0, 1, 2]
+    assert [update.done for update in updates] == [1, 2, 3]
+    assert all(update.total == 3 and update.error is None for update in updates)
+
+    progress = TqdmProgress(desc='evaluate')
+    asyncio.run(map_async_workers(evaluate, 'abc', workers=2, progress=progress))
+    assert progress.bar.n == 3
+    assert asyncio.run(map_async_workers(evaluate, [], workers=2)) == []
+
+
+def test_map_with_deadlines_cancels_stragglers():
+    cancelled = []
+
+    async def evaluate(i):
+        try:
+            await asyncio.sleep(5 if i in (3, 7) else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+        return i
+
+    policy = StragglerPolicy(penalty=-1, cancel_after=4, limit=5)
+    start = time.monotonic()
+    results = asyncio.run(map_with_deadlines(evaluate, range(20), workers=4, policy=policy))
+    assert time.monotonic() - start < 1
+    assert results == [-1 if i in (3, 7) else i for i in range(20)]
+    assert sorted(cancelled) == [3, 7]
+    report, = policy.reports
+    assert report.cancelled == 2 and report.speculated == 0
+    assert 0.01 <= report.median < 0.05
+    assert 0 < report.cancelled_time < 2
+    assert 4 < report.recovered < 5
+    assert report.idle_time == pytest.approx(
+        4 * report.wall_time - report.busy_time)
+
+
+def test_map_with_deadlines_speculates():
+    attempts = collections.Counter()
+
+    async def evaluate(i):
+        attempts[i] += 1
+        # The first attempt at 5 is slow, a retry is fast.
+        await asyncio.sleep(5 if i == 5 and attempts[i] == 1 else 0.01)
+        return i
+
+    policy = StragglerPolicy(penalty=None, speculate_after=3, cancel_after=100)
+    results = asyncio.run(map_with_deadlines(evaluate, range(10), workers=4, policy=policy))
+    assert results == list(range(10))
+    assert attempts[5] == 2
+    report, = policy.reports
+    assert (report.speculated, report.backup_wins, report.cancelled) == (1, 1, 0)
+    assert report.wall_time < 1 and report.recovered is None
+
+
+def test_map_with_deadlines_backup_bypasses_cache():
+    attempts = collections.Counter()
+
+    async def evaluate(i):
+        attempts[i] += 1
+        await asyncio.sleep(5 if i == 5 and attempts[i] == 1 else 0.01)
+        return i
+
+    cache = FitnessCache(key=lambda i: i)
+    policy = StragglerPolicy(penalty=None, speculate_after=3, cancel_after=100)
+    results = asyncio.run(map_with_deadlines(
+        cache.wrap(evaluate), range(10), workers=4, policy=policy,
+        backup=evaluate))
+    assert results == list(range(10))
+    assert attempts[5] == 2
+    report, = policy.reports
+    assert (report.speculated, report.backup_wins) == (1, 1)
+    assert report.wall_time < 1
+
+
+def test_map_with_deadlines_cancelled_copy():
+    attempts = collections.Counter()
+
+    async def evaluate(i):
+        attempts[i] += 1
+        if i == 5 and attempts[i] == 2:
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0.3 if i == 5 else 0.01)
+        return i
+
+    policy = StragglerPolicy(penalty=None, speculate_after=3, cancel_after=100)
+    results = asyncio.run(map_with_deadlines(evaluate, range(10), workers=4, policy=policy))
+    assert results == list(range(10))
+    # The cancelled backup is dropped (and may be replaced), not raised.
+    assert attempts[5] >= 2
+    report, = policy.reports
+    assert report.speculated == attempts[5] - 1 and report.backup_wins == 0
+
+
+def test_map_with_deadlines_error():
+    async def evaluate(i):
+        await asyncio.sleep(0.01)
+        if i == 2:
+            raise ValueError()
+        return i
+
+    with pytest.raises(ValueError):
+        asyncio.run(map_with_deadlines(
+            evaluate, range(5), workers=2, policy=StragglerPolicy(penalty=0)))